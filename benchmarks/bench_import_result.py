@@ -0,0 +1,77 @@
+"""
+Microbenchmark of parsing a large import log, comparing a list of ImportMessage objects with the columnar storage.
+
+Run from the root of the repository with: `python -m benchmarks.bench_import_result [messages]`
+"""
+
+import sys
+import tracemalloc
+from timeit import Timer
+
+from pyrelatics2.raw_soap import iter_result_events
+from pyrelatics2.raw_soap import local_name
+from pyrelatics2.raw_soap import parse_import_response
+from pyrelatics2.result_classes import ImportResult
+
+
+def make_response(message_count: int) -> bytes:
+    """SOAP response of an import, with a message and an element for every row"""
+    messages = []
+    elements = []
+    for row in range(1, message_count // 2 + 1):
+        second = row % 60
+        messages.append(f'<Message Time="10:00:{second:02}" Result="Progress">Processing row : {row}</Message>')
+        messages.append(f'<Message Time="10:00:{second:02}" Result="Comment">Updated element OBJ-{row:07}</Message>')
+        elements.append(f'<Element Action="Update" ID="4ed6d088-e236-4b6b-8cc6-{row:012}" ForeignKey="OBJ-{row:07}"/>')
+
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"><soap:Body>'
+        '<ImportResponse xmlns="http://www.relatics.com/"><ImportResult>'
+        f"<Import>{''.join(messages)}<Elements>{''.join(elements)}</Elements></Import>"
+        "</ImportResult></ImportResponse></soap:Body></soap:Envelope>"
+    ).encode("utf-8")
+
+
+def objects(body: bytes) -> ImportResult:
+    """A list with an ImportMessage and ImportElement object per item, like before the columnar storage"""
+    result = ImportResult()
+    result.messages = []
+    result.elements = []
+    for event, element, depth in iter_result_events(body):
+        if event == "end" and local_name(element.tag) == "Message" and depth == 2:
+            result.add_message(time=element.get("Time"), status=element.get("Result"), message=element.text)
+        elif event == "end" and local_name(element.tag) == "Element" and depth == 3:
+            result.add_element(
+                action=element.get("Action"), id=element.get("ID"), foreign_key=element.get("ForeignKey")
+            )
+    return result
+
+
+def columns(body: bytes) -> ImportResult:
+    """The columnar storage, creating the ImportMessage and ImportElement views only when read"""
+    return parse_import_response(body)
+
+
+def main(message_count: int = 200_000) -> None:
+    """Time parsing an import log with the given number of messages, into objects and into columnar storage"""
+    body = make_response(message_count)
+
+    if objects(body) != columns(body):
+        raise AssertionError("The parsed results differ")
+
+    print(f"Parsing an import log of {message_count} messages and {message_count // 2} elements:")
+    for name, function in (("list of objects", objects), ("columns", columns)):
+        seconds = min(Timer(lambda function=function: function(body)).repeat(repeat=3, number=1))
+
+        tracemalloc.start()
+        result = function(body)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del result
+
+        print(f"  {name:<16} {message_count / seconds:>12,.0f} messages/s  {size / 1024 / 1024:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
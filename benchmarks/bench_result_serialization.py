@@ -0,0 +1,35 @@
+"""
+Microbenchmark of restoring the result of a report, comparing parsing the SOAP response with `from_bytes()`.
+
+Run from the root of the repository with: `python -m benchmarks.bench_result_serialization [rows] [columns]`
+"""
+
+import sys
+from timeit import Timer
+
+from benchmarks.bench_soap_engine import make_response
+from pyrelatics2.raw_soap import parse_response
+from pyrelatics2.result_classes import ExportResult
+
+
+def main(row_count: int = 5_000, column_count: int = 8) -> None:
+    """Time restoring a report by parsing its SOAP response and with `from_bytes()`, after checking they are equal"""
+    body = make_response(row_count, column_count)
+    data = ExportResult.from_suds(parse_response(body)).to_bytes()
+
+    if repr(ExportResult.from_bytes(data)) != repr(ExportResult.from_suds(parse_response(body))):
+        raise AssertionError("The restored result differs")
+
+    print(f"Restoring a report of {row_count} rows with {column_count} columns:")
+    print(f"  SOAP response {len(body) / 1024:>10.0f} kB")
+    print(f"  to_bytes()    {len(data) / 1024:>10.0f} kB")
+    for name, function in (
+        ("parse SOAP", lambda: ExportResult.from_suds(parse_response(body))),
+        ("from_bytes()", lambda: ExportResult.from_bytes(data)),
+    ):
+        seconds = min(Timer(function).repeat(repeat=5, number=1))
+        print(f"  {name:<13} {seconds * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,76 @@
+"""
+Microbenchmark of a GetResult round trip without the network, comparing the suds engine with the raw SOAP engine.
+
+Both engines build the request envelope and parse a response of a report. For suds that is a request context from a
+client with `nosend=True` and its `process_reply()`, for the raw engine the precompiled envelope and the streaming
+parser.
+
+Run from the root of the repository with: `python -m benchmarks.bench_soap_engine [rows] [columns]`
+"""
+
+import os
+import sys
+from timeit import Timer
+
+from pyrelatics2.client import RelaticsWebservices
+from pyrelatics2.raw_soap import build_get_result_envelope
+from pyrelatics2.raw_soap import parse_response
+from pyrelatics2.transport import DocumentTransport
+from pyrelatics2.wsdl_cache import WsdlCache
+
+WSDL_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "DataExchange.wsdl")
+RESPONSE_TEMPLATE = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"><soap:Body>'
+    '<GetResultResponse xmlns="http://www.relatics.com/"><GetResultResult>{content}</GetResultResult>'
+    "</GetResultResponse></soap:Body></soap:Envelope>"
+)
+
+
+def make_response(row_count: int, column_count: int) -> bytes:
+    """Response of a report with flat rows"""
+    rows = "".join(
+        "<Row " + " ".join(f'column_{column}="Value {row}.{column}"' for column in range(column_count)) + "/>"
+        for row in range(row_count)
+    )
+    return RESPONSE_TEMPLATE.format(content=f'<Report ReportName="benchmark">{rows}</Report>').encode("utf-8")
+
+
+def main(row_count: int = 5_000, column_count: int = 8) -> None:
+    """Time a GetResult round trip of a report with both engines, after checking they return the same result"""
+    webservice = RelaticsWebservices("benchmark", "9b167eea-d546-49c3-8cd0-1da09e7e9177")
+    with open(WSDL_PATH, "rb") as wsdl_file:
+        documents = {webservice.wsdl_url: wsdl_file.read()}
+    wsdl_cache = WsdlCache()
+    response = make_response(row_count, column_count)
+
+    def suds_engine():
+        client = wsdl_cache.get_client(webservice.hostname, lambda: DocumentTransport(documents))
+        client.set_options(nosend=True)
+        request_context = client.service.GetResult(
+            Operation="benchmark",
+            Identification=webservice.identification,
+            Parameters=None,
+            Authentication=webservice._generate_auth_parameter(None),  # pylint: disable=protected-access
+        )
+        return request_context.process_reply(response, 200, "OK")
+
+    def raw_engine():
+        build_get_result_envelope("benchmark", webservice.workspace_id)
+        return parse_response(response)
+
+    if repr(suds_engine()) != repr(raw_engine()):
+        raise AssertionError("The results of the engines differ")
+
+    print(f"GetResult of a report with {row_count} rows with {column_count} columns ({len(response):,} bytes):")
+    results = {}
+    for name, function in (("suds engine", suds_engine), ("raw engine", raw_engine)):
+        seconds = min(Timer(function).repeat(repeat=3, number=1))
+        results[name] = seconds
+        print(f"  {name:<20} {seconds * 1000:>12,.1f} ms")
+
+    print(f"  {'speedup':<20} {results['suds engine'] / results['raw engine']:>12.1f}x")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -1,14 +1,50 @@
-from .client import ClientCredential
+from .async_client import AsyncRelaticsWebservices
 from .client import RelaticsWebservices
+from .concurrency import DEFAULT_HOST_LIMITER
+from .concurrency import AdaptiveLimiter
+from .concurrency import AdaptiveStatistics
+from .concurrency import HostLimiter
+from .concurrency import RateLimiter
+from .concurrency import ResilienceOptions
+from .credentials import ClientCredential
+from .delta import DeltaState
+from .documents import DEFAULT_COMPRESSION_POLICY
+from .documents import CompressionPolicy
+from .documents import Documents
+from .exceptions import CircuitOpenError
+from .exceptions import ImportAbortedError
 from .exceptions import TokenRequestError
+from .imports import ResubmitOptions
+from .result_cache import CacheStatistics
+from .result_cache import FileResultStore
+from .result_cache import MemoryResultStore
+from .result_cache import ResultCache
+from .result_cache import ResultStore
+from .result_classes import BatchResult
 from .result_classes import ExportResult
+from .result_classes import ImportCallbacks
 from .result_classes import ImportResult
+from .result_classes import RowResult
+from .retry import CircuitBreaker
+from .retry import CircuitStatistics
+from .retry import RetryPolicy
+from .retry import RetryStatistics
+from .streaming import ExportRows
+from .token_store import FileTokenStore
+from .token_store import TokenStore
+from .transport import DEFAULT_CONNECTION_POOL
+from .transport import AsyncConnectionPool
+from .transport import ConnectionPool
+from .transport import PoolStatistics
 from .utils import suds_get
 from .utils import suds_get_as_list
 from .utils import suds_get_as_str
 from .version import __version__
+from .wsdl_cache import WSDL_CACHE
+from .wsdl_cache import WsdlCache
 
 __all__ = [
+    "AsyncRelaticsWebservices",
     "ClientCredential",
     "RelaticsWebservices",
     "TokenRequestError",
@@ -17,4 +53,38 @@ __all__ = [
     "suds_get",
     "suds_get_as_list",
     "suds_get_as_str",
+    "WSDL_CACHE",
+    "WsdlCache",
+    "DEFAULT_CONNECTION_POOL",
+    "AsyncConnectionPool",
+    "ConnectionPool",
+    "PoolStatistics",
+    "DEFAULT_HOST_LIMITER",
+    "HostLimiter",
+    "BatchResult",
+    "RowResult",
+    "ImportCallbacks",
+    "ImportAbortedError",
+    "DEFAULT_COMPRESSION_POLICY",
+    "CompressionPolicy",
+    "Documents",
+    "ExportRows",
+    "FileTokenStore",
+    "TokenStore",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "CircuitStatistics",
+    "RetryPolicy",
+    "RetryStatistics",
+    "AdaptiveLimiter",
+    "AdaptiveStatistics",
+    "RateLimiter",
+    "ResilienceOptions",
+    "CacheStatistics",
+    "FileResultStore",
+    "MemoryResultStore",
+    "ResultCache",
+    "ResultStore",
+    "DeltaState",
+    "ResubmitOptions",
 ]
@@ -0,0 +1,457 @@
+import asyncio
+from logging import getLogger
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Iterable
+from typing import overload
+from uuid import UUID
+
+from suds.client import Client
+from suds.sudsobject import Object as SudsObject
+
+from .client import BaseRelaticsWebservices
+from .client import ParametersOrNone
+from .client import SoapEngine
+from .client import T
+from .concurrency import ResilienceOptions
+from .credentials import ClientCredential
+from .imports import ResubmitOptions
+from .imports import next_resubmit
+from .imports import resubmit_rows
+from .plugins import AddParametersPlugin
+from .raw_soap import parse_import_response
+from .raw_soap import parse_response
+from .result_classes import ExportResult
+from .result_classes import ImportCallbacks
+from .result_classes import ImportResult
+from .transport import USER_AGENT
+from .transport import AsyncConnectionPool
+from .transport import DocumentTransport
+from .transport import HttpResponse
+from .wsdl_cache import WsdlCache
+from .wsdl_cache import clone_client
+
+log = getLogger(__name__)
+
+
+class AsyncRelaticsWebservices(BaseRelaticsWebservices):
+    """
+    Class to communicate with Relatics webservices from asyncio code.
+
+    Mirrors RelaticsWebservices, but all network traffic is non-blocking, so many requests can share a single event
+    loop. The SOAP envelopes are still built and parsed by suds, so the same results are returned.
+
+    Args:
+        company_subdomain : The company's subdomain (before ".relaticsonline.com")
+        workspace_id : The ID of the Relatics workspace were the request will be send to
+        user_agent : The user agent sent as part of the request. Will show up in the webservice-log in Relatics. Can
+            be used to distinguished different applications.
+        wsdl_cache : The cache used for the parsed WSDL. Defaults to the process-wide WSDL_CACHE, shared by all
+            instances.
+        connection_pool : The pool of keep-alive connections used for both the webservice and OAuth2 token requests.
+            When None, a pool is created for this instance. Close it with `aclose()` or use `async with`.
+        engine : How the SOAP requests are built and their responses parsed: "suds" (default) uses the WSDL, "raw"
+            uses precompiled SOAP 1.2 envelopes and a streaming parser, without the WSDL.
+        resilience : Optional retry policy, circuit breaker and limits of the requests. See `RelaticsWebservices`.
+    """
+
+    connection_pool: AsyncConnectionPool
+    """The pool of keep-alive connections used for all requests"""
+
+    def __init__(
+        self,
+        company_subdomain: str,
+        workspace_id: UUID | str,
+        user_agent: str = USER_AGENT,
+        wsdl_cache: WsdlCache | None = None,
+        connection_pool: AsyncConnectionPool | None = None,
+        engine: SoapEngine = "suds",
+        resilience: ResilienceOptions | None = None,
+    ):
+        super().__init__(company_subdomain, workspace_id, user_agent, wsdl_cache, engine, resilience)
+        self.connection_pool = AsyncConnectionPool() if connection_pool is None else connection_pool
+        self._wsdl_lock = asyncio.Lock()
+        self._wsdl_documents: dict[str, bytes] = {}
+
+    async def __aenter__(self) -> "AsyncRelaticsWebservices":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close all idle connections"""
+        await self.connection_pool.close()
+
+    async def _get_client(self) -> Client:
+        """Get a suds Client for a single request, retrieving and parsing the WSDL when it isn't cached yet"""
+        # Take a single snapshot of the cached WSDL, since it may turn stale in between a check and a later read
+        if (prototype := self.wsdl_cache.cached(self.hostname)) is None:
+            async with self._wsdl_lock:
+                if (prototype := self.wsdl_cache.cached(self.hostname)) is None:
+                    response = await self.connection_pool.request(
+                        "GET", self.wsdl_url, headers={"User-Agent": self.user_agent}, idempotent=True
+                    )
+                    if response.status >= 400:
+                        raise ConnectionError(f"Retrieving the WSDL failed: {response.status} {response.reason}")
+
+                    # Parsing is CPU bound, so keep it off the event loop
+                    self._wsdl_documents = {self.wsdl_url: response.body}
+                    prototype = await asyncio.to_thread(
+                        self.wsdl_cache.get_prototype, self.hostname, self._document_transport
+                    )
+
+        client = clone_client(prototype, self._document_transport())
+        client.set_options(nosend=True)
+
+        return client
+
+    def _document_transport(self) -> DocumentTransport:
+        return DocumentTransport(self._wsdl_documents)
+
+    async def _token(self, authentication: None | str | ClientCredential) -> str | None:
+        """The token for OAuth2 requests, retrieved without blocking, or None for other forms of authentication"""
+        if isinstance(authentication, ClientCredential):
+            return await authentication.get_token_async(self.hostname, connection_pool=self.connection_pool)
+        return None
+
+    async def _send(
+        self,
+        client: Client,
+        action: str,
+        authentication: None | str | ClientCredential,
+        **arguments: object,
+    ) -> SudsObject:
+        """Build the SOAP envelope with suds, send it without blocking and let suds process the reply"""
+        request_context, response = await self._post(client, action, authentication, **arguments)
+
+        return request_context.process_reply(response.body, response.status, response.reason)
+
+    async def _post(
+        self,
+        client: Client,
+        action: str,
+        authentication: None | str | ClientCredential,
+        **arguments: object,
+    ) -> tuple[Any, HttpResponse]:
+        """Build the SOAP envelope with suds and send it without blocking. Returns the request context and response."""
+        request_context = getattr(client.service, action)(**arguments)
+
+        headers = {
+            "Content-Type": "text/xml; charset=utf-8",
+            "SOAPAction": f'"http://www.relatics.com/{action}"',
+            "User-Agent": self.user_agent,
+        }
+
+        headers = self._with_token(headers, await self._token(authentication))
+
+        response = await self.connection_pool.request(
+            "POST", self.service_url, request_context.envelope, headers, idempotent=action == "GetResult"
+        )
+
+        return request_context, response
+
+    async def _send_with_retries(
+        self,
+        authentication: None | str | ClientCredential,
+        send: Callable[[], Awaitable[T]],
+        idempotent: bool = True,
+        retry_imports: bool = True,
+    ) -> T:
+        """Await `send` according to the retry policy and circuit breaker, with a new token when it was rejected"""
+
+        def send_limited() -> Awaitable[T]:
+            return self._send_limited(authentication, send)
+
+        return await self.retry_policy.call_async(
+            self.hostname, send_limited, idempotent, self.circuit_breaker, retry_imports
+        )
+
+    async def _send_limited(
+        self, authentication: None | str | ClientCredential, send: Callable[[], Awaitable[T]]
+    ) -> T:
+        """Await `send` once the rate limiter allows it, within the adaptive concurrency limit"""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(self.limiter_key)
+
+        if self.concurrency_limiter is None:
+            return await self._with_token_retry(authentication, send)
+
+        async with self.concurrency_limiter.limit_async(self.limiter_key):
+            return await self._with_token_retry(authentication, send)
+
+    async def _with_token_retry(
+        self, authentication: None | str | ClientCredential, send: Callable[[], Awaitable[T]]
+    ) -> T:
+        """Await `send`, and await it once more with a new token when the OAuth2 token was rejected"""
+        try:
+            return await send()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            if not self._should_retry_with_new_token(authentication, error):
+                raise
+
+        await authentication.get_token_async(  # type: ignore[union-attr]
+            self.hostname, force_refresh=True, connection_pool=self.connection_pool
+        )
+        return await send()
+
+    async def _send_raw(self, action: str, envelope: bytes, authentication: None | str | ClientCredential) -> bytes:
+        """Send the envelope of the raw engine without blocking, and return the body of the response"""
+        headers = self._with_token(self._raw_headers(action), await self._token(authentication))
+
+        response = await self.connection_pool.request(
+            "POST", self.service_url, envelope, headers, idempotent=action == "GetResult"
+        )
+        return self._raw_reply(response)
+
+    @overload
+    async def get_result(
+        self,
+        operation_name: str,
+        parameters: ParametersOrNone = None,
+        authentication: None | str | ClientCredential = None,
+        auto_parse_response: bool = True,
+    ) -> ExportResult:
+        ...
+
+    @overload
+    async def get_result(
+        self,
+        operation_name: str,
+        parameters: ParametersOrNone = None,
+        authentication: None | str | ClientCredential = None,
+        auto_parse_response: bool = False,
+    ) -> SudsObject:
+        ...
+
+    @overload
+    async def get_result(
+        self,
+        operation_name: str,
+        parameters: ParametersOrNone = None,
+        authentication: None | str | ClientCredential = None,
+    ) -> ExportResult:
+        ...
+
+    async def get_result(
+        self,
+        operation_name: str,
+        parameters: ParametersOrNone = None,
+        authentication: None | str | ClientCredential = None,
+        auto_parse_response: bool = True,
+    ) -> ExportResult | SudsObject:
+        """
+        Retrieve results from a "Server for providing data" in Relatics. See `RelaticsWebservices.get_result()`.
+
+        Args:
+            operation_name : The "OperationName" of the webservice to call
+            parameters : The parameters to pass to the webservice
+            authentication : Authentication for the webservice, either:
+                * None for no authentication,
+                * str for entryCode authentication or
+                * ClientCredential for OAuth2 client credentials
+            auto_parse_response: Convert the return object, and parse for any documents, for easy access.
+
+        Returns:
+            ExportResult : Result object when the retrieved response is parsed
+            suds.sudsobject.Object : The retrieved response, when not parsed
+        """
+        # Basic check of mandatory arguments
+        self._check_operation_name(operation_name=operation_name)
+
+        async def fetch() -> tuple[bytes, ExportResult | SudsObject]:
+            return await self._send_with_retries(
+                authentication,
+                lambda: self._get_result(operation_name, parameters, authentication, auto_parse_response),
+            )
+
+        if self.result_cache is None:
+            return (await fetch())[1]
+
+        key = self._result_cache_key(operation_name, parameters, authentication)
+        body, result = await self.result_cache.get_or_fetch_async(key, operation_name, fetch, self._is_cacheable)
+        if result is not None:
+            return result
+
+        # Every caller gets its own objects, parsed from the cached response by the same engine
+        return self._export_result(await self._parse_result_body(body), auto_parse_response)
+
+    async def _get_result(
+        self,
+        operation_name: str,
+        parameters: ParametersOrNone,
+        authentication: None | str | ClientCredential,
+        auto_parse_response: bool,
+    ) -> tuple[bytes, ExportResult | SudsObject]:
+        """Send a GetResult request without blocking, and return the body of the response with the parsed result"""
+        if self.engine == "raw":
+            envelope = self._raw_get_result_envelope(operation_name, parameters, authentication)
+            body = await self._send_raw("GetResult", envelope, authentication)
+            return body, self._export_result(parse_response(body), auto_parse_response)
+
+        client = await self._get_client()
+
+        # Add parameter plugin to handle parameters, when those are set
+        if parameters is not None:
+            client.set_options(plugins=[AddParametersPlugin(parameters)])
+
+        request_context, response = await self._post(
+            client, "GetResult", authentication, **self._get_result_arguments(operation_name, authentication)
+        )
+        suds_response = request_context.process_reply(response.body, response.status, response.reason)
+
+        return response.body, self._export_result(suds_response, auto_parse_response)
+
+    async def _parse_result_body(self, body: bytes) -> SudsObject:
+        """Parse the body of a GetResult response with the engine, without sending a request"""
+        if self.engine == "raw":
+            return parse_response(body)
+
+        client = await self._get_client()
+        return client.service.GetResult(__inject={"reply": body})
+
+    @overload
+    async def run_import(  # pylint: disable=R0913
+        self,
+        operation_name: str,
+        data: str | Iterable[dict[str, str]],
+        authentication: None | str | ClientCredential = None,
+        file_name: None | str = None,
+        documents: None | list[str] = None,
+        auto_parse_response: bool = True,
+        callbacks: ImportCallbacks | None = None,
+        resubmit: ResubmitOptions | None = None,
+    ) -> ImportResult:
+        ...
+
+    @overload
+    async def run_import(
+        self,
+        operation_name: str,
+        data: str | Iterable[dict[str, str]],
+        authentication: None | str | ClientCredential = None,
+        file_name: None | str = None,
+        documents: None | list[str] = None,
+        auto_parse_response: bool = False,
+        callbacks: ImportCallbacks | None = None,
+    ) -> SudsObject:
+        ...
+
+    @overload
+    async def run_import(
+        self,
+        operation_name: str,
+        data: str | Iterable[dict[str, str]],
+        authentication: None | str | ClientCredential = None,
+        file_name: None | str = None,
+        documents: None | list[str] = None,
+        callbacks: ImportCallbacks | None = None,
+        resubmit: ResubmitOptions | None = None,
+    ) -> ImportResult:
+        ...
+
+    async def run_import(  # pylint: disable=R0913
+        self,
+        operation_name: str,
+        data: str | Iterable[dict[str, str]],
+        authentication: None | str | ClientCredential = None,
+        file_name: None | str = None,
+        documents: None | list[str] = None,
+        auto_parse_response: bool = True,
+        callbacks: ImportCallbacks | None = None,
+        resubmit: ResubmitOptions | None = None,
+    ) -> ImportResult | SudsObject:
+        """
+        Send data to a "Server for receiving data" in Relatics. See `RelaticsWebservices.run_import()`.
+
+        Args:
+            operation_name : The "OperationName" of the webservice to call
+            data : The data to send to the import. See `RelaticsWebservices.run_import()`.
+            authentication : Authentication for the webservice, either:
+                * None for no authentication,
+                * str for entryCode authentication or
+                * ClientCredential for OAuth2 client credentials
+            file_name : Filename send to Relatics. Will show up in the "Imported file" column in the import log.
+            documents : Optional list of filepaths to include in the import. Must be unique names.
+            auto_parse_response : Convert the return object for easy access
+            callbacks : Optional callbacks, fired for every message and element while the response is parsed. Requires
+                a parsed response. The import is then only retried when the server didn't process it, so the callbacks
+                never fire twice for the same message.
+            resubmit : Optional options to resubmit only the rows with an error message. See
+                `RelaticsWebservices.run_import()`.
+
+        Returns:
+            ImportResult : Result object when the retrieved response is parsed
+            suds.sudsobject.Object : The retrieved response, when not parsed
+        """
+        # Basic check of mandatory arguments
+        self._check_operation_name(operation_name=operation_name)
+
+        self._check_import_options(auto_parse_response, callbacks)
+
+        if resubmit is not None:
+            rows = resubmit_rows(data, resubmit, auto_parse_response, callbacks)
+            return await self._run_import_resubmitting(
+                operation_name, rows, authentication, file_name, documents, resubmit, callbacks
+            )
+
+        # Building the payload reads files and encodes data, so keep it off the event loop
+        file_name, data_str = await asyncio.to_thread(
+            self._prepare_import, data=data, file_name=file_name, documents=documents
+        )
+
+        # The prepared payload is reused when the request is sent again. Callbacks can't be taken back, so then the
+        # import is only sent again when the server didn't process it, regardless of `retry_imports`.
+        def send() -> Awaitable[ImportResult | SudsObject]:
+            return self._send_import(
+                operation_name, file_name, data_str, authentication, auto_parse_response, callbacks
+            )
+
+        return await self._send_with_retries(authentication, send, idempotent=False, retry_imports=callbacks is None)
+
+    async def _run_import_resubmitting(
+        self,
+        operation_name: str,
+        rows: list[dict[str, str]],
+        authentication: None | str | ClientCredential,
+        file_name: None | str,
+        documents: None | list[str],
+        resubmit: ResubmitOptions,
+        callbacks: ImportCallbacks | None,
+    ) -> ImportResult:
+        """Send the rows, and resubmit only the rows with an error message. See `RelaticsWebservices.run_import()`"""
+        result = await self.run_import(operation_name, rows, authentication, file_name, documents, callbacks=callbacks)
+
+        round_number = 1
+        while failed := next_resubmit(operation_name, result, rows, round_number, resubmit.max_resubmits):
+            result = result.replace_rows(
+                failed,
+                await self.run_import(
+                    operation_name, [rows[index] for index in failed], authentication, file_name, documents
+                ),
+            )
+            round_number += 1
+
+        return result
+
+    async def _send_import(
+        self,
+        operation_name: str,
+        file_name: str,
+        data_str: str,
+        authentication: None | str | ClientCredential,
+        auto_parse_response: bool,
+        callbacks: ImportCallbacks | None = None,
+    ) -> ImportResult | SudsObject:
+        if self.engine == "raw":
+            envelope = self._raw_import_envelope(operation_name, file_name, data_str, authentication)
+            body = await self._send_raw("Import", envelope, authentication)
+            return parse_import_response(body, callbacks) if auto_parse_response else parse_response(body)
+
+        client = await self._get_client()
+
+        arguments = self._import_arguments(operation_name, file_name, data_str, authentication)
+        suds_response = await self._send(client, "Import", authentication, **arguments)
+
+        return self._import_result(suds_response, auto_parse_response, callbacks)
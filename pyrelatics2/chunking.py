@@ -0,0 +1,98 @@
+from logging import getLogger
+from typing import Iterable
+from typing import Iterator
+
+from .payload import XML_DECLARATION
+
+log = getLogger(__name__)
+
+XML_ROW_OVERHEAD = len("   <Row/>\n")
+"""Number of bytes a row without attributes takes in the data xml"""
+XML_ATTRIBUTE_OVERHEAD = len(' =""')
+"""Number of bytes an attribute takes in the data xml, besides its name and value"""
+XML_ENVELOPE_OVERHEAD = len(XML_DECLARATION) + len("<Import>\n</Import>")
+"""Number of bytes the data xml takes besides its rows: the xml declaration and the Import root element"""
+CHUNK_ENVELOPE_SIZE = (XML_ENVELOPE_OVERHEAD * 4 + 2) // 3 + 2
+"""
+Number of bytes the base64 encoded data xml of a chunk takes besides its rows. Includes the 2 bytes the padding of the
+whole data can add to the rounded up estimates of its parts. A chunk is sent without documents, so it isn't zipped.
+"""
+
+
+def _escaped_length(value: str) -> int:
+    """Length in bytes of the value in the data xml, including the escaping of the special characters"""
+    length = len(value.encode("utf-8"))
+    # "&" becomes "&amp;", "<" and ">" become "&lt;" and "&gt;", quotes become "&quot;" and "&apos;"
+    length += 4 * value.count("&")
+    length += 3 * (value.count("<") + value.count(">"))
+    length += 5 * (value.count('"') + value.count("'"))
+    return length
+
+
+def row_size(row: dict[str, str]) -> int:
+    """
+    Estimate the number of bytes a row takes, once it is base64 encoded as part of the data xml. The estimate is
+    rounded up, and doesn't include the CHUNK_ENVELOPE_SIZE of the data xml around the rows.
+
+    Args:
+        row : The row, as supplied to `run_import()`
+
+    Returns:
+        int : Estimated size of the row in bytes
+    """
+    size = XML_ROW_OVERHEAD
+    for key, value in row.items():
+        size += XML_ATTRIBUTE_OVERHEAD + len(key) + _escaped_length(str(value))
+
+    # Base64 encodes every 3 bytes into 4 bytes
+    return (size * 4 + 2) // 3
+
+
+def split_rows(
+    rows: Iterable[dict[str, str]],
+    max_rows: int | None = None,
+    max_bytes: int | None = None,
+) -> Iterator[tuple[int, list[dict[str, str]]]]:
+    """
+    Split rows into chunks, limited by the number of rows and/or the size of the base64 encoded data xml.
+
+    A single row larger than `max_bytes` can't be split, so it becomes a chunk on its own.
+
+    Args:
+        rows : The rows to split
+        max_rows : Maximum number of rows per chunk. None for no limit.
+        max_bytes : Maximum number of bytes of the base64 encoded data xml of a chunk, including the
+            CHUNK_ENVELOPE_SIZE around its rows. None for no limit.
+
+    Returns:
+        Iterator[tuple[int, list[dict[str, str]]]] : The index of the first row of each chunk with its rows
+    """
+    if max_rows is not None and max_rows < 1:
+        raise ValueError("The 'max_rows' must be at least 1.")
+    if max_bytes is not None and max_bytes <= CHUNK_ENVELOPE_SIZE:
+        raise ValueError(f"The 'max_bytes' must be larger than the size of an empty chunk ({CHUNK_ENVELOPE_SIZE}).")
+
+    # The rows of a chunk share the bytes left besides the envelope of the data xml
+    max_row_bytes = None if max_bytes is None else max_bytes - CHUNK_ENVELOPE_SIZE
+    chunk: list[dict[str, str]] = []
+    chunk_start = 0
+    chunk_bytes = 0
+
+    for index, row in enumerate(rows):
+        size = row_size(row) if max_row_bytes is not None else 0
+
+        if chunk and (
+            (max_rows is not None and len(chunk) >= max_rows)
+            or (max_row_bytes is not None and chunk_bytes + size > max_row_bytes)
+        ):
+            yield chunk_start, chunk
+            chunk, chunk_start, chunk_bytes = [], index, 0
+
+        if max_row_bytes is not None and size > max_row_bytes:
+            log.warning("Row %s (%s bytes) is larger than the maximum chunk size (%s bytes).", index, size, max_bytes)
+
+        chunk.append(row)
+        chunk_bytes += size
+
+    if chunk:
+        yield chunk_start, chunk
@@ -1,60 +1,80 @@
-import json
-import os
-import sys
-from base64 import b64encode
-from datetime import datetime
-from datetime import timedelta
-from http.client import HTTPSConnection
+from contextlib import closing
+from hashlib import sha256
+from io import BytesIO
 from logging import getLogger
-from platform import machine
-from platform import platform
-from platform import python_version
-from pprint import pformat
-from tempfile import gettempdir
+from typing import Any
+from typing import Callable
+from typing import Generator
+from typing import Iterable
+from typing import Iterator
+from typing import Literal
 from typing import TypeAlias
-from typing import TypedDict
+from typing import TypeVar
 from typing import overload
 from uuid import UUID
-from zipfile import ZipFile
+from xml.etree.ElementTree import ParseError
 
 from suds.client import Client
-from suds.plugin import MessageContext
 from suds.plugin import MessagePlugin
-from suds.sax.document import Document
-from suds.sax.element import Element
 from suds.sudsobject import Object as SudsObject
-
-from .exceptions import TokenRequestError
+from suds.transport import TransportError
+
+from .concurrency import DEFAULT_HOST_LIMITER
+from .concurrency import AdaptiveLimiter
+from .concurrency import HostLimiter
+from .concurrency import RateLimiter
+from .concurrency import ResilienceOptions
+from .concurrency import run_batch
+from .credentials import TOKEN_PATH  # pylint: disable=W0611
+from .credentials import ClientCredential
+from .credentials import TokenData  # pylint: disable=W0611
+from .credentials import is_token_rejected
+from .delta import DeltaState
+from .documents import DEFAULT_COMPRESSION_POLICY
+from .documents import CompressionPolicy
+from .imports import IMPORT_BASENAME  # pylint: disable=W0611
+from .imports import SUPPORTED_EXTENSIONS  # pylint: disable=W0611
+from .imports import ResubmitOptions
+from .imports import chunk_jobs
+from .imports import commit_delta
+from .imports import merge_chunks
+from .imports import next_resubmit
+from .imports import prepare_import
+from .imports import resubmit_rows
+from .payload import SPOOL_MAX_SIZE
+from .plugins import AddParametersPlugin
+from .plugins import KeepReplyPlugin
+from .raw_soap import PARSE_CHUNK_SIZE
+from .raw_soap import SOAP12_CONTENT_TYPE
+from .raw_soap import build_get_result_envelope
+from .raw_soap import build_import_envelope
+from .raw_soap import iter_result_events
+from .raw_soap import parse_import_response
+from .raw_soap import parse_response
+from .result_cache import ResultCache
+from .result_cache import result_cache_key
+from .result_classes import BatchResult
 from .result_classes import ExportResult
+from .result_classes import ImportCallbacks
 from .result_classes import ImportResult
-from .version import __version__
+from .retry import CircuitBreaker
+from .retry import RetryPolicy
+from .streaming import ExportRows
+from .transport import DEFAULT_CONNECTION_POOL
+from .transport import USER_AGENT
+from .transport import ConnectionPool
+from .transport import HttpResponse
+from .transport import PooledTransport
+from .wsdl_cache import WSDL_CACHE
+from .wsdl_cache import WsdlCache
 
 log = getLogger(__name__)
 
 
 # Type aliases
 ParametersOrNone: TypeAlias = None | dict[str, str]
-
-
-class TokenData(TypedDict):
-    """Simple immutable dict containing token information"""
-
-    token: str
-    """The actual token"""
-    expires_on: datetime
-    """Expire time of the token"""
-
-
-# Constants
-TOKEN_PATH = "/oauth2/token"
-IMPORT_BASENAME = "pyrelatics_webservice"
-SUPPORTED_EXTENSIONS = ["xlsx", "xlsm", "xlsb", "xls", "csv"]
-
-USER_AGENT = (
-    f"PyRelatics2/{__version__} "
-    f"({platform()}; {machine()}; python-{python_version()}) "
-    f"{os.path.split(sys.modules['__main__'].__file__)[1]}"  # pylint: disable=E1101
-)
+SoapEngine: TypeAlias = Literal["suds", "raw"]
+T = TypeVar("T")
 
 
 def is_valid_uuid(s: str) -> bool:
@@ -74,151 +94,21 @@ def is_valid_uuid(s: str) -> bool:
         return False
 
 
-class ClientCredential:
-    """
-    Class containing OAuth2 client credentials and helper methods to get a token from the Relatics host.
-
-    Args:
-        client_id : The OAuth2 client_id
-        client_secret : The OAuth2 client_secret
-    """
-
-    client_id: str
-    client_secret: str
-    tokens: dict[str, TokenData]
-
-    def __init__(self, client_id: str, client_secret: str):
-        self.client_id = client_id
-        self.client_secret = client_secret
-        self.tokens = {}
-
-    def get_token(self, hostname: str, force_refresh: bool = False, user_agent: str = USER_AGENT) -> str:
-        """
-        Get the token for the given hostname
-
-        Args:
-            hostname : The Relatics hostname from where the token should be get.
-            force_refresh : When True, force a new token to be requested, instead of trying to reuse an
-                existing token. Defaults to False.
-            user_agent : The user-agent used in the http request to Relatics. Since this name will show up in the
-                logs in Relatics, it can be useful to specify a custom value. Defaults to USER_AGENT.
-
-        Returns:
-            str: Token for the given hostname
-        """
-        if (
-            force_refresh is True
-            or hostname not in self.tokens
-            or (self.tokens[hostname]["expires_on"] - datetime.now()).seconds <= 300
-        ):
-            log.info("No previous token for %s, retrieving new token", hostname)
-            self.retrieve_token(hostname, user_agent)
-        else:
-            log.info("Reuse previous token for %s", hostname)
-
-        return self.tokens[hostname]["token"]
-
-    def retrieve_token(self, hostname: str, user_agent: str = USER_AGENT) -> None:
-        """_summary_
-
-        Args:
-            hostname : The Relatics hostname from where the token should be get.
-            user_agent : The user-agent used in the http request to Relatics. Since this name will show up in the
-                logs in Relatics, it can be useful to specify a custom value. Defaults to USER_AGENT.
-
-        Raises:
-            RuntimeError: When Relatics sends back an error response
-            KeyError: When there is no token in the response from Relatics
-        """
-        requested_on = datetime.now()
-        auth_credentials = b64encode(bytes(f"{self.client_id}:{self.client_secret}", "utf-8"))
-        payload = "grant_type=client_credentials"
-        headers = {
-            "Authorization": f"Basic {auth_credentials.decode('utf-8')}",
-            "Content-Type": "text/plain",
-            "User-Agent": user_agent,
-        }
-
-        conn = HTTPSConnection(hostname)
-        conn.request("POST", TOKEN_PATH, payload, headers)
-        res = conn.getresponse()
-        data = res.read()
-        response = json.loads(data.decode("utf-8"))
-
-        log.debug("Response from %s: %s", TOKEN_PATH, pformat(response, indent=2))
-
-        if "error" in response:
-            # Known errors:
-            # * `invalid_client` (description=_"Client not found."_). Happens when:
-            #   * An unknown client_id is submitted
-            #   * An incorrect client_secret is submitted
-            #   * The client_id is disabled in Relatics
-            raise TokenRequestError(response)
-
-        if "access_token" not in response:
-            raise KeyError("Token request failed: No access_token was given.")
-
-        # Store the token for later use
-        self.tokens[hostname] = TokenData(
-            token=response["access_token"],
-            expires_on=requested_on + timedelta(seconds=response["expires_in"]),
-        )
-
-
-class AddParametersPlugin(MessagePlugin):  # pylint: disable=R0903
-    """
-    Plugin for Suds Client to add parameters to the request before sending to Relatics. Because parameters use
-    attributes, they can not be defined though the default mechanisms within Suds.
-
-    Args:
-        parameters : Dictionary with the parameters
-    """
-
-    def __init__(self, parameters: ParametersOrNone):
-        self.parameters = parameters
-
-    def marshalled(self, context: MessageContext):
-        if self.parameters is not None:
-            # Try to get "Parameters" element, or built when missing
-            try:
-                params = context.envelope.getChild("Body")[0].getChild("Parameters")[0]
-            except TypeError:
-                log.info("Adding parameters to SOAP request")
-                root = context.envelope.getChild("Body")[0]
-                root_prefix = root.findPrefix("http://www.relatics.com/")
-
-                p_1 = Element("Parameters", parent=root)
-                p_1.setPrefix(root_prefix)
-                root.append(p_1)
-
-                p_2 = Element("Parameters", parent=p_1)
-                p_2.setPrefix(root_prefix)
-                p_1.append(p_2)
-
-                params = context.envelope.getChild("Body")[0].getChild("Parameters")[0]
-
-            prefix = params.findPrefix("http://www.relatics.com/")
-
-            # Add the parameters
-            for param_name, param_value in self.parameters.items():
-                elem = Element("Parameter", parent=params)
-                elem.setPrefix(prefix)
-                elem.set(name="Name", value=param_name)
-                elem.set(name="Value", value=param_value)
-                params.append(elem)
-
-        log.debug("Final SOAP envelope: \n%s", context.envelope.str())
-
-
-class RelaticsWebservices:
+class BaseRelaticsWebservices:  # pylint: disable=R0902
     """
-    Class to communicate with Relatics webservices
+    Base class with commonalities for the RelaticsWebservices and AsyncRelaticsWebservices classes.
 
     Args:
         company_subdomain : The company's subdomain (before ".relaticsonline.com")
         workspace_id : The ID of the Relatics workspace were the request will be send to
         user_agent : The user agent sent as part of the request. Will show up in the webservice-log in Relatics. Can
             be used to distinguished different applications.
+        wsdl_cache : The cache used for the parsed WSDL. Defaults to the process-wide WSDL_CACHE, shared by all
+            instances.
+        engine : How the SOAP requests are built and their responses parsed: "suds" (default) uses the WSDL, "raw"
+            uses precompiled SOAP 1.2 envelopes and a streaming parser, without the WSDL.
+        resilience : Optional retry policy, circuit breaker and limits of the requests. Defaults to no retries and no
+            limits.
 
     """
 
@@ -230,13 +120,41 @@ class RelaticsWebservices:
     """The user agent that will show up in the Relatics webservice logs"""
     keep_zip_file: bool
     """Optionally keep the created zipfile. For debugging purpose only"""
-
-    def __init__(self, company_subdomain: str, workspace_id: UUID | str, user_agent: str = USER_AGENT):
+    spool_max_size: int
+    """Size in bytes up to which the zip file of an import is built in memory, before it is spilled to disk"""
+    compression_policy: CompressionPolicy
+    """Policy deciding per file extension whether files in the zip file of an import are stored or compressed"""
+    result_cache: ResultCache | None
+    """Optional cache of the results of `get_result()`, coalescing identical requests in flight"""
+    wsdl_cache: WsdlCache
+    """The cache used for the parsed WSDL"""
+    engine: SoapEngine
+    """How the SOAP requests are built and their responses parsed: 'suds' or 'raw'"""
+    retry_policy: RetryPolicy
+    """Policy for sending a request again after a transient failure"""
+    circuit_breaker: CircuitBreaker | None
+    """Optional circuit breaker per hostname, failing fast while the server is degraded"""
+    rate_limiter: RateLimiter | None
+    """Optional limit on the rate of requests per hostname and workspace"""
+    concurrency_limiter: AdaptiveLimiter | None
+    """Optional adaptive limit on simultaneous requests per hostname and workspace"""
+
+    def __init__(
+        self,
+        company_subdomain: str,
+        workspace_id: UUID | str,
+        user_agent: str = USER_AGENT,
+        wsdl_cache: WsdlCache | None = None,
+        engine: SoapEngine = "suds",
+        resilience: ResilienceOptions | None = None,
+    ):
         # Check whether mandatory arguments are given
         if company_subdomain == "":
             raise ValueError("The 'company_subdomain' can not be empty.")
         if workspace_id == "":
             raise ValueError("The 'workspace_id' can not be empty.")
+        if engine not in ("suds", "raw"):
+            raise ValueError("The 'engine' must be either 'suds' or 'raw'.")
 
         # Check if supplied workspace_id str can be converted into a GUID
         if isinstance(workspace_id, str) and not is_valid_uuid(workspace_id):
@@ -249,11 +167,21 @@ class RelaticsWebservices:
         self.workspace_id = str(workspace_id) if isinstance(workspace_id, UUID) else workspace_id
         self.user_agent = user_agent
         self.keep_zip_file = False  # Optionally keep the created zipfile. For debugging purpose only
+        self.spool_max_size = SPOOL_MAX_SIZE
+        self.compression_policy = DEFAULT_COMPRESSION_POLICY
+        self.result_cache = None
+        self.wsdl_cache = WSDL_CACHE if wsdl_cache is None else wsdl_cache
+        self.engine = engine
+        resilience = ResilienceOptions() if resilience is None else resilience
+        self.retry_policy = RetryPolicy(max_attempts=1) if resilience.retry_policy is None else resilience.retry_policy
+        self.circuit_breaker = resilience.circuit_breaker
+        self.rate_limiter = resilience.rate_limiter
+        self.concurrency_limiter = resilience.concurrency_limiter
 
     @property
     def wsdl_url(self) -> str:
         """Return the complete WSDL url"""
-        return f"https://{self.hostname}/DataExchange.asmx?wsdl"
+        return WsdlCache.wsdl_url(self.hostname)
 
     @property
     def identification(self) -> dict[str, dict[str, str]]:
@@ -265,11 +193,26 @@ class RelaticsWebservices:
         """The full hostname in the form: {company_subdomain}.relaticsonline.com"""
         return f"{self.company_subdomain.lower()}.relaticsonline.com"
 
+    @property
+    def limiter_key(self) -> tuple[str, str]:
+        """The key of the requests in the rate and concurrency limiters: the hostname and the workspace"""
+        return self.hostname, self.workspace_id
+
+    @property
+    def service_url(self) -> str:
+        """Return the complete url of the webservice endpoint"""
+        return f"https://{self.hostname}/DataExchange.asmx"
+
     @staticmethod
     def _check_operation_name(operation_name: str) -> None:
         if operation_name == "":
             raise ValueError("Supplied operation_name is empty.")
 
+    @staticmethod
+    def _check_import_options(auto_parse_response: bool, callbacks: ImportCallbacks | None) -> None:
+        if callbacks is not None and not auto_parse_response:
+            raise ValueError("Callbacks require a parsed response.")
+
     @staticmethod
     def _generate_auth_parameter(authentication: None | str | ClientCredential = None) -> dict[str, dict[str, str]]:
         if isinstance(authentication, str):
@@ -280,6 +223,286 @@ class RelaticsWebservices:
 
         return auth
 
+    def _raw_headers(self, action: str) -> dict[str, str]:
+        """HTTP headers of a request of the raw engine, the SOAP 1.2 content type includes the action"""
+        return {"Content-Type": SOAP12_CONTENT_TYPE.format(action=action), "User-Agent": self.user_agent}
+
+    @staticmethod
+    def _authentication_identity(authentication: None | str | ClientCredential) -> str:
+        """Identity of the authentication for the key in the result cache, without any secrets"""
+        if isinstance(authentication, ClientCredential):
+            return f"client_id:{authentication.client_id}"
+        if isinstance(authentication, str):
+            return f"entrycode:{sha256(authentication.encode('utf-8')).hexdigest()}"
+        return ""
+
+    def _result_cache_key(
+        self, operation_name: str, parameters: ParametersOrNone, authentication: None | str | ClientCredential
+    ) -> str:
+        return result_cache_key(
+            self.hostname, self.workspace_id, operation_name, parameters, self._authentication_identity(authentication)
+        )
+
+    @staticmethod
+    def _is_cacheable(result: ExportResult | SudsObject) -> bool:
+        """Whether the result of a GetResult request is a successful result, which can be stored in the result cache"""
+        if isinstance(result, ExportResult):
+            return bool(result)
+
+        # Not converted to an ExportResult: a report without an error, like `ExportResult.from_suds()` checks
+        return hasattr(result, "Report") and not hasattr(result, "Export")
+
+    @staticmethod
+    def _export_result(suds_response: SudsObject, auto_parse_response: bool) -> ExportResult | SudsObject:
+        """The result of a GetResult request: converted to an ExportResult, or the suds response when not parsed"""
+        return ExportResult.from_suds(suds_response) if auto_parse_response else suds_response
+
+    @staticmethod
+    def _raw_entry_code(authentication: None | str | ClientCredential = None) -> str | None:
+        """Entry code for the envelope of the raw engine, or None for other forms of authentication"""
+        return authentication if isinstance(authentication, str) else None
+
+    def _raw_get_result_envelope(
+        self, operation_name: str, parameters: ParametersOrNone, authentication: None | str | ClientCredential
+    ) -> bytes:
+        """Envelope of a GetResult request of the raw engine"""
+        return build_get_result_envelope(
+            operation_name, self.workspace_id, parameters, self._raw_entry_code(authentication)
+        )
+
+    def _raw_import_envelope(
+        self, operation_name: str, file_name: str, data_str: str, authentication: None | str | ClientCredential
+    ) -> bytes:
+        """Envelope of an Import request of the raw engine"""
+        return build_import_envelope(
+            operation_name, self.workspace_id, file_name, data_str, self._raw_entry_code(authentication)
+        )
+
+    def _get_result_arguments(
+        self, operation_name: str, authentication: None | str | ClientCredential
+    ) -> dict[str, object]:
+        """Arguments of a GetResult request of suds"""
+        # Any parameters will be handled by the AddParametersPlugin, so don't pass them here
+        # GetResult(xs:string Operation, Identification Identification, Parameters Parameters,
+        #           Authentication Authentication)
+        return {
+            "Operation": operation_name,
+            "Identification": self.identification,
+            "Parameters": None,
+            "Authentication": self._generate_auth_parameter(authentication),
+        }
+
+    def _import_arguments(
+        self, operation_name: str, file_name: str, data_str: str, authentication: None | str | ClientCredential
+    ) -> dict[str, object]:
+        """Arguments of an Import request of suds"""
+        # Import(xs:string Operation, Identification Identification, Authentication Authentication, xs:string Filename,
+        #        xs:string Data)
+        return {
+            "Operation": operation_name,
+            "Identification": self.identification,
+            "Authentication": self._generate_auth_parameter(authentication),
+            "Filename": file_name,
+            "Data": data_str,
+        }
+
+    @staticmethod
+    def _import_result(
+        suds_response: SudsObject, auto_parse_response: bool, callbacks: ImportCallbacks | None
+    ) -> ImportResult | SudsObject:
+        """The result of an Import request: converted to an ImportResult, or the suds response when not parsed"""
+        return ImportResult.from_suds(suds_response, callbacks) if auto_parse_response else suds_response
+
+    @staticmethod
+    def _with_token(headers: dict[str, str], token: str | None) -> dict[str, str]:
+        """Add the auth header for OAuth2 requests to the HTTP headers, when there is a token"""
+        if token is not None:
+            headers["Authorization"] = f"Bearer {token}"
+        return headers
+
+    def _should_retry_with_new_token(self, authentication: None | str | ClientCredential, error: Exception) -> bool:
+        """Whether a failed request is sent again with a new token: only once, when the token was rejected"""
+        if not isinstance(authentication, ClientCredential) or not is_token_rejected(error):
+            return False
+
+        log.info("The token for %s was rejected, retrying the request with a new token", self.hostname)
+        return True
+
+    @staticmethod
+    def _raw_reply(response: HttpResponse) -> bytes:
+        """Check the status of a response of the raw engine, and return its body"""
+        if response.status >= 300:
+            # A SOAP fault is raised by the parser as a WebFault, like suds does. Anything else is a transport error.
+            try:
+                for _ in iter_result_events(response.body):
+                    pass
+            except ParseError:
+                pass
+            raise TransportError(response.reason, response.status, BytesIO(response.body))
+
+        return response.body
+
+    def _prepare_import(
+        self,
+        data: str | Iterable[dict[str, str]],
+        file_name: None | str = None,
+        documents: None | list[str] = None,
+    ) -> tuple[str, str]:
+        """Validate and prepare the data (and documents) of an import, see `prepare_import()`"""
+        return prepare_import(self, data, file_name, documents)
+
+
+class RelaticsWebservices(BaseRelaticsWebservices):
+    """
+    Class to communicate with Relatics webservices
+
+    Args:
+        company_subdomain : The company's subdomain (before ".relaticsonline.com")
+        workspace_id : The ID of the Relatics workspace were the request will be send to
+        user_agent : The user agent sent as part of the request. Will show up in the webservice-log in Relatics. Can
+            be used to distinguished different applications.
+        wsdl_cache : The cache used for the parsed WSDL. Defaults to the process-wide WSDL_CACHE, shared by all
+            instances.
+        connection_pool : The pool of keep-alive connections used for both the webservice and OAuth2 token requests.
+            Defaults to the process-wide DEFAULT_CONNECTION_POOL, shared by all instances.
+        engine : How the SOAP requests are built and their responses parsed: "suds" (default) uses the WSDL, "raw"
+            uses precompiled SOAP 1.2 envelopes and a streaming parser, without the WSDL.
+        resilience : Optional options for resilient requests:
+            * a retry policy, sending a request again after a transient failure with exponential backoff and jitter.
+              Imports are only retried when the server didn't process them, unless the policy allows it. Defaults
+              to no retries.
+            * a circuit breaker per hostname, failing fast with a CircuitOpenError while the server is degraded.
+            * a token bucket limiting the rate of requests per hostname and workspace.
+            * an adaptive limit on simultaneous requests per hostname and workspace, which grows while the latency
+              is stable and shrinks on failures and latency spikes.
+            * the limit on simultaneous requests per hostname of the batch methods. Defaults to the process-wide
+              DEFAULT_HOST_LIMITER, shared by all instances.
+
+    """
+
+    connection_pool: ConnectionPool
+    """The pool of keep-alive connections used for all requests"""
+    host_limiter: HostLimiter
+    """The limit on simultaneous requests per hostname, used by the batch methods"""
+
+    def __init__(
+        self,
+        company_subdomain: str,
+        workspace_id: UUID | str,
+        user_agent: str = USER_AGENT,
+        wsdl_cache: WsdlCache | None = None,
+        connection_pool: ConnectionPool | None = None,
+        engine: SoapEngine = "suds",
+        resilience: ResilienceOptions | None = None,
+    ):
+        super().__init__(company_subdomain, workspace_id, user_agent, wsdl_cache, engine, resilience)
+        self.connection_pool = DEFAULT_CONNECTION_POOL if connection_pool is None else connection_pool
+        host_limiter = None if resilience is None else resilience.host_limiter
+        self.host_limiter = DEFAULT_HOST_LIMITER if host_limiter is None else host_limiter
+
+    def _get_client(self, idempotent: bool = True) -> Client:
+        """Get a suds Client for a single request, based on the cached WSDL"""
+        return self.wsdl_cache.get_client(self.hostname, lambda: PooledTransport(self.connection_pool, idempotent))
+
+    def _token(self, authentication: None | str | ClientCredential) -> str | None:
+        """The token for OAuth2 requests, or None for other forms of authentication"""
+        if isinstance(authentication, ClientCredential):
+            return authentication.get_token(self.hostname, connection_pool=self.connection_pool)
+        return None
+
+    def _raw_request_headers(self, action: str, authentication: None | str | ClientCredential) -> dict[str, str]:
+        """HTTP headers of a request of the raw engine, including the token for OAuth2 requests"""
+        return self._with_token(self._raw_headers(action), self._token(authentication))
+
+    def _send_raw(self, action: str, envelope: bytes, authentication: None | str | ClientCredential) -> bytes:
+        """Send the envelope of the raw engine, and return the body of the response"""
+        headers = self._raw_request_headers(action, authentication)
+
+        response = self.connection_pool.request(
+            "POST", self.service_url, envelope, headers, idempotent=action == "GetResult"
+        )
+        return self._raw_reply(response)
+
+    def _send_with_retries(
+        self,
+        authentication: None | str | ClientCredential,
+        send: Callable[[], T],
+        idempotent: bool = True,
+        retry_imports: bool = True,
+    ) -> T:
+        """Call `send` according to the retry policy and circuit breaker, with a new token when it was rejected"""
+
+        def send_limited() -> T:
+            return self._send_limited(authentication, send)
+
+        return self.retry_policy.call(self.hostname, send_limited, idempotent, self.circuit_breaker, retry_imports)
+
+    def _send_limited(self, authentication: None | str | ClientCredential, send: Callable[[], T]) -> T:
+        """Call `send` once the rate limiter allows it, within the adaptive concurrency limit"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self.limiter_key)
+
+        if self.concurrency_limiter is None:
+            return self._with_token_retry(authentication, send)
+
+        with self.concurrency_limiter.limit(self.limiter_key):
+            return self._with_token_retry(authentication, send)
+
+    def _with_token_retry(self, authentication: None | str | ClientCredential, send: Callable[[], T]) -> T:
+        """Call `send`, and call it once more with a new token when the OAuth2 token was rejected"""
+        try:
+            return send()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            if not self._should_retry_with_new_token(authentication, error):
+                raise
+
+        authentication.get_token(  # type: ignore[union-attr]
+            self.hostname, force_refresh=True, connection_pool=self.connection_pool
+        )
+        return send()
+
+    def _stream_raw(
+        self, action: str, envelope: bytes, authentication: None | str | ClientCredential
+    ) -> Generator[bytes, None, None]:
+        """Send the envelope of the raw engine, and yield the body of the response in blocks while it is received"""
+
+        def start() -> tuple[Generator[bytes, None, None], bytes]:
+            # The status of the response is checked before the first block is returned
+            chunks = self._stream_raw_once(action, envelope, authentication)
+            try:
+                return chunks, next(chunks, b"")
+            except BaseException:
+                chunks.close()
+                raise
+
+        chunks, first_chunk = self._send_with_retries(authentication, start)
+        try:
+            yield first_chunk
+            yield from chunks
+        finally:
+            chunks.close()
+
+    def _stream_raw_once(
+        self, action: str, envelope: bytes, authentication: None | str | ClientCredential
+    ) -> Generator[bytes, None, None]:
+        headers = self._raw_request_headers(action, authentication)
+
+        with self.connection_pool.stream(
+            "POST", self.service_url, envelope, headers, idempotent=action == "GetResult"
+        ) as response:
+            if response.status >= 300:
+                # Raises the SOAP fault or transport error
+                self._raw_reply(
+                    HttpResponse(
+                        status=response.status,
+                        reason=response.reason,
+                        headers=dict(response.getheaders()),
+                        body=response.read(),
+                    )
+                )
+
+            yield from iter(lambda: response.read(PARSE_CHUNK_SIZE), b"")
+
     @overload
     def get_result(
         self,
@@ -335,100 +558,116 @@ class RelaticsWebservices:
         # Basic check of mandatory arguments
         self._check_operation_name(operation_name=operation_name)
 
-        headers = {"User-Agent": self.user_agent}
-        client = Client(self.wsdl_url)
+        def fetch() -> tuple[bytes, ExportResult | SudsObject]:
+            return self._send_with_retries(
+                authentication,
+                lambda: self._get_result(operation_name, parameters, authentication, auto_parse_response),
+            )
 
-        # Add parameter plugin to handle parameters, when those are set
-        if parameters is not None:
-            client.set_options(plugins=[AddParametersPlugin(parameters)])
+        if self.result_cache is None:
+            return fetch()[1]
 
-        # Add auth header for OAuth2 requests
-        if isinstance(authentication, ClientCredential):
-            headers["Authorization"] = f"Bearer {authentication.get_token(self.hostname)}"
+        key = self._result_cache_key(operation_name, parameters, authentication)
+        body, result = self.result_cache.get_or_fetch(key, operation_name, fetch, self._is_cacheable)
+        if result is not None:
+            return result
 
-        client.set_options(headers=headers)
+        # Every caller gets its own objects, parsed from the cached response by the same engine
+        return self._export_result(self._parse_result_body(body), auto_parse_response)
 
-        # Any parameters will be handled by the AddParametersPlugin, so don't pass them here
-        # GetResult(xs:string Operation, Identification Identification, Parameters Parameters,
-        #           Authentication Authentication)
-        suds_response = client.service.GetResult(
-            Operation=operation_name,
-            Identification=self.identification,
-            Parameters=None,
-            Authentication=self._generate_auth_parameter(authentication),
-        )
+    def _get_result(
+        self,
+        operation_name: str,
+        parameters: ParametersOrNone,
+        authentication: None | str | ClientCredential,
+        auto_parse_response: bool,
+    ) -> tuple[bytes, ExportResult | SudsObject]:
+        """Send a GetResult request, and return the body of the response together with the result parsed from it"""
+        if self.engine == "raw":
+            envelope = self._raw_get_result_envelope(operation_name, parameters, authentication)
+            body = self._send_raw("GetResult", envelope, authentication)
+            return body, self._export_result(parse_response(body), auto_parse_response)
 
-        if auto_parse_response:
-            # Parse the raw response into something useful
-            export_result = ExportResult.from_suds(suds_response)
-        else:
-            export_result = suds_response
+        reply_plugin = KeepReplyPlugin()
+        suds_response = self._get_result_suds(operation_name, parameters, authentication, [reply_plugin])
 
-        return export_result
+        return reply_plugin.reply, self._export_result(suds_response, auto_parse_response)  # type: ignore[return-value]
 
-    @staticmethod
-    def _generate_data_xml(data: list[dict[str, str]]) -> Document:
-        # Build data xml
-        root = Element("Import")
-        doc = Document(root)
+    def _parse_result_body(self, body: bytes) -> SudsObject:
+        """Parse the body of a GetResult response with the engine, without sending a request"""
+        if self.engine == "raw":
+            return parse_response(body)
 
-        for data_row in data:
-            row = Element("Row", parent=root)
-            for key, value in data_row.items():
-                row.set(name=key, value=value)
-            root.append(row)
+        return self._get_client().service.GetResult(__inject={"reply": body})
 
-        return doc
+    def _get_result_suds(
+        self,
+        operation_name: str,
+        parameters: ParametersOrNone,
+        authentication: None | str | ClientCredential,
+        plugins: list[MessagePlugin] | None = None,
+    ) -> SudsObject:
+        """Send a GetResult request with suds, and return the response"""
+        client = self._get_client()
+        plugins = [] if plugins is None else plugins
 
-    @staticmethod
-    def _generate_zip_b64(
-        prepared_data: str | Document,
-        documents: list[str],
-        file_basename: str,
-        file_extension: str,
-        keep_zip_file: bool,
-    ) -> str:
-        # Generate the full filename for the zip file
-        import_zip_path = os.path.join(gettempdir(), f"{file_basename}.zip")
+        # Add parameter plugin to handle parameters, when those are set
+        if parameters is not None:
+            plugins.append(AddParametersPlugin(parameters))
+        if plugins:
+            client.set_options(plugins=plugins)
 
-        # Create the zip file
-        with ZipFile(import_zip_path, "w") as import_zip:
-            # Add all the supplied documents
-            for document_path in documents:
-                archive_name = os.path.join("Documents", os.path.split(document_path)[1])
-                import_zip.write(filename=document_path, arcname=archive_name)
+        client.set_options(headers=self._with_token({"User-Agent": self.user_agent}, self._token(authentication)))
 
-            # Add the data file
-            if isinstance(prepared_data, Document):
-                import_zip.writestr(zinfo_or_arcname=f"{file_basename}.{file_extension}", data=prepared_data.str())
-            elif isinstance(prepared_data, str):
-                import_zip.write(filename=prepared_data, arcname=os.path.split(prepared_data)[1])
+        return client.service.GetResult(**self._get_result_arguments(operation_name, authentication))
 
-            # log.debug(f"Zip-file created {import_zip_path}: \n{pformat(import_zip.namelist(), indent=2)}")
-            log.debug("Zip-file created %s: \n%s", import_zip_path, pformat(import_zip.namelist(), indent=2))
+    def iter_result(
+        self,
+        operation_name: str,
+        parameters: ParametersOrNone = None,
+        authentication: None | str | ClientCredential = None,
+        row_depth: int = 1,
+        row_name: str | None = None,
+    ) -> ExportRows:
+        """
+        Retrieve results from a "Server for providing data" in Relatics as a stream of rows.
+
+        The response is parsed while it is received, and every row is yielded as a plain dict with the attributes of
+        its element. Memory use doesn't depend on the number of rows, so large reports can be processed row by row.
+        The request is sent when the iteration starts. Always uses the raw engine, regardless of `engine`.
 
-        # Cleanup references to the ZipFile
-        del import_zip
+        Args:
+            operation_name : The "OperationName" of the webservice to call
+            parameters : The parameters to pass to the webservice
+            authentication : Authentication for the webservice, either:
+                * None for no authentication,
+                * str for entryCode authentication or
+                * ClientCredential for OAuth2 client credentials
+            row_depth : The depth of the row elements below the report. Defaults to 1, the direct children of the
+                report.
+            row_name : Only yield the rows with this element name. Defaults to all elements at the `row_depth`.
 
-        # Convert zipfile to base64
-        with open(import_zip_path, "rb") as import_zip_file:
-            data_str = b64encode(import_zip_file.read()).decode("utf-8")
+        Returns:
+            ExportRows : Iterable over the rows, with the documents available once all rows are read
+        """
+        # Basic check of mandatory arguments
+        self._check_operation_name(operation_name=operation_name)
 
-        # Remove the zip file from disk
-        if not keep_zip_file:
-            os.remove(import_zip_path)
+        envelope = self._raw_get_result_envelope(operation_name, parameters, authentication)
 
-        return data_str
+        return ExportRows(lambda: self._stream_raw("GetResult", envelope, authentication), row_depth, row_name)
 
     @overload
-    def run_import(
+    def run_import(  # pylint: disable=R0913
         self,
         operation_name: str,
-        data: str | list[dict[str, str]],
+        data: str | Iterable[dict[str, str]],
         authentication: None | str | ClientCredential = None,
         file_name: None | str = None,
         documents: None | list[str] = None,
         auto_parse_response: bool = True,
+        callbacks: ImportCallbacks | None = None,
+        resubmit: ResubmitOptions | None = None,
     ) -> ImportResult:
         ...
 
@@ -436,11 +675,12 @@ class RelaticsWebservices:
     def run_import(
         self,
         operation_name: str,
-        data: str | list[dict[str, str]],
+        data: str | Iterable[dict[str, str]],
         authentication: None | str | ClientCredential = None,
         file_name: None | str = None,
         documents: None | list[str] = None,
         auto_parse_response: bool = False,
+        callbacks: ImportCallbacks | None = None,
     ) -> SudsObject:
         ...
 
@@ -448,21 +688,25 @@ class RelaticsWebservices:
     def run_import(
         self,
         operation_name: str,
-        data: str | list[dict[str, str]],
+        data: str | Iterable[dict[str, str]],
         authentication: None | str | ClientCredential = None,
         file_name: None | str = None,
         documents: None | list[str] = None,
+        callbacks: ImportCallbacks | None = None,
+        resubmit: ResubmitOptions | None = None,
     ) -> ImportResult:
         ...
 
-    def run_import(
+    def run_import(  # pylint: disable=R0913
         self,
         operation_name: str,
-        data: str | list[dict[str, str]],
+        data: str | Iterable[dict[str, str]],
         authentication: None | str | ClientCredential = None,
         file_name: None | str = None,
         documents: None | list[str] = None,
         auto_parse_response: bool = True,
+        callbacks: ImportCallbacks | None = None,
+        resubmit: ResubmitOptions | None = None,
     ) -> ImportResult | SudsObject:
         """
         Retrieve results from a "Server for providing data" in Relatics, with checking of the results
@@ -476,6 +720,8 @@ class RelaticsWebservices:
                 {"name": "Object 2", "description": "Ut enim ad minim veniam."},
             ]
             ```
+        * any other iterable of `dict[str, str]`, like a generator. The rows are streamed into the request one at a
+          time, so they don't need to fit in memory as a list.
 
         Args:
             operation_name : The "OperationName" of the webservice to call
@@ -490,6 +736,12 @@ class RelaticsWebservices:
             documents : Optional list of filepaths to include in the import. Must be unique names.
                 See https://kb.relaticsonline.com/published/ShowObject.aspx?Key=7126fb9d-58df-e311-9406-00155de0940e
             auto_parse_response : Convert the return object for easy access
+            callbacks : Optional callbacks, fired for every message and element while the response is parsed. Requires
+                a parsed response. The import is then only retried when the server didn't process it, so the callbacks
+                never fire twice for the same message.
+            resubmit : Optional options to resubmit only the rows with an error message, for at most
+                `max_resubmits` rounds. Requires rows as data and a parsed response. The callbacks only fire for the
+                first submission, and must keep the messages to find the failed rows.
 
         Returns:
             ImportResult : Result object when the retrieved response is parsed
@@ -498,93 +750,232 @@ class RelaticsWebservices:
         # Basic check of mandatory arguments
         self._check_operation_name(operation_name=operation_name)
 
-        if not data:
-            # Above "if" checks for both empty str or empty list,
-            # see https://docs.python.org/3/library/stdtypes.html#truth-value-testing
-            raise ValueError("Supplied data is empty.")
-        if not isinstance(data, list) and not isinstance(data, str):
-            raise TypeError("Invalid type of data supplied.")
-        if documents:
-            # Detect duplicate names. Remove duplicate tails in the path with set(). Optimized with set comprehension.
-            if len({os.path.split(path)[1] for path in documents}) != len(documents):
-                raise ValueError("Duplicate filenames in document list.")
+        self._check_import_options(auto_parse_response, callbacks)
 
-        headers = {"User-Agent": self.user_agent}
-        file_extension = None
+        if resubmit is not None:
+            rows = resubmit_rows(data, resubmit, auto_parse_response, callbacks)
+            return self._run_import_resubmitting(
+                operation_name, rows, authentication, file_name, documents, resubmit, callbacks
+            )
 
-        client = Client(self.wsdl_url)
+        file_name, data_str = self._prepare_import(data=data, file_name=file_name, documents=documents)
 
-        # Prepare the data part
-        if isinstance(data, list):
-            # Set appropriate filename
-            file_extension = "xml"
+        # The prepared payload is reused when the request is sent again. Callbacks can't be taken back, so then the
+        # import is only sent again when the server didn't process it, regardless of `retry_imports`.
+        def send() -> ImportResult | SudsObject:
+            return self._send_import(
+                operation_name, file_name, data_str, authentication, auto_parse_response, callbacks
+            )
 
-            # Build data xml
-            prepared_data = self._generate_data_xml(data)
+        return self._send_with_retries(authentication, send, idempotent=False, retry_imports=callbacks is None)
 
-        else:
-            # Set appropriate filename, based on the given filename in "data"
-            file_extension = os.path.splitext(data)[1][1:]
+    def _run_import_resubmitting(
+        self,
+        operation_name: str,
+        rows: list[dict[str, str]],
+        authentication: None | str | ClientCredential,
+        file_name: None | str,
+        documents: None | list[str],
+        resubmit: ResubmitOptions,
+        callbacks: ImportCallbacks | None,
+    ) -> ImportResult:
+        """Send the rows, and resubmit only the rows with an error message. See `run_import()`"""
+        result = self.run_import(operation_name, rows, authentication, file_name, documents, callbacks=callbacks)
 
-            # Validate if given extensions is supported
-            if file_extension not in SUPPORTED_EXTENSIONS:
-                raise TypeError("Supplied file has unsupported file extension.")
+        round_number = 1
+        while failed := next_resubmit(operation_name, result, rows, round_number, resubmit.max_resubmits):
+            resubmitted = self.run_import(
+                operation_name, [rows[index] for index in failed], authentication, file_name, documents
+            )
+            result = result.replace_rows(failed, resubmitted)
+            round_number += 1
 
-            prepared_data = data
+        return result
 
-        # Set appropriate filename
-        if file_name is None:
-            file_basename = f"{IMPORT_BASENAME}"
-        else:
-            # Clean any possible path from the filename and remove a possible extension
-            file_basename = os.path.splitext(os.path.split(file_name)[1])[0]
-
-        # Choose how to create the base64 data: when document are supplied, create a zip; otherwise
-        # use the file or xml data
-        if documents is not None:
-            # Generate the base64 encoded zip-file
-            data_str = self._generate_zip_b64(
-                prepared_data=prepared_data,
-                documents=documents,
-                file_basename=file_basename,
-                file_extension=file_extension,
-                keep_zip_file=self.keep_zip_file,
-            )
+    def _send_import(
+        self,
+        operation_name: str,
+        file_name: str,
+        data_str: str,
+        authentication: None | str | ClientCredential,
+        auto_parse_response: bool,
+        callbacks: ImportCallbacks | None = None,
+    ) -> ImportResult | SudsObject:
+        if self.engine == "raw":
+            envelope = self._raw_import_envelope(operation_name, file_name, data_str, authentication)
+            if callbacks is not None:
+                # Parse the response while it is received, so the callbacks fire as soon as possible
+                with closing(self._stream_raw_once("Import", envelope, authentication)) as chunks:
+                    return parse_import_response(chunks, callbacks)
 
-            # Set the file extension to zip
-            file_extension = "zip"
+            body = self._send_raw("Import", envelope, authentication)
+            return parse_import_response(body) if auto_parse_response else parse_response(body)
 
-        else:  # documents is None
-            if isinstance(data, list):
-                # Convert previously generated xml to base64
-                data_str = b64encode(bytes(prepared_data.str(), "utf-8")).decode("utf-8")
+        client = self._get_client(idempotent=False)
+        client.set_options(headers=self._with_token({"User-Agent": self.user_agent}, self._token(authentication)))
 
-            else:
-                # Convert supplied data file to base64
-                with open(data, "rb") as data_file:
-                    data_str = b64encode(data_file.read()).decode("utf-8")
+        arguments = self._import_arguments(operation_name, file_name, data_str, authentication)
+        suds_response = client.service.Import(**arguments)
+        # KNOWLEDGE: Convert sudsobject to dict: client.dict(sudsobject)
 
-        # Add auth header for OAuth2 requests
-        if isinstance(authentication, ClientCredential):
-            headers["Authorization"] = f"Bearer {authentication.get_token(self.hostname)}"
+        return self._import_result(suds_response, auto_parse_response, callbacks)
 
-        client.set_options(headers=headers)
+    def _run_many(
+        self,
+        jobs: Iterable[tuple[str, Any]],
+        run_job: Callable[[tuple[str, Any]], ExportResult | ImportResult],
+        max_workers: int,
+    ) -> Iterator[BatchResult]:
+        """Run the jobs on a bounded pool of worker threads and yield the results as they complete"""
+        return run_batch(jobs, run_job, max_workers, self.host_limiter, self.hostname)
+
+    def get_results_many(
+        self,
+        jobs: Iterable[tuple[str, ParametersOrNone]],
+        authentication: None | str | ClientCredential = None,
+        max_workers: int = 8,
+    ) -> Iterator[BatchResult]:
+        """
+        Retrieve results for many jobs concurrently, from "Servers for providing data" in Relatics.
 
-        # Import(xs:string Operation, Identification Identification, Authentication Authentication, xs:string Filename,
-        #        xs:string Data)
-        suds_response = client.service.Import(
-            Operation=operation_name,
-            Identification=self.identification,
-            Authentication=self._generate_auth_parameter(authentication),
-            Filename=f"{file_basename}.{file_extension}",
-            Data=data_str,
+        The jobs run on a bounded pool of worker threads, while the number of simultaneous requests to the Relatics
+        host is limited by `host_limiter`. Results are yielded as they complete, so not in the order of the jobs. An
+        exception raised by a job doesn't stop the batch, but is stored in its BatchResult.
+
+        Args:
+            jobs : The jobs, each a tuple of the "OperationName" and the parameters (or None) for the webservice
+            authentication : Authentication for the webservices, see `get_result()`
+            max_workers : Maximum number of worker threads. Defaults to 8.
+
+        Returns:
+            Iterator[BatchResult] : The result of each job, linked to the job and its index
+        """
+        return self._run_many(
+            jobs,
+            lambda job: self.get_result(operation_name=job[0], parameters=job[1], authentication=authentication),
+            max_workers,
         )
-        # KNOWLEDGE: Convert sudsobject to dict: client.dict(sudsobject)
 
-        if auto_parse_response:
-            # Parse the raw response into something useful
-            import_result = ImportResult.from_suds(suds_response)
-        else:
-            import_result = suds_response
+    def run_imports_many(
+        self,
+        jobs: Iterable[tuple[str, str | Iterable[dict[str, str]]]],
+        authentication: None | str | ClientCredential = None,
+        max_workers: int = 8,
+    ) -> Iterator[BatchResult]:
+        """
+        Send data to many "Servers for receiving data" in Relatics concurrently.
+
+        Behaves like `get_results_many()`, but each job is run with `run_import()`.
+
+        Args:
+            jobs : The jobs, each a tuple of the "OperationName" and the data for the import, see `run_import()`
+            authentication : Authentication for the webservices, see `run_import()`
+            max_workers : Maximum number of worker threads. Defaults to 8.
 
-        return import_result
+        Returns:
+            Iterator[BatchResult] : The result of each job, linked to the job and its index
+        """
+        return self._run_many(
+            jobs,
+            lambda job: self.run_import(operation_name=job[0], data=job[1], authentication=authentication),
+            max_workers,
+        )
+
+    def run_import_chunked(
+        self,
+        operation_name: str,
+        data: Iterable[dict[str, str]],
+        authentication: None | str | ClientCredential = None,
+        file_name: None | str = None,
+        max_rows: int | None = 1000,
+        max_bytes: int | None = None,
+        max_workers: int = 1,
+    ) -> ImportResult:
+        """
+        Send a large list of rows to a "Server for receiving data" in Relatics, split into chunks.
+
+        Every chunk is sent as a separate import, so a large import doesn't hit a timeout on the server, and a failing
+        chunk doesn't cost the whole import. The chunks are sent one after the other, or with `max_workers` above 1
+        in parallel (limited per host by `host_limiter`). The results are merged into a single ImportResult, with the
+        row numbers of the messages remapped to the rows in `data`.
+
+        A chunk that raises an exception doesn't stop the other chunks, but marks the merged result as failed.
+
+        Args:
+            operation_name : The "OperationName" of the webservice to call
+            data : The rows to send to the import, see `run_import()`
+            authentication : Authentication for the webservice, see `run_import()`
+            file_name : Filename send to Relatics, see `run_import()`
+            max_rows : Maximum number of rows per chunk. None for no limit. Defaults to 1000.
+            max_bytes : Maximum size in bytes of the (base64 encoded) data of a chunk. None for no limit.
+            max_workers : Number of chunks sent simultaneously. Defaults to 1, to send them one after the other.
+
+        Returns:
+            ImportResult : Merged result of all the chunks
+        """
+        # Basic check of mandatory arguments
+        self._check_operation_name(operation_name=operation_name)
+
+        row_offsets: list[int] = []
+        batch_results = self._run_many(
+            chunk_jobs(operation_name, data, max_rows, max_bytes, row_offsets),
+            lambda job: self.run_import(
+                operation_name=job[0], data=job[1], authentication=authentication, file_name=file_name
+            ),
+            max_workers,
+        )
+
+        return merge_chunks(operation_name, batch_results, row_offsets)
+
+    def run_import_delta(
+        self,
+        operation_name: str,
+        data: Iterable[dict[str, str]],
+        key_column: str,
+        state: DeltaState,
+        authentication: None | str | ClientCredential = None,
+        file_name: None | str = None,
+        documents: None | list[str] = None,
+    ) -> ImportResult:
+        """
+        Send only the rows that were added or changed since the last successful import to a "Server for receiving
+        data" in Relatics.
+
+        The rows are identified by the value of `key_column`, and compared by a hash of their contents with the rows of
+        the previous imports, kept in `state` per hostname, workspace and operation. The hashes of the sent rows are
+        only committed to the state when the import succeeded, so after a failed import the same rows are sent again.
+        Likewise, rows with an error message are sent again by the next import.
+        Documents aren't compared, only the rows referring to them.
+
+        Args:
+            operation_name : The "OperationName" of the webservice to call
+            data : The rows to send to the import, see `run_import()`
+            key_column : The column with the value that identifies a row
+            state : The state of the previous imports
+            authentication : Authentication for the webservice, see `run_import()`
+            file_name : Filename send to Relatics, see `run_import()`
+            documents : Documents to include, see `run_import()`
+
+        Returns:
+            ImportResult : Result of the import of the changed rows. Without messages and with 0 total rows when no
+                row changed, since nothing is sent then.
+        """
+        # Basic check of mandatory arguments
+        self._check_operation_name(operation_name=operation_name)
+
+        scope = f"{self.hostname}/{self.workspace_id}/{operation_name}"
+        rows, pending = state.changed_rows(scope, data, key_column)
+
+        if not rows:
+            log.info("Import %s has no changed rows, nothing was sent.", operation_name)
+            return ImportResult(total_rows=0)
+
+        result = self.run_import(
+            operation_name=operation_name,
+            data=rows,
+            authentication=authentication,
+            file_name=file_name,
+            documents=documents,
+        )
+        commit_delta(state, scope, rows, pending, key_column, result)
+        return result
@@ -0,0 +1,362 @@
+from abc import ABC
+from abc import abstractmethod
+from array import array
+from dataclasses import dataclass
+from datetime import time as dt_time
+from functools import lru_cache
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import Literal
+from typing import MutableSequence
+from typing import Sequence
+from typing import TypeAlias
+from typing import TypeVar
+from typing import overload
+
+from colorama import Fore
+
+# Type aliases
+ImportMessageStatus: TypeAlias = Literal["Progress", "Comment", "Success", "Warning", "Error"]
+ImportElementActions: TypeAlias = Literal["Add", "Update"]
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=1024)
+def _parse_time(value: str) -> dt_time:
+    """Parse the time of a message. Cached, since the messages of an import share a limited number of times."""
+    return dt_time.fromisoformat(value)
+
+
+@dataclass(kw_only=True, slots=True)
+class ImportMessage:
+    """
+    Data class for a message in the result of an import
+    """
+
+    time: dt_time | str
+    status: ImportMessageStatus
+    message: str
+    row: int
+
+    status_fore_color = {
+        "Progress": Fore.BLUE,
+        "Comment": Fore.RESET,
+        "Success": Fore.GREEN,
+        "Warning": Fore.YELLOW,
+        "Error": Fore.RED,
+    }
+
+    def __post_init__(self):
+        """
+        Convert a date given as string into a date
+        """
+        if isinstance(self.time, str):
+            self.time = _parse_time(self.time)
+
+    def __str__(self) -> str:
+        status_color = self.status_fore_color[self.status]
+        return f"{self.time}  {self.row:05}  {status_color}{self.status:<8}{Fore.RESET}  {self.message}"
+
+
+@dataclass(kw_only=True, slots=True)
+class ImportElement:
+    """
+    Data class for a changed element in the result of an import
+    """
+
+    action: ImportElementActions
+    id: str  # pylint: disable=invalid-name
+    foreign_key: str
+
+    def __str__(self) -> str:
+        return f"{self.action:<6}  {self.id}  {self.foreign_key}"
+
+
+class _Codes:  # pylint: disable=R0903
+    """Interning of repeated strings, like statuses and times, as small integer codes"""
+
+    __slots__ = ("names", "_codes")
+
+    def __init__(self, names: Iterable[str] = ()) -> None:
+        self.names: list[str] = []
+        self._codes: dict[str, int] = {}
+        for name in names:
+            self.code(name)
+
+    def code(self, name: str) -> int:
+        """The code of the name, adding the name when it doesn't have a code yet"""
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+class _Columns(MutableSequence[T], ABC):
+    """
+    Base class of a list of dataclass instances, stored as columns instead of an object per item.
+
+    Items are converted into columns when they are added, and views are created on demand when they are read. A view
+    is a new object every time, so changing it doesn't change the list: assign the changed item back to store it.
+
+    Behaves like a list, including `+`, `sort()` and `copy()`. Only `dataclasses.asdict()` of a result holding the
+    list keeps it as a copy of this list, instead of converting the items into dicts.
+    """
+
+    __slots__ = ("_version",)
+
+    def __init__(self, items: Iterable[T] = ()) -> None:
+        # Subclasses create their columns first
+        self._version = 0
+        self.extend(items)
+
+    @property
+    def version(self) -> int:
+        """Number of changes to the list other than adding items at the end, so moved or replaced items are detected"""
+        return self._version
+
+    @abstractmethod
+    def _columns(self) -> tuple[MutableSequence, ...]:
+        """The columns of the list, in the order of the values returned by `_encode()`"""
+
+    @abstractmethod
+    def _encode(self, item: T) -> tuple:
+        """The values of the item for each of the columns"""
+
+    @abstractmethod
+    def _view(self, index: int) -> T:
+        """A new item, created from the values in the columns at the index"""
+
+    def __len__(self) -> int:
+        return len(self._columns()[0])
+
+    @overload
+    def __getitem__(self, index: int) -> T:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[T]:
+        ...
+
+    def __getitem__(self, index: int | slice) -> T | list[T]:
+        if isinstance(index, slice):
+            return [self._view(position) for position in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("list index out of range")
+        return self._view(index)
+
+    def __iter__(self) -> Iterator[T]:
+        for position in range(len(self)):
+            yield self._view(position)
+
+    def __setitem__(self, index: int | slice, value: Any) -> None:
+        self._version += 1
+        if isinstance(index, slice):
+            encoded = [self._encode(item) for item in value]
+            for position, column in enumerate(self._columns()):
+                values = [item[position] for item in encoded]
+                column[index] = array(column.typecode, values) if isinstance(column, array) else values
+        else:
+            for column, column_value in zip(self._columns(), self._encode(value)):
+                column[index] = column_value
+
+    def __delitem__(self, index: int | slice) -> None:
+        self._version += 1
+        for column in self._columns():
+            del column[index]
+
+    def insert(self, index: int, value: T) -> None:
+        self._version += 1
+        for column, column_value in zip(self._columns(), self._encode(value)):
+            column.insert(index, column_value)
+
+    def append(self, value: T) -> None:
+        for column, column_value in zip(self._columns(), self._encode(value)):
+            column.append(column_value)
+
+    def __add__(self, other: Iterable[T]) -> "_Columns[T]":
+        if not isinstance(other, (list, _Columns)):
+            return NotImplemented
+        combined = self.copy()
+        combined.extend(other)
+        return combined
+
+    def __radd__(self, other: Iterable[T]) -> "_Columns[T]":
+        if not isinstance(other, list):
+            return NotImplemented
+        combined = type(self)(other)
+        combined.extend(self)
+        return combined
+
+    def copy(self) -> "_Columns[T]":
+        """A shallow copy of the list, like `list.copy()`"""
+        return type(self)(self)
+
+    def sort(self, *, key: Callable[[T], Any] | None = None, reverse: bool = False) -> None:
+        """Sort the items in place, like `list.sort()`"""
+        self[:] = sorted(self, key=key, reverse=reverse)  # type: ignore[arg-type,type-var]
+
+    def clear(self) -> None:
+        self._version += 1
+        for column in self._columns():
+            del column[:]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(item == other_item for item, other_item in zip(self, other))
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class ImportMessages(_Columns[ImportMessage]):
+    """
+    Compact list of the messages of an import, stored as columns: the status and time as interned codes, the row
+    number in an array and the text of the message.
+
+    The messages are ImportMessage views, created when they are read. Their time is only parsed then.
+    """
+
+    __slots__ = ("_statuses", "_status_codes", "_times", "_time_codes", "_rows", "_texts")
+
+    def __init__(self, messages: Iterable[ImportMessage] = ()):
+        self._status_codes = _Codes()
+        self._time_codes = _Codes()
+        self._statuses = array("H")
+        self._times = array("L")
+        self._rows = array("q")
+        self._texts: list[str] = []
+        super().__init__(messages)
+
+    def _columns(self) -> tuple[MutableSequence, ...]:
+        return self._statuses, self._times, self._rows, self._texts
+
+    def _encode(self, item: ImportMessage) -> tuple[int, int, int, str]:
+        time = item.time if isinstance(item.time, str) else item.time.isoformat()
+        return self._status_codes.code(item.status), self._time_codes.code(time), item.row, item.message
+
+    def add(self, time: str, status: str, message: str, row: int) -> None:
+        """Add a message, without creating an ImportMessage or parsing its time"""
+        self._statuses.append(self._status_codes.code(status))
+        self._times.append(self._time_codes.code(time))
+        self._rows.append(row)
+        self._texts.append(message)
+
+    def _view(self, index: int) -> ImportMessage:
+        return ImportMessage(
+            time=_parse_time(self._time_codes.names[self._times[index]]),
+            status=self._status_codes.names[self._statuses[index]],  # type: ignore[arg-type]
+            message=self._texts[index],
+            row=self._rows[index],
+        )
+
+    def status(self, index: int) -> str:
+        """The status of the message at the index, without creating a view"""
+        return self._status_codes.names[self._statuses[index]]
+
+    def row(self, index: int) -> int:
+        """The row number of the message at the index, without creating a view"""
+        return self._rows[index]
+
+    def to_json(self) -> dict[str, list]:
+        """The columns as plain JSON values, with the names of the codes. Restored by `from_json()`."""
+        return {
+            "statuses": self._status_codes.names,
+            "times": self._time_codes.names,
+            "status": self._statuses.tolist(),
+            "time": self._times.tolist(),
+            "row": self._rows.tolist(),
+            "text": self._texts,
+        }
+
+    @classmethod
+    def from_json(cls, columns: dict[str, list]) -> "ImportMessages":
+        """
+        Create the messages from their columns, as returned by `to_json()`.
+
+        Args:
+            columns : The columns as plain JSON values
+
+        Returns:
+            ImportMessages : The restored messages
+        """
+        messages = cls()
+        messages._status_codes = _Codes(columns["statuses"])
+        messages._time_codes = _Codes(columns["times"])
+        messages._statuses.extend(columns["status"])
+        messages._times.extend(columns["time"])
+        messages._rows.extend(columns["row"])
+        messages._texts.extend(columns["text"])
+        return messages
+
+
+class ImportElements(_Columns[ImportElement]):
+    """
+    Compact list of the changed elements of an import, stored as columns: the action as interned code, the ID and the
+    foreign key.
+
+    The elements are ImportElement views, created when they are read.
+    """
+
+    __slots__ = ("_actions", "_action_codes", "_ids", "_foreign_keys")
+
+    def __init__(self, elements: Iterable[ImportElement] = ()):
+        self._action_codes = _Codes()
+        self._actions = array("H")
+        self._ids: list[str] = []
+        self._foreign_keys: list[str] = []
+        super().__init__(elements)
+
+    def _columns(self) -> tuple[MutableSequence, ...]:
+        return self._actions, self._ids, self._foreign_keys
+
+    def _encode(self, item: ImportElement) -> tuple[int, str, str]:
+        return self._action_codes.code(item.action), item.id, item.foreign_key
+
+    def add(self, action: str, id: str, foreign_key: str) -> None:  # pylint: disable=W0622
+        """Add an element, without creating an ImportElement"""
+        self._actions.append(self._action_codes.code(action))
+        self._ids.append(id)
+        self._foreign_keys.append(foreign_key)
+
+    def _view(self, index: int) -> ImportElement:
+        return ImportElement(
+            action=self._action_codes.names[self._actions[index]],  # type: ignore[arg-type]
+            id=self._ids[index],
+            foreign_key=self._foreign_keys[index],
+        )
+
+    def to_json(self) -> dict[str, list]:
+        """The columns as plain JSON values, with the names of the codes. Restored by `from_json()`."""
+        return {
+            "actions": self._action_codes.names,
+            "action": self._actions.tolist(),
+            "id": self._ids,
+            "foreign_key": self._foreign_keys,
+        }
+
+    @classmethod
+    def from_json(cls, columns: dict[str, list]) -> "ImportElements":
+        """
+        Create the elements from their columns, as returned by `to_json()`.
+
+        Args:
+            columns : The columns as plain JSON values
+
+        Returns:
+            ImportElements : The restored elements
+        """
+        elements = cls()
+        elements._action_codes = _Codes(columns["actions"])
+        elements._actions.extend(columns["action"])
+        elements._ids.extend(columns["id"])
+        elements._foreign_keys.extend(columns["foreign_key"])
+        return elements
@@ -0,0 +1,342 @@
+import asyncio
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from dataclasses import dataclass
+from dataclasses import replace
+from logging import getLogger
+from threading import BoundedSemaphore
+from threading import Condition
+from threading import Lock
+from time import monotonic
+from time import sleep
+from typing import Any
+from typing import AsyncIterator
+from typing import Callable
+from typing import Hashable
+from typing import Iterable
+from typing import Iterator
+
+from .result_classes import BatchResult
+from .result_classes import ExportResult
+from .result_classes import ImportResult
+from .retry import CircuitBreaker
+from .retry import RetryPolicy
+from .retry import is_transient
+
+log = getLogger(__name__)
+
+
+class HostLimiter:
+    """
+    Thread-safe limit on the number of simultaneous requests per hostname.
+
+    Args:
+        max_concurrent_per_host : Maximum number of simultaneous requests per hostname. Defaults to 4.
+    """
+
+    max_concurrent_per_host: int
+    """Maximum number of simultaneous requests per hostname"""
+
+    def __init__(self, max_concurrent_per_host: int = 4):
+        if max_concurrent_per_host < 1:
+            raise ValueError("The 'max_concurrent_per_host' must be at least 1.")
+
+        self.max_concurrent_per_host = max_concurrent_per_host
+        self._lock = Lock()
+        self._semaphores: dict[str, BoundedSemaphore] = {}
+
+    @contextmanager
+    def limit(self, hostname: str) -> Iterator[None]:
+        """Context manager that waits until a request to the hostname is allowed, and holds it until exit"""
+        with self._lock:
+            semaphore = self._semaphores.setdefault(hostname, BoundedSemaphore(self.max_concurrent_per_host))
+
+        with semaphore:
+            yield
+
+
+DEFAULT_HOST_LIMITER = HostLimiter()
+"""Default per-host limit, shared by all RelaticsWebservices instances"""
+
+
+def run_batch(
+    jobs: Iterable[tuple[str, Any]],
+    run_job: Callable[[tuple[str, Any]], ExportResult | ImportResult],
+    max_workers: int,
+    host_limiter: HostLimiter,
+    hostname: str,
+) -> Iterator[BatchResult]:
+    """
+    Run the jobs on a bounded pool of worker threads and yield the results as they complete.
+
+    Args:
+        jobs : The jobs, each a tuple of the "OperationName" and its parameters or data
+        run_job : Callable running a single job
+        max_workers : Maximum number of worker threads
+        host_limiter : The limit on simultaneous requests to the hostname
+        hostname : The hostname the jobs send their requests to
+
+    Returns:
+        Iterator[BatchResult] : The result of each job, linked to the job and its index
+    """
+
+    def run_limited(index: int, job: tuple[str, Any]) -> BatchResult:
+        with host_limiter.limit(hostname):
+            try:
+                return BatchResult(index=index, job=job, result=run_job(job))
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                log.warning("Job %s of the batch (%s) failed: %s", index, job[0], exc)
+                return BatchResult(index=index, job=job, exception=exc)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pyrelatics2-batch") as executor:
+        pending: set[Future[BatchResult]] = set()
+        for index, job in enumerate(jobs):
+            # Only keep a limited number of jobs queued, so large or lazy job lists aren't consumed at once
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (future.result() for future in done)
+            pending.add(executor.submit(run_limited, index, job))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (future.result() for future in done)
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket per key, limiting the rate of requests.
+
+    Every request takes a token from the bucket of its key (like a hostname and workspace). The bucket refills at
+    `rate` tokens per second, up to `burst` tokens. When the bucket is empty, the request waits for its turn.
+
+    Args:
+        rate : Number of requests per second per key
+        burst : Number of requests that can be sent at once, after a quiet period. Defaults to `rate`, but at least 1.
+    """
+
+    rate: float
+    """Number of requests per second per key"""
+    burst: float
+    """Number of requests that can be sent at once, after a quiet period"""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        if rate <= 0:
+            raise ValueError("The 'rate' must be larger than 0.")
+
+        self.rate = rate
+        self.burst = max(1.0, rate if burst is None else burst)
+        self._lock = Lock()
+        # Tokens left in the bucket per key, and the moment they were counted
+        self._buckets: dict[Hashable, tuple[float, float]] = {}
+
+    def _reserve(self, key: Hashable) -> float:
+        """Take a token from the bucket of the key, and return the seconds to wait until it is available"""
+        with self._lock:
+            now = monotonic()
+            tokens, counted_at = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - counted_at) * self.rate) - 1
+            self._buckets[key] = (tokens, now)
+
+        # A negative number of tokens is the queue of requests waiting for their turn
+        return max(0.0, -tokens / self.rate)
+
+    def acquire(self, key: Hashable) -> None:
+        """Wait until a request for the key is allowed"""
+        delay = self._reserve(key)
+        if delay > 0:
+            log.debug("Rate limit reached for %s, waiting %.3f seconds", key, delay)
+            sleep(delay)
+
+    async def acquire_async(self, key: Hashable) -> None:
+        """Wait until a request for the key is allowed, without blocking the event loop"""
+        delay = self._reserve(key)
+        if delay > 0:
+            log.debug("Rate limit reached for %s, waiting %.3f seconds", key, delay)
+            await asyncio.sleep(delay)
+
+
+@dataclass(slots=True)
+class AdaptiveStatistics:
+    """
+    Data class with the statistics of an AdaptiveLimiter
+    """
+
+    increases: int = 0
+    """Number of times a limit grew, after a request with a stable latency"""
+    decreases: int = 0
+    """Number of times a limit shrank, after a failed request or a latency spike"""
+
+
+class AdaptiveLimiter:
+    """
+    Thread-safe limit on the number of simultaneous requests per key, adapting to the server (AIMD).
+
+    While the latency of the requests is stable, the limit of the key grows by one for every full limit of successful
+    requests (additive increase). A transient failure (like a connection error or a throttling status) or a latency
+    of more than `latency_tolerance` times the average, shrinks the limit by `backoff_ratio` (multiplicative
+    decrease). Other errors, like SOAP faults, don't change the limit.
+
+    Works for threads and asyncio tasks, even when they share the same instance.
+
+    Args:
+        initial_limit : The limit of a key, before any request was made. Defaults to 4.
+        min_limit : The lowest limit. Defaults to 1.
+        max_limit : The highest limit. Defaults to 64.
+        backoff_ratio : Factor the limit is multiplied with on a failure or latency spike. Defaults to 0.5.
+        latency_tolerance : Latency relative to the average that counts as a spike. Defaults to 2.
+    """
+
+    min_limit: int
+    """The lowest limit"""
+    max_limit: int
+    """The highest limit"""
+    backoff_ratio: float
+    """Factor the limit is multiplied with on a failure or latency spike"""
+    latency_tolerance: float
+    """Latency relative to the average that counts as a spike"""
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff_ratio: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("The limits must satisfy 1 <= 'min_limit' <= 'initial_limit' <= 'max_limit'.")
+        if not 0 < backoff_ratio < 1:
+            raise ValueError("The 'backoff_ratio' must be between 0 and 1.")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self._initial_limit = float(initial_limit)
+        self._lock = Lock()
+        self._condition = Condition(self._lock)
+        self._limits: dict[Hashable, float] = {}
+        self._in_flight: dict[Hashable, int] = {}
+        self._latencies: dict[Hashable, float] = {}
+        self._async_waiters: dict[Hashable, list[asyncio.Future]] = {}
+        self._statistics = AdaptiveStatistics()
+
+    @property
+    def statistics(self) -> AdaptiveStatistics:
+        """A snapshot of the statistics of the limiter"""
+        with self._lock:
+            return replace(self._statistics)
+
+    def current_limit(self, key: Hashable) -> int:
+        """The current limit on simultaneous requests for the key"""
+        with self._lock:
+            return int(self._limits.get(key, self._initial_limit))
+
+    def _try_acquire(self, key: Hashable) -> bool:
+        """Take a slot for the key when one is free. Must be called with the lock held."""
+        in_flight = self._in_flight.get(key, 0)
+        if in_flight >= int(self._limits.get(key, self._initial_limit)):
+            return False
+        self._in_flight[key] = in_flight + 1
+        return True
+
+    def _release(self, key: Hashable, latency: float, error: BaseException | None) -> None:
+        """Free the slot of the key, and adapt its limit to the outcome of the request"""
+        with self._lock:
+            self._in_flight[key] -= 1
+            limit = self._limits.get(key, self._initial_limit)
+            average = self._latencies.get(key)
+
+            if (error is not None and is_transient(error)) or (
+                error is None and average is not None and latency > average * self.latency_tolerance
+            ):
+                new_limit = max(float(self.min_limit), limit * self.backoff_ratio)
+                if int(new_limit) < int(limit):
+                    self._statistics.decreases += 1
+                    log.info("Concurrency limit for %s decreased to %d", key, int(new_limit))
+                self._limits[key] = new_limit
+            elif error is None:
+                new_limit = min(float(self.max_limit), limit + 1 / limit)
+                if int(new_limit) > int(limit):
+                    self._statistics.increases += 1
+                    log.debug("Concurrency limit for %s increased to %d", key, int(new_limit))
+                self._limits[key] = new_limit
+
+            if error is None:
+                # Exponentially weighted moving average of the latency, spikes only count partly
+                self._latencies[key] = latency if average is None else average + 0.1 * (latency - average)
+
+            self._condition.notify_all()
+            waiters = self._async_waiters.pop(key, [])
+
+        for waiter in waiters:
+            waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+
+    @contextmanager
+    def limit(self, key: Hashable) -> Iterator[None]:
+        """Context manager that waits until a request for the key is allowed, and holds it until exit"""
+        with self._condition:
+            while not self._try_acquire(key):
+                self._condition.wait()
+
+        started = monotonic()
+        try:
+            yield
+        except Exception as error:
+            self._release(key, monotonic() - started, error)
+            raise
+        except BaseException:
+            self._release(key, monotonic() - started, None)
+            raise
+        self._release(key, monotonic() - started, None)
+
+    @asynccontextmanager
+    async def limit_async(self, key: Hashable) -> AsyncIterator[None]:
+        """Async context manager that waits until a request for the key is allowed, and holds it until exit"""
+        while True:
+            with self._lock:
+                if self._try_acquire(key):
+                    break
+                waiter = asyncio.get_running_loop().create_future()
+                self._async_waiters.setdefault(key, []).append(waiter)
+            await waiter
+
+        started = monotonic()
+        try:
+            yield
+        except Exception as error:
+            self._release(key, monotonic() - started, error)
+            raise
+        except BaseException:
+            self._release(key, monotonic() - started, None)
+            raise
+        self._release(key, monotonic() - started, None)
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+@dataclass(kw_only=True, slots=True)
+class ResilienceOptions:
+    """
+    Data class grouping the options that protect a degraded Relatics server and recover from its transient failures.
+
+    The retry policy, circuit breaker and limiters can be shared by multiple instances.
+    """
+
+    retry_policy: RetryPolicy | None = None
+    """Policy for sending a request again after a transient failure. Defaults to no retries."""
+    circuit_breaker: CircuitBreaker | None = None
+    """Optional circuit breaker per hostname, failing fast with a CircuitOpenError while the server is degraded"""
+    rate_limiter: RateLimiter | None = None
+    """Optional token bucket limiting the rate of requests per hostname and workspace"""
+    concurrency_limiter: AdaptiveLimiter | None = None
+    """Optional limit on simultaneous requests per hostname and workspace, adapting to the latency and failures"""
+    host_limiter: HostLimiter | None = None
+    """The limit on simultaneous requests per hostname of the batch methods. Defaults to DEFAULT_HOST_LIMITER."""
@@ -0,0 +1,464 @@
+import asyncio
+import json
+import re
+from base64 import b64encode
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime
+from datetime import timedelta
+from logging import getLogger
+from pprint import pformat
+from threading import Lock
+from threading import Thread
+from time import monotonic
+from typing import TypedDict
+from weakref import WeakKeyDictionary
+
+from suds import WebFault
+
+from .exceptions import TokenRequestError
+from .retry import http_status
+from .token_store import TokenStore
+from .transport import DEFAULT_CONNECTION_POOL
+from .transport import USER_AGENT
+from .transport import AsyncConnectionPool
+from .transport import ConnectionPool
+
+log = getLogger(__name__)
+
+
+class TokenData(TypedDict):
+    """Simple immutable dict containing token information"""
+
+    token: str
+    """The actual token"""
+    expires_on: datetime
+    """Expire time of the token"""
+
+
+# Constants
+TOKEN_PATH = "/oauth2/token"
+TOKEN_EXPIRY_SKEW = timedelta(seconds=300)
+"""Tokens expiring within this time aren't used anymore, to allow for clock skew and the duration of a request"""
+TOKEN_REFRESH_AHEAD = timedelta(seconds=600)
+"""Tokens expiring within this time are renewed in the background, while they are still used"""
+TOKEN_REJECTED_PATTERN = re.compile(
+    r"token.*\b(expired|invalid)\b|\b(expired|invalid)\b.*token", flags=re.IGNORECASE | re.DOTALL
+)
+"""Pattern of a SOAP fault message about an expired or invalid token"""
+HOST_LOCK_POLL_INTERVAL = 0.05
+"""Seconds between attempts of a coroutine to take the lock of a hostname, while a thread holds it"""
+
+
+def is_token_rejected(error: Exception) -> bool:
+    """
+    Check whether the error of a webservice request means that the OAuth2 token was rejected.
+
+    That is a HTTP 401 status, raised by suds as a plain Exception with the status and reason, or by the raw engine as
+    a TransportError, or a SOAP fault about an expired or invalid token.
+
+    Args:
+        error: The exception raised by the request.
+
+    Returns:
+        True if a request with a new token could succeed, False otherwise.
+    """
+    if isinstance(error, WebFault):
+        return TOKEN_REJECTED_PATTERN.search(str(getattr(error.fault, "faultstring", ""))) is not None
+    return http_status(error) == 401
+
+
+class ClientCredential:
+    """
+    Class containing OAuth2 client credentials and helper methods to get a token from the Relatics host.
+
+    The tokens are cached per hostname and safe to use from multiple threads. When a token is needed, only a single
+    request per hostname is in flight, other threads wait for its result. Tokens that are about to expire are renewed
+    in the background, so requests don't have to wait for a new token.
+
+    Args:
+        client_id : The OAuth2 client_id
+        client_secret : The OAuth2 client_secret
+        connection_pool : The pool of connections used for token requests. Defaults to DEFAULT_CONNECTION_POOL.
+        background_refresh : Renew tokens in a background thread, when they expire within `refresh_ahead`.
+            Defaults to True.
+        token_store : Optional store to share tokens with other instances and processes, like a FileTokenStore.
+        expiry_skew : Tokens expiring within this time aren't used anymore. Defaults to TOKEN_EXPIRY_SKEW.
+        refresh_ahead : Tokens expiring within this time are renewed in the background. Defaults to
+            TOKEN_REFRESH_AHEAD.
+    """
+
+    client_id: str
+    client_secret: str
+    tokens: dict[str, TokenData]
+    connection_pool: ConnectionPool
+    background_refresh: bool
+    """Whether tokens that are about to expire are renewed in the background"""
+    token_store: TokenStore | None
+    """Optional store to share tokens with other instances and processes"""
+    expiry_skew: timedelta
+    """Tokens expiring within this time aren't used anymore"""
+    refresh_ahead: timedelta
+    """Tokens expiring within this time are renewed in the background"""
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        connection_pool: ConnectionPool | None = None,
+        background_refresh: bool = True,
+        token_store: TokenStore | None = None,
+        expiry_skew: timedelta = TOKEN_EXPIRY_SKEW,
+        refresh_ahead: timedelta = TOKEN_REFRESH_AHEAD,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.tokens = {}
+        self.connection_pool = DEFAULT_CONNECTION_POOL if connection_pool is None else connection_pool
+        self.background_refresh = background_refresh
+        self.token_store = token_store
+        self.expiry_skew = expiry_skew
+        self.refresh_ahead = refresh_ahead
+        self._lock = Lock()
+        # Monotonic deadline per hostname, together with the token it belongs to
+        self._deadlines: dict[str, tuple[TokenData, float]] = {}
+        self._host_locks: dict[str, Lock] = {}
+        self._refreshing: set[str] = set()
+        # Locks of the coroutines per event loop, since an asyncio.Lock can only be used from a single loop
+        self._async_locks: WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Lock]] = WeakKeyDictionary()
+        self._async_tasks: set[asyncio.Task] = set()
+
+    def _host_lock(self, hostname: str) -> Lock:
+        with self._lock:
+            return self._host_locks.setdefault(hostname, Lock())
+
+    @asynccontextmanager
+    async def _host_lock_async(self, hostname: str) -> AsyncIterator[None]:
+        """
+        Take the lock of the hostname from a coroutine, without blocking the event loop.
+
+        The coroutines of an event loop wait for each other on an asyncio.Lock. The one holding it also takes the lock
+        shared with the threads, so synchronous and asynchronous callers wait for a single token request.
+        """
+        with self._lock:
+            async_lock = self._async_locks.setdefault(asyncio.get_running_loop(), {}).setdefault(
+                hostname, asyncio.Lock()
+            )
+
+        async with async_lock:
+            host_lock = self._host_lock(hostname)
+            while not host_lock.acquire(blocking=False):
+                await asyncio.sleep(HOST_LOCK_POLL_INTERVAL)
+            try:
+                yield
+            finally:
+                host_lock.release()
+
+    def get_token(
+        self,
+        hostname: str,
+        force_refresh: bool = False,
+        user_agent: str = USER_AGENT,
+        connection_pool: ConnectionPool | None = None,
+    ) -> str:
+        """
+        Get the token for the given hostname
+
+        Concurrent calls for the same hostname wait for a single token request, instead of each requesting a token.
+
+        Args:
+            hostname : The Relatics hostname from where the token should be get.
+            force_refresh : When True, force a new token to be requested, instead of trying to reuse an
+                existing token. Defaults to False.
+            user_agent : The user-agent used in the http request to Relatics. Since this name will show up in the
+                logs in Relatics, it can be useful to specify a custom value. Defaults to USER_AGENT.
+            connection_pool : The pool of connections used for the token request. Defaults to the pool of this
+                instance.
+
+        Returns:
+            str: Token for the given hostname
+        """
+        if self._needs_new_token(hostname, force_refresh):
+            # The token that needs to be replaced, to detect a refresh by another thread while waiting for the lock
+            stale_token = self.tokens.get(hostname)
+
+            with self._host_lock(hostname):
+                current_token = self.tokens.get(hostname)
+                refreshed = current_token is not None and current_token is not stale_token
+                if not refreshed and self._needs_new_token(hostname, force_refresh):
+                    self._renew_token(hostname, stale_token, user_agent, connection_pool)
+
+        elif self.background_refresh and self._expires_soon(hostname):
+            self._start_background_refresh(hostname, user_agent, connection_pool)
+
+        return self.tokens[hostname]["token"]
+
+    def _renew_token(
+        self,
+        hostname: str,
+        stale_token: TokenData | None,
+        user_agent: str,
+        connection_pool: ConnectionPool | None,
+    ) -> None:
+        """Take the token from the token store when another process renewed it, otherwise request a new token"""
+        if self.token_store is None:
+            self.retrieve_token(hostname, user_agent, connection_pool)
+            return
+
+        with self.token_store.lock(self.client_id, hostname):
+            if self._load_stored_token(hostname, stale_token):
+                return
+
+            self.retrieve_token(hostname, user_agent, connection_pool)
+            self.token_store.save(self.client_id, hostname, self.tokens[hostname])
+
+    def _load_stored_token(self, hostname: str, stale_token: TokenData | None) -> bool:
+        """Use the token from the token store, when it's a usable replacement of the stale token"""
+        stored = self.token_store.load(self.client_id, hostname)  # type: ignore[union-attr]
+        if stored is None or (stored["expires_on"] - datetime.now()) <= self.expiry_skew:
+            return False
+        if stale_token is not None and stored["token"] == stale_token["token"]:
+            return False
+
+        log.info("Using the stored token for %s", hostname)
+        self._set_token(hostname, stored, monotonic() + (stored["expires_on"] - datetime.now()).total_seconds())
+        return True
+
+    def _start_background_refresh(
+        self, hostname: str, user_agent: str, connection_pool: ConnectionPool | None
+    ) -> None:
+        """Renew the token in a background thread, unless a renewal for the hostname is already running"""
+        with self._lock:
+            if hostname in self._refreshing:
+                return
+            self._refreshing.add(hostname)
+
+        Thread(
+            target=self._refresh_in_background,
+            args=(hostname, user_agent, connection_pool),
+            name=f"pyrelatics2-token-refresh-{hostname}",
+            daemon=True,
+        ).start()
+
+    def _refresh_in_background(self, hostname: str, user_agent: str, connection_pool: ConnectionPool | None) -> None:
+        try:
+            with self._host_lock(hostname):
+                if self._expires_soon(hostname):
+                    log.info("Renewing the token for %s in the background", hostname)
+                    self._renew_token(hostname, self.tokens.get(hostname), user_agent, connection_pool)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # The current token is still valid, a new token is requested again when it is needed
+            log.warning("Renewing the token for %s in the background failed", hostname, exc_info=True)
+        finally:
+            with self._lock:
+                self._refreshing.discard(hostname)
+
+    async def get_token_async(
+        self,
+        hostname: str,
+        force_refresh: bool = False,
+        user_agent: str = USER_AGENT,
+        connection_pool: AsyncConnectionPool | None = None,
+    ) -> str:
+        """
+        Get the token for the given hostname, without blocking the event loop.
+
+        Concurrent calls for the same hostname wait for a single token request, instead of each requesting a token.
+        This includes calls of `get_token` from other threads, and calls from other event loops.
+
+        Args:
+            hostname : The Relatics hostname from where the token should be get.
+            force_refresh : When True, force a new token to be requested, instead of trying to reuse an
+                existing token. Defaults to False.
+            user_agent : The user-agent used in the http request to Relatics. Defaults to USER_AGENT.
+            connection_pool : The pool of connections used for the token request. When None, a temporary pool is
+                used.
+
+        Returns:
+            str: Token for the given hostname
+        """
+        if self._needs_new_token(hostname, force_refresh):
+            stale_token = self.tokens.get(hostname)
+
+            async with self._host_lock_async(hostname):
+                current_token = self.tokens.get(hostname)
+                refreshed = current_token is not None and current_token is not stale_token
+                if not refreshed and self._needs_new_token(hostname, force_refresh):
+                    await self._renew_token_async(hostname, stale_token, user_agent, connection_pool)
+
+        elif self.background_refresh and self._expires_soon(hostname) and hostname not in self._refreshing:
+            self._refreshing.add(hostname)
+            task = asyncio.get_running_loop().create_task(
+                self._refresh_in_background_async(hostname, user_agent, connection_pool)
+            )
+            # Keep a reference to the task, so it isn't garbage collected while running
+            self._async_tasks.add(task)
+            task.add_done_callback(self._async_tasks.discard)
+
+        return self.tokens[hostname]["token"]
+
+    async def _refresh_in_background_async(
+        self, hostname: str, user_agent: str, connection_pool: AsyncConnectionPool | None
+    ) -> None:
+        try:
+            async with self._host_lock_async(hostname):
+                if self._expires_soon(hostname):
+                    log.info("Renewing the token for %s in the background", hostname)
+                    await self._renew_token_async(hostname, self.tokens.get(hostname), user_agent, connection_pool)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # The current token is still valid, a new token is requested again when it is needed
+            log.warning("Renewing the token for %s in the background failed", hostname, exc_info=True)
+        finally:
+            self._refreshing.discard(hostname)
+
+    async def _renew_token_async(
+        self,
+        hostname: str,
+        stale_token: TokenData | None,
+        user_agent: str,
+        connection_pool: AsyncConnectionPool | None,
+    ) -> None:
+        """
+        Take the token from the token store when another process renewed it, otherwise request a new token.
+
+        The store is accessed in a thread, to keep the event loop free. It isn't locked, since a lock can't be held
+        across the token request without blocking a thread.
+        """
+        if self.token_store is not None and await asyncio.to_thread(self._load_stored_token, hostname, stale_token):
+            return
+
+        await self.retrieve_token_async(hostname, user_agent, connection_pool)
+
+        if self.token_store is not None:
+            await asyncio.to_thread(self.token_store.save, self.client_id, hostname, self.tokens[hostname])
+
+    def _needs_new_token(self, hostname: str, force_refresh: bool) -> bool:
+        if force_refresh is True:
+            log.info("Forced refresh of the token for %s, retrieving new token", hostname)
+            return True
+
+        remaining = self._remaining(hostname)
+        if remaining is None:
+            log.info("No previous token for %s, retrieving new token", hostname)
+            return True
+        if remaining <= self.expiry_skew.total_seconds():
+            log.info("Previous token for %s expires within %s, retrieving new token", hostname, self.expiry_skew)
+            return True
+
+        log.info("Reuse previous token for %s", hostname)
+        return False
+
+    def _expires_soon(self, hostname: str) -> bool:
+        """Whether the token for the hostname expires within `refresh_ahead`, and should be renewed"""
+        remaining = self._remaining(hostname)
+        return remaining is not None and remaining <= self.refresh_ahead.total_seconds()
+
+    def _remaining(self, hostname: str) -> float | None:
+        """
+        Seconds until the token for the hostname expires, or None when there is no token.
+
+        Measured with the monotonic clock, so changes of the wall clock don't affect it. Tokens that were set in
+        `tokens` directly fall back to their `expires_on`.
+        """
+        token = self.tokens.get(hostname)
+        if token is None:
+            return None
+
+        deadline = self._deadlines.get(hostname)
+        if deadline is not None and deadline[0] is token:
+            return deadline[1] - monotonic()
+
+        return (token["expires_on"] - datetime.now()).total_seconds()
+
+    def _set_token(self, hostname: str, token: TokenData, deadline: float) -> None:
+        """Store the token for the hostname, with its monotonic deadline"""
+        self._deadlines[hostname] = (token, deadline)
+        self.tokens[hostname] = token
+
+    def _token_request(self, user_agent: str) -> tuple[bytes, dict[str, str]]:
+        """Get the body and headers for a token request"""
+        auth_credentials = b64encode(bytes(f"{self.client_id}:{self.client_secret}", "utf-8"))
+        payload = "grant_type=client_credentials"
+        headers = {
+            "Authorization": f"Basic {auth_credentials.decode('utf-8')}",
+            "Content-Type": "text/plain",
+            "User-Agent": user_agent,
+        }
+
+        return payload.encode("utf-8"), headers
+
+    def _store_token(self, hostname: str, response_body: bytes, requested_on: datetime, requested_at: float) -> None:
+        """Check the response of a token request and store the received token"""
+        response = json.loads(response_body.decode("utf-8"))
+
+        log.debug("Response from %s: %s", TOKEN_PATH, pformat(response, indent=2))
+
+        if "error" in response:
+            # Known errors:
+            # * `invalid_client` (description=_"Client not found."_). Happens when:
+            #   * An unknown client_id is submitted
+            #   * An incorrect client_secret is submitted
+            #   * The client_id is disabled in Relatics
+            raise TokenRequestError(response)
+
+        if "access_token" not in response:
+            raise KeyError("Token request failed: No access_token was given.")
+
+        # Store the token for later use. The expiry is counted from the moment of the request, to be on the safe side.
+        expires_in = timedelta(seconds=response["expires_in"])
+        token = TokenData(token=response["access_token"], expires_on=requested_on + expires_in)
+        self._set_token(hostname, token, requested_at + expires_in.total_seconds())
+
+    def retrieve_token(
+        self, hostname: str, user_agent: str = USER_AGENT, connection_pool: ConnectionPool | None = None
+    ) -> None:
+        """_summary_
+
+        Args:
+            hostname : The Relatics hostname from where the token should be get.
+            user_agent : The user-agent used in the http request to Relatics. Since this name will show up in the
+                logs in Relatics, it can be useful to specify a custom value. Defaults to USER_AGENT.
+            connection_pool : The pool of connections used for the token request. Defaults to the pool of this
+                instance.
+
+        Raises:
+            RuntimeError: When Relatics sends back an error response
+            KeyError: When there is no token in the response from Relatics
+        """
+        requested_on = datetime.now()
+        requested_at = monotonic()
+        payload, headers = self._token_request(user_agent)
+
+        pool = self.connection_pool if connection_pool is None else connection_pool
+        res = pool.request("POST", f"https://{hostname}{TOKEN_PATH}", payload, headers, idempotent=True)
+
+        self._store_token(hostname, res.body, requested_on, requested_at)
+
+    async def retrieve_token_async(
+        self, hostname: str, user_agent: str = USER_AGENT, connection_pool: AsyncConnectionPool | None = None
+    ) -> None:
+        """
+        Retrieve a new token from the Relatics host, without blocking the event loop.
+
+        Args:
+            hostname : The Relatics hostname from where the token should be get.
+            user_agent : The user-agent used in the http request to Relatics. Defaults to USER_AGENT.
+            connection_pool : The pool of connections used for the token request. When None, a temporary pool is
+                used.
+
+        Raises:
+            TokenRequestError: When Relatics sends back an error response
+            KeyError: When there is no token in the response from Relatics
+        """
+        requested_on = datetime.now()
+        requested_at = monotonic()
+        payload, headers = self._token_request(user_agent)
+
+        pool = AsyncConnectionPool() if connection_pool is None else connection_pool
+        try:
+            res = await pool.request("POST", f"https://{hostname}{TOKEN_PATH}", payload, headers, idempotent=True)
+        finally:
+            if connection_pool is None:
+                await pool.close()
+
+        self._store_token(hostname, res.body, requested_on, requested_at)
@@ -0,0 +1,122 @@
+import json
+import sqlite3
+from hashlib import sha256
+from logging import getLogger
+from threading import Lock
+from typing import Iterable
+
+log = getLogger(__name__)
+
+
+def row_hash(row: dict[str, str]) -> str:
+    """
+    Hash of the contents of a row, independent of the order of its columns.
+
+    Args:
+        row : The row, as supplied to `run_import()`
+
+    Returns:
+        str : The sha256 hash of the row
+    """
+    contents = json.dumps(sorted((key, str(value)) for key, value in row.items()), ensure_ascii=False)
+    return sha256(contents.encode("utf-8")).hexdigest()
+
+
+class DeltaState:
+    """
+    Thread-safe state of incremental imports: the hash of every row that was imported successfully, by its key.
+
+    The state is kept in a table of an SQLite database, per scope (like the hostname, workspace and operation of the
+    import). Rows that were removed from the data aren't deleted in Relatics, and stay in the state.
+
+    Args:
+        path : The SQLite database file. Created when it doesn't exist. Use ":memory:" for a state that isn't stored.
+    """
+
+    path: str
+    """The SQLite database file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS row_hashes "
+                "(scope TEXT NOT NULL, key TEXT NOT NULL, hash TEXT NOT NULL, PRIMARY KEY (scope, key))"
+            )
+
+    def __enter__(self) -> "DeltaState":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            self._connection.close()
+
+    def hashes(self, scope: str) -> dict[str, str]:
+        """The hash of every row in the scope, by its key"""
+        with self._lock:
+            cursor = self._connection.execute("SELECT key, hash FROM row_hashes WHERE scope = ?", (scope,))
+            return dict(cursor.fetchall())
+
+    def changed_rows(
+        self, scope: str, data: Iterable[dict[str, str]], key_column: str
+    ) -> tuple[list[dict[str, str]], dict[str, str]]:
+        """
+        Select the rows that were added or changed since the last commit of the scope.
+
+        Args:
+            scope : The scope of the state
+            data : The rows to import
+            key_column : The column that identifies a row
+
+        Returns:
+            list[dict[str, str]] : The rows that were added or changed
+            dict[str, str] : The hashes of these rows by their key, to `commit()` after a successful import
+        """
+        stored = self.hashes(scope)
+        rows: list[dict[str, str]] = []
+        pending: dict[str, str] = {}
+        seen: set[str] = set()
+
+        for index, row in enumerate(data):
+            if key_column not in row:
+                raise ValueError(f"Row {index} doesn't have the key column '{key_column}'.")
+            key = str(row[key_column])
+            if key in seen:
+                raise ValueError(f"Row {index} has the same key '{key}' as an earlier row.")
+            seen.add(key)
+
+            hashed = row_hash(row)
+            if stored.get(key) != hashed:
+                rows.append(row)
+                pending[key] = hashed
+
+        log.debug("%d of %d rows changed in %s", len(rows), len(seen), scope)
+        return rows, pending
+
+    def commit(self, scope: str, hashes: dict[str, str]) -> None:
+        """
+        Store the hashes of rows that were imported successfully.
+
+        Args:
+            scope : The scope of the state
+            hashes : The hashes of the rows by their key, as returned by `changed_rows()`
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO row_hashes (scope, key, hash) VALUES (?, ?, ?)",
+                ((scope, key, hashed) for key, hashed in hashes.items()),
+            )
+
+    def clear(self, scope: str | None = None) -> None:
+        """Remove the hashes of the scope, or of all scopes when no scope is given, so all rows are sent again"""
+        with self._lock, self._connection:
+            if scope is None:
+                self._connection.execute("DELETE FROM row_hashes")
+            else:
+                self._connection.execute("DELETE FROM row_hashes WHERE scope = ?", (scope,))
@@ -0,0 +1,181 @@
+import os
+from base64 import b64decode
+from collections.abc import Mapping
+from dataclasses import dataclass
+from io import BytesIO
+from logging import getLogger
+from typing import IO
+from typing import Iterable
+from typing import Iterator
+from zipfile import ZIP_DEFLATED
+from zipfile import ZIP_STORED
+from zipfile import ZipFile
+from zipfile import ZipInfo
+
+log = getLogger(__name__)
+
+# fmt: off
+ALREADY_COMPRESSED_EXTENSIONS = frozenset(
+    {
+        # Images
+        "jpg", "jpeg", "png", "gif", "webp", "heic", "avif",
+        # Archives and office documents (which are zip files themselves)
+        "zip", "gz", "tgz", "bz2", "xz", "7z", "rar", "docx", "xlsx", "pptx", "odt", "ods", "odp", "rcs",
+        # Audio, video and others
+        "mp3", "mp4", "m4a", "mov", "avi", "mkv", "ogg", "pdf",
+    }
+)
+# fmt: on
+"""Extensions of file formats that are already compressed, so deflating them again only costs CPU"""
+
+
+@dataclass(kw_only=True, slots=True, frozen=True)
+class CompressionPolicy:
+    """
+    Policy deciding per file extension how files are compressed in the zip file of an import.
+
+    Files in an already compressed format are stored as is, everything else (like xml, csv and text) is compressed.
+    """
+
+    stored_extensions: frozenset[str] = ALREADY_COMPRESSED_EXTENSIONS
+    """Extensions (lowercase, without dot) of the files that are stored without compression"""
+    compression: int = ZIP_DEFLATED
+    """The zipfile compression method for all other files"""
+    compresslevel: int | None = None
+    """The compression level for all other files, or None for the default level"""
+
+    def compress_type(self, filename: str) -> int:
+        """Return the zipfile compression method for the given filename"""
+        extension = os.path.splitext(filename)[1][1:].lower()
+        return ZIP_STORED if extension in self.stored_extensions else self.compression
+
+
+DEFAULT_COMPRESSION_POLICY = CompressionPolicy()
+"""Default compression policy: store already compressed formats, deflate everything else"""
+
+
+def write_document(
+    import_zip: ZipFile,
+    filename: str,
+    arcname: str,
+    compression_policy: CompressionPolicy = DEFAULT_COMPRESSION_POLICY,
+) -> None:
+    """
+    Write a document into the zip file of an import, compressed according to the policy.
+
+    Args:
+        import_zip : The zip file to write to
+        filename : The path of the document
+        arcname : The name of the document in the zip file
+        compression_policy : Policy deciding whether the document is stored or compressed
+    """
+    import_zip.write(
+        filename=filename,
+        arcname=arcname,
+        compress_type=compression_policy.compress_type(arcname),
+        compresslevel=compression_policy.compresslevel,
+    )
+
+
+class Documents(Mapping[str, bytes]):
+    """
+    Read-only mapping of the documents in the result of an export, from their filename to their contents.
+
+    The documents stay compressed in the zip file that was received, and are only decompressed when they are
+    accessed. Use `open()` to read a document as a stream, or `extract_to()` to write documents straight to disk,
+    without holding their decompressed contents in memory.
+
+    Args:
+        zip_bytes : The contents of the zip file with the documents. None for no documents.
+    """
+
+    def __init__(self, zip_bytes: bytes | None = None):
+        self._zip_bytes = zip_bytes
+        self._infos: dict[str, ZipInfo] = {}
+        if zip_bytes:
+            with self._open_zip() as documents_zip:
+                self._infos = {info.filename: info for info in documents_zip.infolist() if not info.is_dir()}
+
+    def _open_zip(self) -> ZipFile:
+        """Open the received zip file, which is cheap since only its central directory is read"""
+        return ZipFile(BytesIO(self._zip_bytes), "r")  # type: ignore[arg-type]
+
+    @staticmethod
+    def from_b64(data: str) -> "Documents":
+        """
+        Create the documents from the base64 encoded zip file, as received from Relatics
+
+        Args:
+            data : Base64 encoded zip file
+
+        Returns:
+            Documents : The documents in the zip file
+        """
+        return Documents(b64decode(data))
+
+    @property
+    def zip_bytes(self) -> bytes | None:
+        """The contents of the zip file with the documents, as received"""
+        return self._zip_bytes
+
+    def __getitem__(self, name: str) -> bytes:
+        if name not in self._infos:
+            raise KeyError(name)
+        with self._open_zip() as documents_zip:
+            return documents_zip.read(self._infos[name])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._infos)
+
+    def __len__(self) -> int:
+        return len(self._infos)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._infos
+
+    def __repr__(self) -> str:
+        return "{" + ", ".join(f"{name!r}: <{info.file_size} bytes>" for name, info in self._infos.items()) + "}"
+
+    def __reduce__(self):
+        return (Documents, (self._zip_bytes,))
+
+    def size(self, name: str) -> int:
+        """Return the decompressed size in bytes of the document, without decompressing it"""
+        return self._infos[name].file_size
+
+    def open(self, name: str) -> IO[bytes]:
+        """
+        Open the document as a binary file-like object, which decompresses the document while it is read.
+
+        Args:
+            name : The filename of the document
+
+        Returns:
+            IO[bytes] : Readable file-like object
+        """
+        if name not in self._infos:
+            raise KeyError(name)
+        # The opened document keeps reading from the zip bytes after the ZipFile is closed
+        with self._open_zip() as documents_zip:
+            return documents_zip.open(self._infos[name], "r")
+
+    def extract_to(self, directory: str, names: Iterable[str] | None = None) -> list[str]:
+        """
+        Write the documents to a directory, streaming them to disk one block at a time.
+
+        Filenames are sanitized like `ZipFile.extract()` does, so documents can't be written outside the directory.
+
+        Args:
+            directory : The directory to write the documents to. Created when it doesn't exist.
+            names : The filenames of the documents to write. Defaults to all documents.
+
+        Returns:
+            list[str] : The paths of the written documents
+        """
+        names = list(self._infos) if names is None else list(names)
+        missing = [name for name in names if name not in self._infos]
+        if missing:
+            raise KeyError(missing[0])
+
+        with self._open_zip() as documents_zip:
+            return [documents_zip.extract(self._infos[name], directory) for name in names]
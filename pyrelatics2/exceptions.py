@@ -1,5 +1,6 @@
 from logging import getLogger
 from pprint import pformat
+from typing import Any
 
 log = getLogger(__name__)
 
@@ -29,3 +30,39 @@ class TokenRequestError(Exception):
 
     def __str__(self) -> str:
         return f"Token request failed: {self.error} ({self.error_description})"
+
+
+class CircuitOpenError(Exception):
+    """
+    Custom exception class when a request isn't sent, because the circuit breaker for the hostname is open
+
+    Attributes:
+        hostname : The hostname of the degraded server
+        retry_after : Seconds until a trial request is let through
+    """
+
+    def __init__(self, hostname: str, retry_after: float, *args):
+        super().__init__(*args)
+        self.hostname = hostname
+        self.retry_after = retry_after
+
+    def __str__(self) -> str:
+        return f"Circuit for {self.hostname} is open, retry after {self.retry_after:.1f} seconds"
+
+
+class ImportAbortedError(Exception):
+    """
+    Custom exception class when the processing of the result of an import is aborted at the first error message
+
+    Attributes:
+        message : The error message, an ImportMessage
+        result : The ImportResult with the messages and elements until the error message
+    """
+
+    def __init__(self, message: Any, result: Any, *args):
+        super().__init__(*args)
+        self.message = message
+        self.result = result
+
+    def __str__(self) -> str:
+        return f"Import aborted at row {self.message.row}: {self.message.message}"
@@ -0,0 +1,360 @@
+import os
+from base64 import b64encode
+from dataclasses import dataclass
+from logging import getLogger
+from pprint import pformat
+from tempfile import NamedTemporaryFile
+from tempfile import SpooledTemporaryFile
+from typing import TYPE_CHECKING
+from typing import Iterable
+from typing import Iterator
+from zipfile import ZipFile
+
+from .chunking import split_rows
+from .delta import DeltaState
+from .documents import write_document
+from .payload import encode_b64
+from .payload import generate_data_b64
+from .payload import write_data_xml
+from .result_classes import BatchResult
+from .result_classes import ImportCallbacks
+from .result_classes import ImportResult
+
+if TYPE_CHECKING:
+    from .client import BaseRelaticsWebservices
+
+log = getLogger(__name__)
+
+# Constants
+IMPORT_BASENAME = "pyrelatics_webservice"
+SUPPORTED_EXTENSIONS = ["xlsx", "xlsm", "xlsb", "xls", "csv"]
+
+
+@dataclass(kw_only=True, slots=True)
+class ResubmitOptions:
+    """
+    Data class with the options of an import that resubmits only the rows with an error message.
+
+    The messages about a resubmitted row are replaced by those of its last resubmission.
+    """
+
+    max_resubmits: int = 1
+    """Maximum number of rounds resubmitting the failed rows. Defaults to 1."""
+
+
+def generate_zip_b64(
+    client: "BaseRelaticsWebservices",
+    prepared_data: str | Iterable[dict[str, str]],
+    documents: list[str],
+    file_basename: str,
+    file_extension: str,
+) -> str:
+    """
+    Create the zip file of an import with documents, and encode it as base64.
+
+    The zip file is kept in memory up to `client.spool_max_size`, and spilled to a temporary file when it gets larger.
+    The request needs the encoded zip file as a single string though, so that is always held in memory as a whole.
+
+    Args:
+        client : The client sending the import, with the settings for building the zip file: `keep_zip_file`,
+            `spool_max_size` and `compression_policy`
+        prepared_data : The data file or the rows of the import
+        documents : Filepaths of the documents to include
+        file_basename : Name of the data file in the zip file, without extension
+        file_extension : Extension of the data file
+
+    Returns:
+        str : The base64 encoded zip file
+    """
+    keep_zip_file = client.keep_zip_file
+    compression_policy = client.compression_policy
+
+    if keep_zip_file:
+        # Unique filename, so parallel imports don't overwrite each other's zip file
+        zip_buffer = NamedTemporaryFile(prefix=f"{file_basename}_", suffix=".zip", delete=False)
+        zip_description = zip_buffer.name
+    else:
+        # Keep the zip file in memory, and only spill it to disk when it gets larger than spool_max_size
+        zip_buffer = SpooledTemporaryFile(max_size=client.spool_max_size)
+        zip_description = "in memory"
+
+    with zip_buffer:
+        # Create the zip file
+        # The data file is opened by name, so it gets the compression method and level of the zip file
+        data_name = f"{file_basename}.{file_extension}"
+        with ZipFile(
+            zip_buffer,
+            "w",
+            compression=compression_policy.compress_type(data_name),
+            compresslevel=compression_policy.compresslevel,
+        ) as import_zip:
+            # Add all the supplied documents, compressed according to the policy
+            for document_path in documents:
+                archive_name = os.path.join("Documents", os.path.split(document_path)[1])
+                write_document(import_zip, document_path, archive_name, compression_policy)
+
+            # Add the data file
+            if isinstance(prepared_data, str):
+                write_document(import_zip, prepared_data, os.path.split(prepared_data)[1], compression_policy)
+            else:
+                # Stream the rows into the zip file, instead of building the whole data xml in memory first
+                with import_zip.open(data_name, "w") as data_file:
+                    if write_data_xml(prepared_data, data_file) == 0:
+                        raise ValueError("Supplied data is empty.")
+
+            log.debug("Zip-file created %s: \n%s", zip_description, pformat(import_zip.namelist(), indent=2))
+
+        # Convert zipfile to base64
+        zip_buffer.seek(0)
+        data_str = encode_b64(zip_buffer)
+
+    if keep_zip_file:
+        log.info("Zip-file kept at %s", zip_description)
+
+    return data_str
+
+
+def prepare_import(
+    client: "BaseRelaticsWebservices",
+    data: str | Iterable[dict[str, str]],
+    file_name: None | str = None,
+    documents: None | list[str] = None,
+) -> tuple[str, str]:
+    """
+    Validate and prepare the data (and documents) of an import, for sending them to Relatics.
+
+    Rows are streamed into the base64 encoded payload one at a time, so any iterable of rows (like a generator) can be
+    used without materializing it.
+
+    Args:
+        client : The client sending the import, with the settings for building the payload
+        data : The data to send to the import. See `run_import()`.
+        file_name : Filename send to Relatics. See `run_import()`.
+        documents : Optional list of filepaths to include in the import.
+
+    Returns:
+        tuple[str, str] : The filename and the base64 encoded data to send to Relatics
+    """
+    if isinstance(data, (str, list)) and not data:
+        # Above "if" checks for both empty str or empty list,
+        # see https://docs.python.org/3/library/stdtypes.html#truth-value-testing
+        # Other iterables of rows are checked while they are streamed
+        raise ValueError("Supplied data is empty.")
+    if not isinstance(data, Iterable) or isinstance(data, (bytes, dict)):
+        raise TypeError("Invalid type of data supplied.")
+    if documents:
+        # Detect duplicate names. Remove duplicate tails in the path with set(). Optimized with set comprehension.
+        if len({os.path.split(path)[1] for path in documents}) != len(documents):
+            raise ValueError("Duplicate filenames in document list.")
+
+    file_extension = None
+
+    # Prepare the data part
+    if isinstance(data, str):
+        # Set appropriate filename, based on the given filename in "data"
+        file_extension = os.path.splitext(data)[1][1:]
+
+        # Validate if given extensions is supported
+        if file_extension not in SUPPORTED_EXTENSIONS:
+            raise TypeError("Supplied file has unsupported file extension.")
+
+    else:
+        # Set appropriate filename. The data xml is built while it is encoded.
+        file_extension = "xml"
+
+    # Set appropriate filename
+    if file_name is None:
+        file_basename = f"{IMPORT_BASENAME}"
+    else:
+        # Clean any possible path from the filename and remove a possible extension
+        file_basename = os.path.splitext(os.path.split(file_name)[1])[0]
+
+    # Choose how to create the base64 data: when document are supplied, create a zip; otherwise
+    # use the file or xml data
+    if documents is not None:
+        # Generate the base64 encoded zip-file
+        data_str = generate_zip_b64(
+            client, prepared_data=data, documents=documents, file_basename=file_basename, file_extension=file_extension
+        )
+
+        # Set the file extension to zip
+        file_extension = "zip"
+
+    else:  # documents is None
+        if isinstance(data, str):
+            # Convert supplied data file to base64
+            with open(data, "rb") as data_file:
+                data_str = b64encode(data_file.read()).decode("utf-8")
+
+        else:
+            # Stream the rows as xml through the base64 encoder
+            data_str = generate_data_b64(data)
+
+    return f"{file_basename}.{file_extension}", data_str
+
+
+def resubmit_rows(
+    data: str | Iterable[dict[str, str]],
+    resubmit: ResubmitOptions,
+    auto_parse_response: bool,
+    callbacks: ImportCallbacks | None,
+) -> list[dict[str, str]]:
+    """
+    Check the options of an import resubmitting its failed rows, and return the rows to keep for resubmitting.
+
+    Args:
+        data : The rows to send to the import
+        resubmit : The options for resubmitting the failed rows
+        auto_parse_response : Whether the response of the import is parsed
+        callbacks : Optional callbacks of the first submission
+
+    Returns:
+        list[dict[str, str]] : The rows, since they are needed again after the import a generator is read once
+    """
+    if resubmit.max_resubmits < 0:
+        raise ValueError("The 'max_resubmits' can't be negative.")
+    if not auto_parse_response:
+        raise ValueError("Resubmitting failed rows requires a parsed response.")
+    if callbacks is not None and not callbacks.keep_messages:
+        raise ValueError("Resubmitting failed rows requires the callbacks to keep the messages.")
+    if isinstance(data, (str, bytes, dict)):
+        raise ValueError("Resubmitting failed rows requires rows as data.")
+
+    return list(data)
+
+
+def failed_rows(result: ImportResult, rows: list[dict[str, str]]) -> list[int]:
+    """
+    Positions of the supplied rows with an error message in the result of their import.
+
+    Args:
+        result : The result of the import
+        rows : The rows sent to the import
+
+    Returns:
+        list[int] : The 0-based positions of the failed rows. Empty when the import itself failed, since there are no
+            rows to blame then.
+    """
+    if not result:
+        return []
+    return [index for index in result.failed_rows() if index < len(rows)]
+
+
+def next_resubmit(
+    operation_name: str, result: ImportResult, rows: list[dict[str, str]], round_number: int, max_resubmits: int
+) -> list[int]:
+    """
+    The rows to resubmit in the given round, or an empty list when resubmitting is done.
+
+    Args:
+        operation_name : The "OperationName" of the import, for logging
+        result : The result of the import so far
+        rows : The rows of the import
+        round_number : The round of resubmitting, starting at 1
+        max_resubmits : Maximum number of rounds resubmitting the failed rows
+
+    Returns:
+        list[int] : The 0-based positions of the rows to resubmit
+    """
+    failed = failed_rows(result, rows) if round_number <= max_resubmits else []
+    if failed:
+        log.info(
+            "Resubmitting %d failed rows of import %s (round %d of %d).",
+            len(failed),
+            operation_name,
+            round_number,
+            max_resubmits,
+        )
+    return failed
+
+
+def chunk_jobs(
+    operation_name: str,
+    data: Iterable[dict[str, str]],
+    max_rows: int | None,
+    max_bytes: int | None,
+    row_offsets: list[int],
+) -> Iterator[tuple[str, list[dict[str, str]]]]:
+    """
+    Split the rows into the jobs of a chunked import, collecting the position of the first row of every chunk.
+
+    Args:
+        operation_name : The "OperationName" of the import
+        data : The rows to send to the import
+        max_rows : Maximum number of rows per chunk. None for no limit.
+        max_bytes : Maximum size in bytes of the (base64 encoded) data of a chunk. None for no limit.
+        row_offsets : List to which the position of the first row of every chunk is appended, by the index of the job
+
+    Returns:
+        Iterator[tuple[str, list[dict[str, str]]]] : A job per chunk, with the "OperationName" and its rows
+    """
+    for row_offset, rows in split_rows(data, max_rows=max_rows, max_bytes=max_bytes):
+        row_offsets.append(row_offset)
+        yield operation_name, rows
+
+
+def merge_chunks(operation_name: str, batch_results: Iterable[BatchResult], row_offsets: list[int]) -> ImportResult:
+    """
+    Merge the results of the chunks of an import into a single ImportResult.
+
+    A chunk that raised an exception marks the merged result as failed.
+
+    Args:
+        operation_name : The "OperationName" of the import, for logging
+        batch_results : The result of every chunk, as yielded by running the jobs of `chunk_jobs()`
+        row_offsets : The position of the first row of every chunk, by the index of its job
+
+    Returns:
+        ImportResult : Merged result of all the chunks, with the row numbers remapped to the rows of the import
+    """
+    chunk_results: list[tuple[int, ImportResult]] = []
+    for batch_result in batch_results:
+        if batch_result.exception is not None:
+            chunk_result = ImportResult()
+            chunk_result.has_error = True
+            chunk_result.error_msg = f"Chunk {batch_result.index} failed: {batch_result.exception!r}"
+        else:
+            chunk_result = batch_result.result
+        chunk_results.append((row_offsets[batch_result.index], chunk_result))
+
+    if not chunk_results:
+        raise ValueError("Supplied data is empty.")
+
+    log.info("Import %s was sent in %s chunks.", operation_name, len(chunk_results))
+
+    return ImportResult.merge(chunk_results)
+
+
+def commit_delta(
+    state: DeltaState,
+    scope: str,
+    rows: list[dict[str, str]],
+    pending: dict[str, str],
+    key_column: str,
+    result: ImportResult,
+) -> None:
+    """
+    Commit the state of the rows of a delta import that were imported without an error.
+
+    Nothing is committed when the import failed, and the rows with an error message are left out, so they are sent
+    again by the next import.
+
+    Args:
+        state : The state of the previous imports
+        scope : The scope of the import in the state
+        rows : The changed rows that were sent
+        pending : The hashes of the sent rows by their key, as returned by `DeltaState.changed_rows()`
+        key_column : The column with the value that identifies a row
+        result : The result of the import
+    """
+    if not result:
+        log.warning("Import %s failed, the state of its %d changed rows isn't committed.", scope, len(rows))
+        return
+
+    failed = failed_rows(result, rows)
+    for index in failed:
+        pending.pop(str(rows[index][key_column]), None)
+    if failed:
+        log.warning("Import %s has %d rows with an error, their state isn't committed.", scope, len(failed))
+
+    state.commit(scope, pending)
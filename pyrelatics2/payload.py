@@ -0,0 +1,170 @@
+import re
+from base64 import b64encode
+from io import BufferedWriter
+from io import BytesIO
+from io import RawIOBase
+from logging import getLogger
+from typing import BinaryIO
+from typing import Iterable
+
+log = getLogger(__name__)
+
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8"?>\n'
+"""Declaration at the start of the data xml, as written by suds"""
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+"""Size in bytes up to which the zip file of an import is kept in memory, before it is spilled to a temporary file"""
+ENCODE_CHUNK_SIZE = 3 * 256 * 1024
+"""Size in bytes of the blocks that are base64 encoded at once. A multiple of 3, so the blocks can be concatenated"""
+WRITE_BUFFER_SIZE = 64 * 1024
+"""Size in bytes of the buffer in front of the base64 encoder, so it encodes large blocks instead of single rows"""
+
+# Same escaping as the suds encoder: an "&" that doesn't start one of the known entities, and the other special chars
+_NEEDS_ESCAPING = re.compile("[&<>\"']").search
+_UNESCAPED_AMPERSAND = re.compile("&(?!(?:amp|lt|gt|quot|apos);)")
+
+
+class Base64Writer(RawIOBase):
+    """
+    Writable binary stream that base64 encodes everything written to it, into another binary stream.
+
+    The encoding is done incrementally, so the unencoded data is never held in memory as a whole. Bytes that don't
+    fill a complete 3-byte group are kept until the next write, or padded when the writer is closed.
+
+    Args:
+        out : The binary stream receiving the base64 encoded data. It isn't closed together with this writer.
+    """
+
+    def __init__(self, out: BinaryIO):
+        super().__init__()
+        self._out = out
+        self._remainder = b""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:  # type: ignore[override]
+        chunk = self._remainder + bytes(data)
+        usable = len(chunk) - len(chunk) % 3
+        self._out.write(b64encode(chunk[:usable]))
+        self._remainder = chunk[usable:]
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed and self._remainder:
+            self._out.write(b64encode(self._remainder))
+            self._remainder = b""
+        super().close()
+
+
+def escape_attribute(value: object) -> str:
+    """
+    Escape a value for use in an xml attribute, exactly like suds does.
+
+    Args:
+        value : The value to escape. Anything other than a str is converted with str() first.
+
+    Returns:
+        str : The escaped value
+    """
+    text = value if type(value) is str else str(value)  # pylint: disable=unidiomatic-typecheck
+
+    # Most values don't contain special characters, so skip the substitutions for them
+    if _NEEDS_ESCAPING(text) is None:
+        return text
+
+    text = _UNESCAPED_AMPERSAND.sub("&amp;", text)
+    return text.replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;").replace("'", "&apos;")
+
+
+def write_data_xml(rows: Iterable[dict[str, str]], out: BinaryIO) -> int:
+    """
+    Write the rows as data xml for an import, one row at a time.
+
+    The output is byte-identical to the `Document.str()` of a suds document with an `Import` Element and a `Row`
+    Element per row, encoded as UTF-8, but without building an Element per row or holding more than a single row in
+    memory.
+
+    Args:
+        rows : The rows to write, can be any iterable, like a generator
+        out : The binary stream the xml is written to
+
+    Returns:
+        int : The number of rows written
+    """
+    row_count = 0
+    # The start of every attribute (` name="`) is built once per column, instead of once per row
+    attribute_starts: dict[str, str] = {}
+
+    out.write(XML_DECLARATION)
+    out.write(b"<Import")
+
+    for data_row in rows:
+        parts = ["\n   <Row" if row_count else ">\n   <Row"]
+        for key, value in data_row.items():
+            attribute_start = attribute_starts.get(key)
+            if attribute_start is None:
+                attribute_start = attribute_starts[key] = f' {key}="'
+            parts += (attribute_start, escape_attribute(value), '"')
+        parts.append("/>")
+
+        out.write("".join(parts).encode("utf-8"))
+        row_count += 1
+
+    out.write(b"\n</Import>" if row_count else b"/>")
+
+    return row_count
+
+
+def encode_b64(source: BinaryIO) -> str:
+    """
+    Base64 encode the rest of a binary stream, a block at a time, so the unencoded contents aren't read as a whole.
+
+    The encoded contents are held in memory as a whole: once as bytes while they are encoded, and once as the
+    returned str.
+
+    Args:
+        source : The binary stream to encode
+
+    Returns:
+        str : The base64 encoded contents
+    """
+    buffer = BytesIO()
+    for block in iter(lambda: source.read(ENCODE_CHUNK_SIZE), b""):
+        buffer.write(b64encode(block))
+
+    return _decode_ascii(buffer)
+
+
+def _decode_ascii(buffer: BytesIO) -> str:
+    """Decode the base64 encoded contents of the buffer straight from it, without another copy of the bytes"""
+    with buffer.getbuffer() as encoded:
+        return str(encoded, "ascii")
+
+
+def generate_data_b64(rows: Iterable[dict[str, str]]) -> str:
+    """
+    Generate the base64 encoded data xml of an import, streaming the rows through an incremental xml writer and
+    base64 encoder.
+
+    Neither a suds document nor a string of the whole data xml is built. The request needs the encoded data as a
+    single string though, so that is held in memory: once as bytes while it is written, and once as the returned str.
+
+    Args:
+        rows : The rows to send to the import, can be any iterable, like a generator
+
+    Returns:
+        str : The base64 encoded data xml
+
+    Raises:
+        ValueError: When there are no rows
+    """
+    buffer = BytesIO()
+    with BufferedWriter(Base64Writer(buffer), buffer_size=WRITE_BUFFER_SIZE) as writer:
+        row_count = write_data_xml(rows, writer)
+
+    if row_count == 0:
+        raise ValueError("Supplied data is empty.")
+
+    log.debug("Encoded %s rows into %s bytes of base64 data.", row_count, buffer.tell())
+
+    return _decode_ascii(buffer)
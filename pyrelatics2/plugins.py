@@ -0,0 +1,67 @@
+from logging import getLogger
+
+from suds.plugin import MessageContext
+from suds.plugin import MessagePlugin
+from suds.sax.element import Element
+
+log = getLogger(__name__)
+
+
+class AddParametersPlugin(MessagePlugin):  # pylint: disable=R0903
+    """
+    Plugin for Suds Client to add parameters to the request before sending to Relatics. Because parameters use
+    attributes, they can not be defined though the default mechanisms within Suds.
+
+    Args:
+        parameters : Dictionary with the parameters
+    """
+
+    def __init__(self, parameters: dict[str, str] | None):
+        self.parameters = parameters
+
+    def marshalled(self, context: MessageContext):
+        if self.parameters is not None:
+            # Try to get "Parameters" element, or built when missing
+            try:
+                params = context.envelope.getChild("Body")[0].getChild("Parameters")[0]
+            except TypeError:
+                log.info("Adding parameters to SOAP request")
+                root = context.envelope.getChild("Body")[0]
+                root_prefix = root.findPrefix("http://www.relatics.com/")
+
+                p_1 = Element("Parameters", parent=root)
+                p_1.setPrefix(root_prefix)
+                root.append(p_1)
+
+                p_2 = Element("Parameters", parent=p_1)
+                p_2.setPrefix(root_prefix)
+                p_1.append(p_2)
+
+                params = context.envelope.getChild("Body")[0].getChild("Parameters")[0]
+
+            prefix = params.findPrefix("http://www.relatics.com/")
+
+            # Add the parameters
+            for param_name, param_value in self.parameters.items():
+                elem = Element("Parameter", parent=params)
+                elem.setPrefix(prefix)
+                elem.set(name="Name", value=param_name)
+                elem.set(name="Value", value=param_value)
+                params.append(elem)
+
+        log.debug("Final SOAP envelope: \n%s", context.envelope.str())
+
+
+class KeepReplyPlugin(MessagePlugin):  # pylint: disable=R0903
+    """
+    Plugin for Suds Client to keep the body of the received reply, before suds parses it.
+    """
+
+    reply: bytes | None
+    """The body of the received reply, or None when nothing was received yet"""
+
+    def __init__(self):
+        self.reply = None
+
+    def received(self, context: MessageContext):
+        self.reply = context.reply
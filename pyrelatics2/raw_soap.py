@@ -0,0 +1,344 @@
+from logging import getLogger
+from typing import Iterable
+from typing import Iterator
+from xml.etree.ElementTree import Element as XmlElement
+from xml.etree.ElementTree import XMLPullParser
+
+from suds import WebFault
+from suds.sax.text import Text
+from suds.sudsobject import Factory
+from suds.sudsobject import Object as SudsObject
+
+from .payload import escape_attribute
+from .result_classes import ImportCallbacks
+from .result_classes import ImportResult
+
+log = getLogger(__name__)
+
+RELATICS_NAMESPACE = "http://www.relatics.com/"
+"""Namespace of the elements in the Relatics webservice"""
+SOAP12_CONTENT_TYPE = 'application/soap+xml; charset=utf-8; action="http://www.relatics.com/{action}"'
+"""Content type of a SOAP 1.2 request, which includes the SOAP action"""
+PARSE_CHUNK_SIZE = 64 * 1024
+"""Size in bytes of the blocks of the response that are fed to the parser at once"""
+
+_ENVELOPE_START = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<SOAP-ENV:Envelope xmlns:SOAP-ENV="http://www.w3.org/2003/05/soap-envelope"><SOAP-ENV:Body>'
+    '<{action} xmlns="http://www.relatics.com/">'
+)
+_ENVELOPE_END = "</{action}></SOAP-ENV:Body></SOAP-ENV:Envelope>"
+
+# The static parts of the envelopes, see docs-Relatics/SoapEnvelope-*.xml
+_GET_RESULT_START = _ENVELOPE_START.format(action="GetResult").encode("utf-8")
+_GET_RESULT_END = _ENVELOPE_END.format(action="GetResult").encode("utf-8")
+_IMPORT_START = _ENVELOPE_START.format(action="Import").encode("utf-8")
+_IMPORT_END = _ENVELOPE_END.format(action="Import").encode("utf-8")
+
+# Attributes in these namespaces are skipped by suds as well
+_XSI_NIL = "{http://www.w3.org/2001/XMLSchema-instance}nil"
+_SKIPPED_ATTRIBUTE_NAMESPACES = (
+    "{http://www.w3.org/XML/1998/namespace}",
+    "{http://www.w3.org/2001/XMLSchema}",
+    "{http://www.w3.org/2001/XMLSchema-instance}",
+    "{http://schemas.xmlsoap.org/soap/encoding/}",
+    "{http://schemas.xmlsoap.org/soap/envelope/}",
+    "{http://www.w3.org/2003/05/soap-envelope}",
+)
+# Names that suds renames, because they are reserved words in Python
+_RESERVED = {"class": "cls", "def": "dfn"}
+
+
+def local_name(tag: str) -> str:
+    """The name of an element or attribute, without its namespace"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _identification_xml(workspace_id: str) -> str:
+    workspace = f"<Workspace>{escape_attribute(workspace_id)}</Workspace>"
+    return f"<Identification><Identification>{workspace}</Identification></Identification>"
+
+
+def _authentication_xml(entry_code: str | None) -> str:
+    if entry_code is None:
+        return "<Authentication><Authentication/></Authentication>"
+    entry_code_xml = f"<Entrycode>{escape_attribute(entry_code)}</Entrycode>"
+    return f"<Authentication><Authentication>{entry_code_xml}</Authentication></Authentication>"
+
+
+def build_get_result_envelope(
+    operation_name: str,
+    workspace_id: str,
+    parameters: dict[str, str] | None = None,
+    entry_code: str | None = None,
+) -> bytes:
+    """
+    Build the SOAP 1.2 envelope of a GetResult request, from a precompiled template.
+
+    Args:
+        operation_name : The "OperationName" of the webservice to call
+        workspace_id : The ID of the Relatics workspace
+        parameters : The parameters to pass to the webservice
+        entry_code : The entry code for authentication, or None
+
+    Returns:
+        bytes : The envelope
+    """
+    parts = [f"<Operation>{escape_attribute(operation_name)}</Operation>", _identification_xml(workspace_id)]
+
+    # Relatics doesn't accept an empty <Parameters/>, so only add them when there are any
+    if parameters:
+        parts.append("<Parameters><Parameters>")
+        for name, value in parameters.items():
+            parts.append(f'<Parameter Name="{escape_attribute(name)}" Value="{escape_attribute(value)}"/>')
+        parts.append("</Parameters></Parameters>")
+
+    parts.append(_authentication_xml(entry_code))
+
+    return _GET_RESULT_START + "".join(parts).encode("utf-8") + _GET_RESULT_END
+
+
+def build_import_envelope(
+    operation_name: str,
+    workspace_id: str,
+    file_name: str,
+    data: str,
+    entry_code: str | None = None,
+) -> bytes:
+    """
+    Build the SOAP 1.2 envelope of an Import request, from a precompiled template.
+
+    Args:
+        operation_name : The "OperationName" of the webservice to call
+        workspace_id : The ID of the Relatics workspace
+        file_name : Filename send to Relatics
+        data : The base64 encoded data
+        entry_code : The entry code for authentication, or None
+
+    Returns:
+        bytes : The envelope
+    """
+    head = (
+        f"<Operation>{escape_attribute(operation_name)}</Operation>"
+        f"{_identification_xml(workspace_id)}"
+        f"{_authentication_xml(entry_code)}"
+        f"<Filename>{escape_attribute(file_name)}</Filename>"
+        "<Data>"
+    )
+
+    # Base64 doesn't need escaping, so it is added as is
+    return b"".join((_IMPORT_START, head.encode("utf-8"), data.encode("ascii"), b"</Data>", _IMPORT_END))
+
+
+def _unmarshal(element: XmlElement, children: list[tuple[str, object]]) -> object:
+    """
+    Convert a parsed element, of which the children are already converted, into the same value suds would create.
+
+    Like suds, the text of elements without children isn't stripped. Mixed content (both text and child elements)
+    doesn't occur in Relatics responses. Unlike suds, the text of such elements is ignored.
+    """
+    name = local_name(element.tag)
+    attributes = [
+        (local_name(key), value)
+        for key, value in element.attrib.items()
+        if not key.startswith(_SKIPPED_ATTRIBUTE_NAMESPACES)
+    ]
+    text = element.text or ""
+
+    if children:
+        text = ""
+
+    if attributes and not children and text:
+        value = Factory.property(name, Text(text))
+    elif attributes or children:
+        value = Factory.object(name)
+    elif element.get(_XSI_NIL, "").lower() == "true":
+        return None
+    else:
+        return Text(text)
+
+    for key, attribute_value in attributes:
+        setattr(value, f"_{_RESERVED.get(key, key)}", Text(attribute_value))
+
+    for key, child_value in children:
+        key = _RESERVED.get(key, key)
+        if key in value:
+            existing = getattr(value, key)
+            if isinstance(existing, list):
+                existing.append(child_value)
+            else:
+                setattr(value, key, [existing, child_value])
+        else:
+            setattr(value, key, child_value)
+
+    return value
+
+
+def _feed(body: bytes | Iterable[bytes]) -> Iterator[bytes]:
+    """Split the response into blocks for the parser"""
+    if isinstance(body, (bytes, bytearray)):
+        for start in range(0, len(body), PARSE_CHUNK_SIZE):
+            yield body[start : start + PARSE_CHUNK_SIZE]
+    else:
+        yield from body
+
+
+def iter_result_events(body: bytes | Iterable[bytes]) -> Iterator[tuple[str, XmlElement, int]]:
+    """
+    Parse a SOAP response incrementally, and yield the events for the content of the result element.
+
+    Elements are released after their "end" event, so memory use doesn't grow with the size of the response. A SOAP
+    fault is raised as a `suds.WebFault`, like suds does.
+
+    Args:
+        body : The response, as bytes or an iterable of blocks of bytes
+
+    Returns:
+        Iterator[tuple[str, Element, int]] : The event ("start" or "end"), the element and its depth below the result
+            element (the result element itself has depth 0)
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    # Depth of the element in the whole document, and of the result element once it is found
+    depth = 0
+    result_depth = None
+    stack: list[XmlElement] = []
+    fault_texts: dict[str, str] | None = None
+
+    for block in _feed(body):
+        parser.feed(block)
+        for event, element in parser.read_events():
+            if event == "start":
+                depth += 1
+                stack.append(element)
+
+                # Envelope (1) / Body (2) / {action}Response or Fault (3) / {action}Result (4)
+                if result_depth is None and depth == 3 and local_name(element.tag) == "Fault":
+                    fault_texts = {}
+                elif result_depth is None and depth == 4:
+                    result_depth = depth
+
+                if result_depth is not None and depth >= result_depth:
+                    yield event, element, depth - result_depth  # type: ignore[misc]
+
+            else:
+                if fault_texts is not None:
+                    if depth == 3:
+                        _raise_fault(fault_texts)
+                    fault_texts[local_name(element.tag)] = (element.text or "").strip()
+                elif result_depth is not None and depth >= result_depth:
+                    yield event, element, depth - result_depth  # type: ignore[misc]
+
+                stack.pop()
+                depth -= 1
+                # Release the element, it is the last child of its parent
+                if stack:
+                    del stack[-1][-1]
+
+    parser.close()
+
+
+def _raise_fault(texts: dict[str, str]) -> None:
+    """Raise a SOAP 1.1 or 1.2 fault as a suds WebFault"""
+    fault = Factory.object("Fault")
+    fault.faultcode = texts.get("faultcode", texts.get("Value", ""))
+    fault.faultstring = texts.get("faultstring", texts.get("Text", ""))
+
+    raise WebFault(fault, None)
+
+
+def parse_response(body: bytes | Iterable[bytes]) -> SudsObject | Text | None:
+    """
+    Parse a SOAP response of Relatics into the same objects suds would create for it, without using the WSDL.
+
+    Args:
+        body : The response, as bytes or an iterable of blocks of bytes
+
+    Returns:
+        SudsObject | Text | None : The content of the result element
+    """
+    stack: list[list[tuple[str, object]]] = []
+    result: object = Text("")
+
+    for event, element, depth in iter_result_events(body):
+        if event == "start":
+            stack.append([])
+            continue
+
+        value = _unmarshal(element, stack.pop())
+        if depth == 0:
+            result = value
+        else:
+            stack[-1].append((local_name(element.tag), value))
+
+    return result  # type: ignore[return-value]
+
+
+class _RecordedBlocks:
+    """The blocks of a response while they are parsed, recorded until `stop()` is called"""
+
+    def __init__(self, body: Iterable[bytes]):
+        self._body = iter(body)
+        self._blocks: list[bytes] | None = []
+
+    def __iter__(self) -> Iterator[bytes]:
+        for block in self._body:
+            if self._blocks is not None:
+                self._blocks.append(block)
+            yield block
+
+    def stop(self) -> None:
+        """Stop recording, once the parsed blocks are no longer needed to return the response as a whole"""
+        self._blocks = None
+
+    def read(self) -> bytes:
+        """The recorded blocks and the rest of the response"""
+        return b"".join(self._blocks or []) + b"".join(self._body)
+
+
+def parse_import_response(body: bytes | Iterable[bytes], callbacks: ImportCallbacks | None = None) -> ImportResult:
+    """
+    Parse the SOAP response of an import straight into an ImportResult, without building suds objects.
+
+    Args:
+        body : The response, as bytes or an iterable of blocks of bytes while it is received
+        callbacks : Optional callbacks, fired for every message and element while they are parsed
+
+    Returns:
+        ImportResult : Parsed result of the import
+    """
+    result = ImportResult()
+    root = None
+    # The start of a streamed response is kept, until it is clear it doesn't need to be parsed by suds
+    recorded = None if isinstance(body, (bytes, bytearray)) else _RecordedBlocks(body)
+
+    for event, element, depth in iter_result_events(body if recorded is None else recorded):
+        if depth == 1 and event == "start":
+            root = local_name(element.tag)
+            if root not in ("Import", "Export"):
+                break
+            if recorded is not None:
+                recorded.stop()
+            continue
+        if event != "end":
+            continue
+
+        name = local_name(element.tag)
+        if root == "Import" and name == "Message" and depth == 2:
+            result._add_message(  # pylint: disable=protected-access
+                element.get("Time", ""), element.get("Result", ""), element.text or "", callbacks
+            )
+        elif root == "Import" and name == "Element" and depth == 3:
+            result._add_element(  # pylint: disable=protected-access
+                element.get("Action", ""), element.get("ID", ""), element.get("ForeignKey", ""), callbacks
+            )
+        elif root == "Export" and depth == 1:
+            result.has_error = True
+            result.error_msg = element.get("Error", "")
+            log.info("Received an error response from the import request: %s", result.error_msg)
+
+    if root not in ("Import", "Export"):
+        # Anything else is handled, including logging, the same way as a response parsed by suds
+        response = parse_response(body if recorded is None else recorded.read())
+        return ImportResult.from_suds(response, callbacks)  # type: ignore[arg-type]
+
+    return result
@@ -0,0 +1,408 @@
+import asyncio
+import json
+import os
+from abc import ABC
+from abc import abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from dataclasses import replace
+from datetime import timedelta
+from hashlib import sha256
+from logging import getLogger
+from threading import Lock
+from time import monotonic
+from time import time
+from typing import Awaitable
+from typing import Callable
+from typing import TypeVar
+
+from .utils import write_file_atomic
+
+T = TypeVar("T")
+
+log = getLogger(__name__)
+
+
+def result_cache_key(
+    hostname: str,
+    workspace_id: str,
+    operation_name: str,
+    parameters: dict[str, str] | None,
+    identity: str,
+) -> str:
+    """
+    Key of a GetResult request in the result cache.
+
+    Args:
+        hostname : The Relatics hostname
+        workspace_id : The ID of the workspace
+        operation_name : The "OperationName" of the webservice
+        parameters : The parameters of the request, in any order
+        identity : Identity of the authentication, without secrets
+
+    Returns:
+        str : A hash of all parts of the request
+    """
+    request = [hostname, workspace_id, operation_name, sorted((parameters or {}).items()), identity]
+    return sha256(json.dumps(request, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResultStore(ABC):
+    """
+    Base class of a store for the result cache, keeping the response bodies of GetResult requests.
+
+    Subclasses implement `get()`, `set()`, `delete()` and `clear()`, and must be safe to use from multiple threads.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None:
+        """
+        Get the stored response body for the key.
+
+        Args:
+            key : The key of the request
+
+        Returns:
+            bytes | None : The response body, or None when it isn't stored or expired
+        """
+
+    @abstractmethod
+    def set(self, key: str, body: bytes, ttl: float) -> None:
+        """
+        Store the response body for the key, replacing any previous body.
+
+        Args:
+            key : The key of the request
+            body : The response body
+            ttl : Seconds after which the body expires
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove the response body for the key, when stored"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove all response bodies"""
+
+
+class MemoryResultStore(ResultStore):
+    """
+    In-memory store for the result cache, evicting the least recently used bodies.
+
+    Args:
+        max_entries : Maximum number of stored bodies. Defaults to 256.
+        max_size : Maximum total size in bytes of the stored bodies. Defaults to 64 MB.
+    """
+
+    max_entries: int
+    """Maximum number of stored bodies"""
+    max_size: int
+    """Maximum total size in bytes of the stored bodies"""
+
+    def __init__(self, max_entries: int = 256, max_size: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._lock = Lock()
+        self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._size = 0
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= monotonic():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, body: bytes, ttl: float) -> None:
+        if len(body) > self.max_size:
+            log.debug("Response of %d bytes is too large for the result cache", len(body))
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (body, monotonic() + ttl)
+            self._size += len(body)
+
+            while len(self._entries) > self.max_entries or self._size > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+
+class FileResultStore(ResultStore):
+    """
+    On-disk store for the result cache, so multiple processes on the same machine share the results.
+
+    Every body is stored in its own file, only readable by the current user. When the total size exceeds `max_size`,
+    the least recently used files are removed.
+
+    Args:
+        location : The directory of the files. Created when it doesn't exist.
+        max_size : Maximum total size in bytes of the stored bodies. Defaults to 256 MB.
+    """
+
+    location: str
+    """The directory of the files"""
+    max_size: int
+    """Maximum total size in bytes of the stored bodies"""
+
+    def __init__(self, location: str, max_size: int = 256 * 1024 * 1024):
+        self.location = location
+        self.max_size = max_size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.location, f"result_{key}.bin")
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as result_file:
+                expires_on = float(result_file.readline())
+                if expires_on <= time():
+                    body = None
+                else:
+                    body = result_file.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            log.warning("Ignoring unreadable result file %s", path, exc_info=True)
+            return None
+
+        if body is None:
+            self.delete(key)
+            return None
+
+        # The modification time is the moment of the last use, for evicting the least recently used files
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return body
+
+    def set(self, key: str, body: bytes, ttl: float) -> None:
+        if len(body) > self.max_size:
+            log.debug("Response of %d bytes is too large for the result cache", len(body))
+            return
+
+        write_file_atomic(self._path(key), [f"{time() + ttl}\n".encode("ascii"), body])
+
+        self._evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        for name, _, _ in self._files():
+            self.delete(name[len("result_") : -len(".bin")])
+
+    def _files(self) -> list[tuple[str, int, float]]:
+        """The stored files with their size and modification time"""
+        files = []
+        try:
+            with os.scandir(self.location) as entries:
+                for entry in entries:
+                    if entry.name.startswith("result_") and entry.name.endswith(".bin"):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        files.append((entry.name, stat.st_size, stat.st_mtime))
+        except FileNotFoundError:
+            pass
+        return files
+
+    def _evict(self) -> None:
+        """Remove the least recently used files, until the total size is within `max_size`"""
+        files = self._files()
+        size = sum(file_size for _, file_size, _ in files)
+        for name, file_size, _ in sorted(files, key=lambda file: file[2]):
+            if size <= self.max_size:
+                break
+            self.delete(name[len("result_") : -len(".bin")])
+            size -= file_size
+
+
+@dataclass(slots=True)
+class CacheStatistics:
+    """
+    Data class with the statistics of a ResultCache
+    """
+
+    hits: int = 0
+    """Number of requests answered from the store"""
+    misses: int = 0
+    """Number of requests sent to Relatics"""
+    coalesced: int = 0
+    """Number of requests that waited for an identical request in flight, instead of being sent"""
+
+
+class ResultCache:
+    """
+    Opt-in cache of the results of GetResult requests, with a TTL per operation.
+
+    The response bodies are kept in a store: in memory by default, or on disk with a FileResultStore. Identical
+    requests that are in flight at the same time are coalesced, so only one of them is sent to Relatics and the others
+    wait for its response. Only successful results are stored.
+
+    Args:
+        store : The store of the response bodies. Defaults to a MemoryResultStore.
+        ttl : Time after which a stored result expires. Defaults to 5 minutes.
+        operation_ttls : Optional TTL per operation name, overriding `ttl`. A TTL of 0 disables caching for the
+            operation, but still coalesces identical requests.
+    """
+
+    store: ResultStore
+    """The store of the response bodies"""
+    ttl: timedelta
+    """Time after which a stored result expires"""
+    operation_ttls: dict[str, timedelta]
+    """TTL per operation name, overriding `ttl`"""
+
+    def __init__(
+        self,
+        store: ResultStore | None = None,
+        ttl: timedelta = timedelta(minutes=5),
+        operation_ttls: dict[str, timedelta] | None = None,
+    ):
+        self.store = MemoryResultStore() if store is None else store
+        self.ttl = ttl
+        self.operation_ttls = {} if operation_ttls is None else operation_ttls
+        self._lock = Lock()
+        self._in_flight: dict[str, Future] = {}
+        self._statistics = CacheStatistics()
+
+    @property
+    def statistics(self) -> CacheStatistics:
+        """A snapshot of the statistics of the cache"""
+        with self._lock:
+            return replace(self._statistics)
+
+    def ttl_for(self, operation_name: str) -> timedelta:
+        """The TTL of the results of the operation"""
+        return self.operation_ttls.get(operation_name, self.ttl)
+
+    def invalidate(self, key: str | None = None) -> None:
+        """Remove the result for the key from the store, or all results when no key is given"""
+        if key is None:
+            self.store.clear()
+        else:
+            self.store.delete(key)
+
+    def _join(self, key: str) -> tuple[Future, bool]:
+        """The future of the request in flight for the key, and whether the caller has to send the request"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._statistics.coalesced += 1
+                return future, False
+
+            self._statistics.misses += 1
+            future = self._in_flight[key] = Future()
+            return future, True
+
+    def _count_hit(self) -> None:
+        with self._lock:
+            self._statistics.hits += 1
+
+    def _finish(self, key: str, future: Future, body: bytes | None, error: BaseException | None) -> None:
+        with self._lock:
+            del self._in_flight[key]
+
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(body)
+
+    def get_or_fetch(
+        self,
+        key: str,
+        operation_name: str,
+        fetch: Callable[[], tuple[bytes, T]],
+        cacheable: Callable[[T], bool] | None = None,
+    ) -> tuple[bytes, T | None]:
+        """
+        Get the response body for the key from the store, or fetch it when it isn't stored.
+
+        Args:
+            key : The key of the request, see `result_cache_key()`
+            operation_name : The operation name, to determine the TTL
+            fetch : Callable sending the request and returning the response body, together with the result parsed
+                from it
+            cacheable : Optional check whether the parsed result is a successful result, so the body can be stored
+
+        Returns:
+            tuple[bytes, T | None] : The response body, and the parsed result when this call fetched it. None when
+                the body was taken from the store or from an identical request in flight.
+        """
+        body = self.store.get(key)
+        if body is not None:
+            self._count_hit()
+            return body, None
+
+        future, leader = self._join(key)
+        if not leader:
+            return future.result(), None
+
+        try:
+            body, result = fetch()
+            self._store(key, operation_name, body, cacheable is None or cacheable(result))
+        except BaseException as error:
+            self._finish(key, future, None, error)
+            raise
+
+        self._finish(key, future, body, None)
+        return body, result
+
+    async def get_or_fetch_async(
+        self,
+        key: str,
+        operation_name: str,
+        fetch: Callable[[], Awaitable[tuple[bytes, T]]],
+        cacheable: Callable[[T], bool] | None = None,
+    ) -> tuple[bytes, T | None]:
+        """Get the response body for the key, without blocking the event loop. See `get_or_fetch()`."""
+        body = await asyncio.to_thread(self.store.get, key)
+        if body is not None:
+            self._count_hit()
+            return body, None
+
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future), None
+
+        try:
+            body, result = await fetch()
+            await asyncio.to_thread(self._store, key, operation_name, body, cacheable is None or cacheable(result))
+        except BaseException as error:
+            self._finish(key, future, None, error)
+            raise
+
+        self._finish(key, future, body, None)
+        return body, result
+
+    def _store(self, key: str, operation_name: str, body: bytes, cacheable: bool) -> None:
+        ttl = self.ttl_for(operation_name).total_seconds()
+        if ttl > 0 and cacheable:
+            self.store.set(key, body, ttl)
@@ -1,25 +1,47 @@
-from base64 import b64decode
+import json
+import os
+from array import array
 from dataclasses import dataclass
 from dataclasses import field
+from dataclasses import replace
 from datetime import time as dt_time
 from datetime import timedelta
-from io import BytesIO
+from hashlib import sha256
 from logging import getLogger
-from typing import Literal
-from typing import TypeAlias
-from zipfile import ZipFile
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import Mapping
+from typing import MutableSequence
+from typing import Sequence
+from typing import TypeVar
 
-from colorama import Fore
 from colorama import Style
 from suds.sax.text import Text
+from suds.sudsobject import Factory
 from suds.sudsobject import Object as SudsObject
-
-# Type aliases
-ImportMessageStatus: TypeAlias = Literal["Progress", "Comment", "Success", "Warning", "Error"]
-ImportElementActions: TypeAlias = Literal["Add", "Update"]
+from suds.sudsobject import Property
+
+from .columns import ImportElement
+from .columns import ImportElementActions
+from .columns import ImportElements
+from .columns import ImportMessage
+from .columns import ImportMessages
+from .columns import ImportMessageStatus
+from .documents import Documents
+from .exceptions import ImportAbortedError
+from .utils import suds_get_as_list
+from .utils import write_file_atomic
+
+K = TypeVar("K")
+V = TypeVar("V")
 
 log = getLogger(__name__)
 
+SERIALIZATION_VERSION = 1
+"""Version of the format written by `to_bytes()` of the result classes"""
+
 
 class BaseResult:  # pylint: disable=R0903
     """
@@ -46,6 +68,80 @@ class BaseResult:  # pylint: disable=R0903
             log.info("Received an error response from the import request: %s", self.error_msg)
 
 
+def _encode_suds(value: Any, shapes: dict[tuple[str, bool, tuple[str, ...]], int]) -> Any:
+    """
+    Encode a suds value into plain JSON values. An object is a list of the number of its shape (the class name, whether
+    it is a property and the names of its items) followed by the values of its items, a list is a dict with the list.
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, SudsObject):
+        names = tuple(value.__keylist__)
+        number = shapes.setdefault((value.__class__.__name__, isinstance(value, Property), names), len(shapes))
+        return [number, *(_encode_suds(getattr(value, name), shapes) for name in names)]
+    if isinstance(value, list):
+        return {"list": [_encode_suds(item, shapes) for item in value]}
+    raise TypeError(f"A value of type {type(value).__name__} can't be serialized.")
+
+
+def _decode_suds(value: Any, shapes: list[tuple[type, bool, list[str]]]) -> Any:
+    """Decode a value encoded by `_encode_suds()` into the same suds objects, with the texts as suds Text"""
+    if isinstance(value, str):
+        return Text(value)
+    if isinstance(value, list):
+        subclass, is_property, names = shapes[value[0]]
+        obj = subclass(None) if is_property else subclass()
+        obj.__keylist__ = list(names)
+        obj.__dict__.update(zip(names, [_decode_suds(item, shapes) for item in value[1:]]))
+        return obj
+    if isinstance(value, dict):
+        return [_decode_suds(item, shapes) for item in value["list"]]
+    return value
+
+
+def _suds_shapes(shapes: list[list]) -> list[tuple[type, bool, list[str]]]:
+    """The suds class, whether it is a property and the names of the items, per shape written by `_encode_suds()`"""
+    return [
+        (Factory.subclass(name, Property if is_property else SudsObject), is_property, names)
+        for name, is_property, names in shapes
+    ]
+
+
+def _dump(kind: str, result: BaseResult, content: dict[str, Any]) -> bytes:
+    """A serialized result: a single line of compact JSON"""
+    content = {
+        "format": kind,
+        "version": SERIALIZATION_VERSION,
+        "has_error": result.has_error,
+        "error_msg": result.error_msg,
+        **content,
+    }
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _load(kind: str, data: bytes) -> dict[str, Any]:
+    """The content of a serialized result, checking its format and version"""
+    try:
+        content = json.loads(data)
+    except ValueError as exc:
+        raise ValueError(f"The data isn't a serialized {kind}.") from exc
+
+    if not isinstance(content, dict) or content.get("format") != kind:
+        raise ValueError(f"The data isn't a serialized {kind}.")
+    if content["version"] != SERIALIZATION_VERSION:
+        raise ValueError(f"Version {content['version']} of the serialized {kind} isn't supported.")
+    return content
+
+
+def _store_documents(location: str, zip_bytes: bytes) -> str:
+    """Store the zip file of documents by the hash of its contents, and return the hash as reference"""
+    reference = sha256(zip_bytes).hexdigest()
+    path = os.path.join(location, f"documents_{reference}.zip")
+    if not os.path.exists(path):
+        write_file_atomic(path, [zip_bytes])
+    return reference
+
+
 # pylint: disable=W0212
 @dataclass(kw_only=True, slots=True)
 class ExportResult(BaseResult):
@@ -56,7 +152,7 @@ class ExportResult(BaseResult):
     """
 
     data: SudsObject | None = None
-    documents: dict[str, bytes] = field(default_factory=dict)
+    documents: Documents = field(default_factory=Documents)
 
     @staticmethod
     def from_suds(suds_response: SudsObject) -> "ExportResult":
@@ -82,17 +178,8 @@ class ExportResult(BaseResult):
         ):
             result.has_error = False
 
-            # The the base64 encoded contents as a zip file
-            result.documents = {}
-
-            with ZipFile(BytesIO(b64decode(str(suds_response.Report.Documents))), "r") as docs_zip:
-                for zipped_file in docs_zip.filelist:
-                    result.documents[zipped_file.filename] = docs_zip.read(zipped_file.filename)
-
-            # Cleanup variable without further use
-            del docs_zip
-            if "zipped_file" in locals():
-                del zipped_file  # pylint: disable=W0631
+            # Keep the base64 decoded zip file, the documents are only decompressed when accessed
+            result.documents = Documents.from_b64(str(suds_response.Report.Documents))
 
             # Delete the Document node from the sudsobject
             del suds_response.Report.Documents
@@ -107,6 +194,63 @@ class ExportResult(BaseResult):
 
         return result
 
+    def to_bytes(self, documents_location: str | None = None) -> bytes:
+        """
+        Serialize the result, to pass it to another process or store it, without the suds objects of `data`.
+
+        The data is written as a line of compact JSON, followed by the zip file with the documents. With a location,
+        the zip file is stored there by the hash of its contents instead, and only referenced.
+
+        Args:
+            documents_location : Directory to store the documents in, shared by the results referencing them
+
+        Response:
+            bytes : The serialized result, see `from_bytes()`
+        """
+        shapes: dict[tuple[str, bool, tuple[str, ...]], int] = {}
+        content: dict[str, Any] = {"data": _encode_suds(self.data, shapes), "documents": None}
+        content["shapes"] = [[name, is_property, list(names)] for name, is_property, names in shapes]
+        zip_bytes = self.documents.zip_bytes
+        if zip_bytes and documents_location is not None:
+            content["documents"] = {"sha256": _store_documents(documents_location, zip_bytes)}
+        elif zip_bytes:
+            content["documents"] = {"size": len(zip_bytes)}
+
+        data = _dump("ExportResult", self, content)
+        return data + b"\n" + zip_bytes if zip_bytes and documents_location is None else data
+
+    @staticmethod
+    def from_bytes(data: bytes, documents_location: str | None = None) -> "ExportResult":
+        """
+        Restore a result serialized with `to_bytes()`, with the same suds objects in `data`.
+
+        Args:
+            data : The serialized result
+            documents_location : Directory the documents were stored in, when they were stored by reference
+
+        Response:
+            ExportResult : The restored result.
+        """
+        line, _, zip_bytes = data.partition(b"\n")
+        content = _load("ExportResult", line)
+
+        reference = (content["documents"] or {}).get("sha256")
+        if reference is not None:
+            if documents_location is None:
+                raise ValueError("The documents are stored by reference, supply the documents_location.")
+            with open(os.path.join(documents_location, f"documents_{reference}.zip"), "rb") as documents_file:
+                zip_bytes = documents_file.read()
+
+        result = ExportResult(
+            data=_decode_suds(content["data"], _suds_shapes(content["shapes"])), documents=Documents(zip_bytes or None)
+        )
+        result.has_error = content["has_error"]
+        result.error_msg = content["error_msg"]
+        return result
+
+    def __reduce__(self):
+        return (ExportResult.from_bytes, (self.to_bytes(),))
+
     def __bool__(self) -> bool:
         return not self.has_error
 
@@ -124,82 +268,305 @@ class ExportResult(BaseResult):
         if self.documents:
             result += "[Documents]: \n"
             result += Style.BRIGHT + "RelaticsFilename                              Size (bytes)\n" + Style.RESET_ALL
-            for key, value in self.documents.items():
-                result += f"{key:45} {len(value):>12}\n"
+            for key in self.documents:
+                result += f"{key:45} {self.documents.size(key):>12}\n"
 
         return result
 
+    def to_columns(self, path: str | list[str] | None = None) -> dict[str, list[str | None]]:
+        """
+        Convert the rows of the report into columns: a list of values per attribute of the row elements.
+
+        The columns are filled straight from the parsed report, without building a dict per row. A value is None when
+        a row doesn't have the attribute. Child elements of the rows are skipped.
+
+        Args:
+            path : The path to the row elements in `data`, like `["Report", "Employees", "Employee"]`. When None, the
+                path is inferred from the report, see `infer_row_path()`.
+
+        Returns:
+            dict[str, list[str | None]] : The values per column, in the order the attributes first appear
+        """
+        if path is None:
+            path = self.infer_row_path()
+
+        columns: dict[str, list[str | None]] = {}
+
+        # A single row isn't returned as a list by suds
+        for index, row in enumerate(suds_get_as_list(self.data, path)):
+            # An element without attributes is only its text
+            items = [("value", row)] if isinstance(row, Text) else row
+
+            for name, value in items:
+                if name[0] == "_":
+                    name = name[1:]
+                elif name != "value" or not isinstance(value, Text):
+                    continue
+
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [None] * index
+                column.append(str(value))
+
+            # Pad the columns of the attributes this row doesn't have
+            for column in columns.values():
+                if len(column) == index:
+                    column.append(None)
+
+        return columns
+
+    def infer_row_path(self) -> list[str]:
+        """
+        Infer the path to the row elements of the report.
+
+        Starting at the report, elements with a single type of child element and no attributes of their own are
+        followed down. The first repeated element, or element with attributes, is taken as the row element.
+
+        Returns:
+            list[str] : The path to the row elements in `data`
+
+        Raises:
+            ValueError: When there is no report, or the report has different types of row elements
+        """
+        if not hasattr(self.data, "Report"):
+            raise ValueError("The result doesn't contain a report.")
+
+        path = ["Report"]
+        current = self.data.Report  # type: ignore[union-attr]
+
+        while True:
+            children = [name for name, _ in current if name[0] != "_"]
+            if len(children) != 1:
+                candidates = ", ".join(".".join([*path, name]) for name in children) or "none"
+                raise ValueError(f"The row elements of the report can't be inferred, candidates are: {candidates}.")
+
+            path.append(children[0])
+            current = getattr(current, children[0])
+            if current is None or isinstance(current, (list, Text)) or any(name[0] == "_" for name, _ in current):
+                return path
+
+    def to_arrow(self, path: str | list[str] | None = None) -> Any:
+        """
+        Convert the rows of the report into a `pyarrow.Table`, with a string column per attribute. Requires pyarrow.
+
+        Args:
+            path : The path to the row elements in `data`, see `to_columns()`
+
+        Returns:
+            pyarrow.Table : The rows of the report
+        """
+        try:
+            import pyarrow  # pylint: disable=import-outside-toplevel
+        except ImportError as exc:
+            raise ImportError("Converting to an Arrow table requires pyarrow: pip install pyrelatics2[arrow]") from exc
+
+        return pyarrow.table(self.to_columns(path))
+
+    def to_pandas(self, path: str | list[str] | None = None) -> Any:
+        """
+        Convert the rows of the report into a `pandas.DataFrame`, with a column per attribute. Requires pandas.
+
+        Args:
+            path : The path to the row elements in `data`, see `to_columns()`
+
+        Returns:
+            pandas.DataFrame : The rows of the report
+        """
+        try:
+            import pandas  # pylint: disable=import-outside-toplevel
+        except ImportError as exc:
+            raise ImportError("Converting to a DataFrame requires pandas: pip install pyrelatics2[pandas]") from exc
+
+        return pandas.DataFrame(self.to_columns(path))
+
 
 # pylint: enable=W0212
 
 
 @dataclass(kw_only=True, slots=True)
-class ImportMessage:
+class RowResult:
     """
-    Data class for a message in the result of an import
+    Data class linking a row of the supplied data to the messages and elements of its import.
+
+    Will evaluate as Falsy when there is an error message about the row, otherwise Truthy.
     """
 
-    time: dt_time | str
-    status: ImportMessageStatus
-    message: str
-    row: int
-
-    status_fore_color = {
-        "Progress": Fore.BLUE,
-        "Comment": Fore.RESET,
-        "Success": Fore.GREEN,
-        "Warning": Fore.YELLOW,
-        "Error": Fore.RED,
-    }
+    index: int
+    """Position of the row in the supplied data"""
+    row: dict[str, str]
+    """The supplied row"""
+    messages: list[ImportMessage] = field(default_factory=list)
+    """The messages about the row"""
+    elements: list[ImportElement] = field(default_factory=list)
+    """The elements with the foreign key of the row"""
 
-    def __post_init__(self):
-        """
-        Convert a date given as string into a date
-        """
-        if isinstance(self.time, str):
-            self.time = dt_time.fromisoformat(self.time)
+    def __bool__(self) -> bool:
+        return not self.has_error
 
-    def __str__(self) -> str:
-        status_color = self.status_fore_color[self.status]
-        return f"{self.time}  {self.row:05}  {status_color}{self.status:<8}{Fore.RESET}  {self.message}"
+    @property
+    def has_error(self) -> bool:
+        """Whether there is an error message about the row"""
+        return any(msg.status == "Error" for msg in self.messages)
+
+    @property
+    def has_warning(self) -> bool:
+        """Whether there is a warning message about the row"""
+        return any(msg.status == "Warning" for msg in self.messages)
 
 
 @dataclass(kw_only=True, slots=True)
-class ImportElement:
+class ImportCallbacks:
     """
-    Data class for a changed element in the result of an import
+    Data class with callbacks fired while the response of an import is parsed, for every message and element.
+
+    With the raw engine of `RelaticsWebservices`, the response is parsed while it is received. A callback can stop the
+    parsing by raising an exception, which is raised by `run_import()`. Relatics already processed the whole import
+    then, only the rest of the response is skipped.
     """
 
-    action: ImportElementActions
-    id: str  # pylint: disable=invalid-name
-    foreign_key: str
+    on_message: Callable[[ImportMessage], None] | None = None
+    """Called with every message"""
+    on_element: Callable[[ImportElement], None] | None = None
+    """Called with every changed element"""
+    on_progress: Callable[[int], None] | None = None
+    """Called with the row number, when Relatics reports it is processing the row"""
+    abort_on_error: bool = False
+    """Raise an ImportAbortedError at the first error message"""
+    keep_messages: bool = True
+    """Keep the messages and elements in the ImportResult. Otherwise, only the totals are kept."""
 
-    def __str__(self) -> str:
-        return f"{self.action:<6}  {self.id}  {self.foreign_key}"
+
+class _ImportIndex:  # pylint: disable=R0902
+    """
+    Indexes of the messages and elements of an ImportResult, by status, row, action, foreign key and ID.
+
+    The indexes hold the positions of the messages and elements in the given lists as they are now, and are kept up to
+    date by `add_message()` and `add_element()`. When the lists were changed otherwise, `is_current()` is False and
+    the indexes are rebuilt. Changes other than adding at the end are detected by the version of ImportMessages and
+    ImportElements, for plain lists only by their length.
+    """
+
+    __slots__ = (
+        "messages",
+        "elements",
+        "message_count",
+        "element_count",
+        "versions",
+        "last_row",
+        "messages_by_status",
+        "messages_by_row",
+        "elements_by_action",
+        "elements_by_foreign_key",
+        "elements_by_id",
+    )
+
+    def __init__(self, messages: MutableSequence[ImportMessage], elements: MutableSequence[ImportElement]):
+        self.messages = messages
+        self.elements = elements
+        self.message_count = 0
+        self.element_count = 0
+        self.versions = self._versions(messages, elements)
+        self.last_row = 0
+        self.messages_by_status: dict[str, array] = {}
+        self.messages_by_row: dict[int, array] = {}
+        self.elements_by_action: dict[str, array] = {}
+        self.elements_by_foreign_key: dict[str, int] = {}
+        self.elements_by_id: dict[str, int] = {}
+
+        if isinstance(messages, ImportMessages):
+            for position in range(len(messages)):
+                self.add_message(messages.status(position), messages.row(position))
+        else:
+            for msg in messages:
+                self.add_message(msg.status, msg.row)
+        for elem in elements:
+            self.add_element(elem.action, elem.id, elem.foreign_key)
+
+    def is_current(self, messages: MutableSequence[ImportMessage], elements: MutableSequence[ImportElement]) -> bool:
+        """Whether the indexes cover the lists, which were only added to since the indexes were built"""
+        return (
+            self.messages is messages
+            and self.elements is elements
+            and self.message_count == len(messages)
+            and self.element_count == len(elements)
+            and self.versions == self._versions(messages, elements)
+        )
+
+    @staticmethod
+    def _versions(messages: Sequence[ImportMessage], elements: Sequence[ImportElement]) -> tuple[int, int]:
+        """The versions of ImportMessages and ImportElements, or 0 for lists without a version"""
+        return getattr(messages, "version", 0), getattr(elements, "version", 0)
+
+    def add_message(self, status: str, row: int) -> None:
+        """Add the next message to the indexes"""
+        position = self.message_count
+        self.message_count += 1
+        self.last_row = row
+        self.messages_by_status.setdefault(status, array("q")).append(position)
+        self.messages_by_row.setdefault(row, array("q")).append(position)
+
+    def add_element(self, action: str, id: str, foreign_key: str) -> None:  # pylint: disable=W0622
+        """Add the next element to the indexes"""
+        position = self.element_count
+        self.element_count += 1
+        self.elements_by_action.setdefault(action, array("q")).append(position)
+        if foreign_key:
+            self.elements_by_foreign_key[foreign_key] = position
+        self.elements_by_id[id] = position
+
+
+class _IndexMapping(Mapping[K, V]):
+    """Read-only mapping of an index, with the items at the positions in the index as values"""
+
+    __slots__ = ("_positions", "_items")
+
+    def __init__(self, positions: dict[K, Any], items: Sequence):
+        self._positions = positions
+        self._items = items
+
+    def __getitem__(self, key: K) -> V:
+        positions = self._positions[key]
+        if isinstance(positions, int):
+            return self._items[positions]
+        return [self._items[position] for position in positions]  # type: ignore[return-value]
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._positions
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
 
 
 # pylint: disable=W0212
 @dataclass(kw_only=True, slots=True)
-class ImportResult(BaseResult):
+class ImportResult(BaseResult):  # pylint: disable=R0904
     """
     Data class containing the result of an import
 
     Will evaluate as Falsy when an error response was received from the import request, otherwise Truthy.
     """
 
-    messages: list[ImportMessage] = field(default_factory=list)
-    elements: list[ImportElement] = field(default_factory=list)
+    messages: MutableSequence[ImportMessage] = field(default_factory=ImportMessages)
+    elements: MutableSequence[ImportElement] = field(default_factory=ImportElements)
     total_rows: int | None = None
     elapsed_time: timedelta | None = None
+    _index: _ImportIndex | None = field(default=None, init=False, repr=False, compare=False)
 
     # "ImportResult", see https://peps.python.org/pep-0484/#forward-references
     @staticmethod
-    def from_suds(suds_response: SudsObject) -> "ImportResult":
+    def from_suds(suds_response: SudsObject, callbacks: ImportCallbacks | None = None) -> "ImportResult":
         """
         Parse raw suds response <sudsobject> for messages and elements and respond with a filled ImportResult object
 
         Args:
             suds_response : Raw <sudsobject> response from the import request
+            callbacks : Optional callbacks, fired for every message and element
 
         Response:
             ImportResult : Parsed result of the import.
@@ -214,20 +581,9 @@ class ImportResult(BaseResult):
 
             # Add all the messages when available
             if hasattr(suds_response.Import, "Message"):
-                row = 0
-                for msg in suds_response.Import.Message:
-                    # Monitor any row changes
-                    if msg._Result == "Progress":
-                        if "Processing row :" in msg.value:
-                            row = int(msg.value[17:])
-                        elif "Total rows imported:" in msg.value:
-                            result.total_rows = int(msg.value[21:])
-                        elif "Total time (ms):" in msg.value:
-                            result.elapsed_time = timedelta(milliseconds=int(msg.value[17:]))
-
-                    result.messages.append(
-                        ImportMessage(time=msg._Time, status=msg._Result, message=msg.value, row=row)
-                    )
+                # A single message isn't returned as a list by suds
+                for msg in suds_get_as_list(suds_response.Import, "Message"):
+                    result._add_message(str(msg._Time), str(msg._Result), str(msg.value), callbacks)
 
             # Add all the elements when available
             if hasattr(suds_response.Import, "Elements") and len(suds_response.Import.Elements) > 0:
@@ -236,9 +592,7 @@ class ImportResult(BaseResult):
                 elements = _elements if isinstance(_elements, list) else [] if _elements is None else [_elements]
 
                 for elem in elements:
-                    result.elements.append(
-                        ImportElement(action=elem._Action, id=elem._ID, foreign_key=elem._ForeignKey)
-                    )
+                    result._add_element(str(elem._Action), str(elem._ID), str(elem._ForeignKey), callbacks)
 
         if not hasattr(suds_response, "Export") and not hasattr(suds_response, "Import"):
             result.has_error = True
@@ -247,6 +601,264 @@ class ImportResult(BaseResult):
 
         return result
 
+    def add_message(self, time: dt_time | str, status: ImportMessageStatus, message: str) -> ImportMessage:
+        """
+        Add a message to the result, keeping track of the row being processed and the totals reported by Relatics
+
+        Args:
+            time : Time of the message
+            status : Status of the message
+            message : The message itself
+
+        Returns:
+            ImportMessage : The added message
+        """
+        self._add_message(time=time if isinstance(time, str) else time.isoformat(), status=status, message=message)
+        return self.messages[-1]
+
+    def _add_message(self, time: str, status: str, message: str, callbacks: ImportCallbacks | None = None) -> None:
+        """Add a message, without creating an ImportMessage when the messages are stored as columns"""
+        index = self._indexes()
+        row = index.last_row
+        processing = False
+
+        # Monitor any row changes
+        if status == "Progress":
+            if "Processing row :" in message:
+                row = int(message[17:])
+                processing = True
+            elif "Total rows imported:" in message:
+                self.total_rows = int(message[21:])
+            elif "Total time (ms):" in message:
+                self.elapsed_time = timedelta(milliseconds=int(message[17:]))
+
+        if callbacks is not None and not callbacks.keep_messages:
+            index.last_row = row
+        elif isinstance(self.messages, ImportMessages):
+            self.messages.add(time=time, status=status, message=message, row=row)
+            index.add_message(status, row)
+        else:
+            self.messages.append(ImportMessage(time=time, status=status, message=message, row=row))  # type: ignore
+            index.add_message(status, row)
+
+        if callbacks is None:
+            return
+        if processing and callbacks.on_progress is not None:
+            callbacks.on_progress(row)
+
+        aborting = callbacks.abort_on_error and status == "Error"
+        if callbacks.on_message is not None or aborting:
+            import_message = ImportMessage(time=time, status=status, message=message, row=row)  # type: ignore
+            if callbacks.on_message is not None:
+                callbacks.on_message(import_message)
+            if aborting:
+                log.info("Import result aborted at the first error message, in row %s", row)
+                raise ImportAbortedError(import_message, self)
+
+    def add_element(
+        self, action: ImportElementActions, id: str, foreign_key: str  # pylint: disable=W0622
+    ) -> ImportElement:
+        """
+        Add an element that Relatics added or updated to the result
+
+        Args:
+            action : The action performed on the element
+            id : The ID of the element
+            foreign_key : The foreign key of the element
+
+        Returns:
+            ImportElement : The added element
+        """
+        self._add_element(action=action, id=id, foreign_key=foreign_key)
+        return self.elements[-1]
+
+    def _add_element(
+        self, action: str, id: str, foreign_key: str, callbacks: ImportCallbacks | None = None  # pylint: disable=W0622
+    ) -> None:
+        """Add an element, without creating an ImportElement when the elements are stored as columns"""
+        if callbacks is None or callbacks.keep_messages:
+            index = self._indexes()
+            if isinstance(self.elements, ImportElements):
+                self.elements.add(action=action, id=id, foreign_key=foreign_key)
+            else:
+                self.elements.append(ImportElement(action=action, id=id, foreign_key=foreign_key))  # type: ignore
+            index.add_element(action, id, foreign_key)
+
+        if callbacks is not None and callbacks.on_element is not None:
+            callbacks.on_element(ImportElement(action=action, id=id, foreign_key=foreign_key))  # type: ignore
+
+    @staticmethod
+    def merge(results: Iterable[tuple[int, "ImportResult"]]) -> "ImportResult":
+        """
+        Merge the results of the chunks of a single import into one ImportResult.
+
+        The row numbers of the messages are remapped from the row in the chunk to the row in the original data, by
+        adding the index of the first row of the chunk. Messages that aren't about a specific row keep row 0.
+
+        Args:
+            results : The index of the first row of each chunk in the original data, with the result of that chunk
+
+        Response:
+            ImportResult : Aggregated result of the import.
+        """
+        result = ImportResult()
+        error_msgs: list[str] = []
+
+        for row_offset, chunk_result in sorted(results, key=lambda item: item[0]):
+            if chunk_result.has_error:
+                result.has_error = True
+                if chunk_result.error_msg:
+                    error_msgs.append(chunk_result.error_msg)
+
+            result.messages.extend(
+                replace(msg, row=msg.row + row_offset) if msg.row > 0 else msg for msg in chunk_result.messages
+            )
+            result.elements.extend(chunk_result.elements)
+
+            if chunk_result.total_rows is not None:
+                result.total_rows = (result.total_rows or 0) + chunk_result.total_rows
+            if chunk_result.elapsed_time is not None:
+                result.elapsed_time = (result.elapsed_time or timedelta()) + chunk_result.elapsed_time
+
+        if result.has_error:
+            result.error_msg = "\n".join(error_msgs)
+
+        return result
+
+    def row_results(self, data: Sequence[dict[str, str]], foreign_key: str | None = None) -> list[RowResult]:
+        """
+        Correlate the messages and elements with the rows of the supplied data.
+
+        The messages are linked by their row number, where row 1 is the first row of the data. The elements are linked
+        by their foreign key, when `foreign_key` names the column of the rows with the foreign key.
+
+        Args:
+            data : The rows that were sent to the import
+            foreign_key : Optional column of the rows with the foreign key of the element in Relatics
+
+        Returns:
+            list[RowResult] : The result of every row, in the order of the data
+        """
+        results = [RowResult(index=index, row=row) for index, row in enumerate(data)]
+
+        index = self._indexes()
+        for row, positions in index.messages_by_row.items():
+            if 0 < row <= len(results):
+                results[row - 1].messages = [self.messages[position] for position in positions]
+
+        if foreign_key is not None:
+            for result in results:
+                if foreign_key not in result.row:
+                    continue
+                position = index.elements_by_foreign_key.get(str(result.row[foreign_key]))
+                if position is not None:
+                    result.elements.append(self.elements[position])
+
+        return results
+
+    def failed_rows(self, statuses: Iterable[ImportMessageStatus] = ("Error",)) -> list[int]:
+        """
+        The positions in the supplied data of the rows with a message of one of the statuses.
+
+        Args:
+            statuses : The statuses of the messages of a failed row. Defaults to only "Error".
+
+        Returns:
+            list[int] : Sorted positions of the failed rows, where 0 is the first row of the data
+        """
+        index = self._indexes()
+        rows = {
+            self.messages[position].row - 1
+            for status in set(statuses)
+            for position in index.messages_by_status.get(status, ())
+        }
+        return sorted(row for row in rows if row >= 0)
+
+    def replace_rows(self, indexes: Sequence[int], resubmitted: "ImportResult") -> "ImportResult":
+        """
+        Combine the result with the result of resubmitting some of its rows.
+
+        The messages about the resubmitted rows are replaced by the messages of the resubmission, with their row
+        numbers remapped to the rows of the original data. The elements and elapsed times are added up. When the
+        resubmission failed as a whole, the combined result fails as well.
+
+        Args:
+            indexes : The positions in the original data of the resubmitted rows, in the order they were resubmitted
+            resubmitted : The result of the resubmission
+
+        Response:
+            ImportResult : Combined result of the import.
+        """
+        replaced = set(indexes)
+        result = ImportResult(total_rows=self.total_rows, elapsed_time=self.elapsed_time)
+        if self.has_error or resubmitted.has_error:
+            result.has_error = True
+            result.error_msg = "\n".join(msg for msg in (self.error_msg, resubmitted.error_msg) if msg)
+        result.messages.extend(msg for msg in self.messages if msg.row - 1 not in replaced)
+        result.messages.extend(
+            replace(msg, row=indexes[msg.row - 1] + 1) if 0 < msg.row <= len(indexes) else msg
+            for msg in resubmitted.messages
+        )
+        result.elements.extend(self.elements)
+        result.elements.extend(resubmitted.elements)
+
+        if resubmitted.elapsed_time is not None:
+            result.elapsed_time = (result.elapsed_time or timedelta()) + resubmitted.elapsed_time
+
+        return result
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the result, to pass it to another process or store it.
+
+        The messages and elements are written as their columns in a line of compact JSON, the indexes are rebuilt
+        when they are used after `from_bytes()`.
+
+        Response:
+            bytes : The serialized result, see `from_bytes()`
+        """
+        messages = self.messages if isinstance(self.messages, ImportMessages) else ImportMessages(self.messages)
+        elements = self.elements if isinstance(self.elements, ImportElements) else ImportElements(self.elements)
+        elapsed_time = None if self.elapsed_time is None else self.elapsed_time // timedelta(microseconds=1)
+
+        return _dump(
+            "ImportResult",
+            self,
+            {
+                "total_rows": self.total_rows,
+                "elapsed_time": elapsed_time,
+                "messages": messages.to_json(),
+                "elements": elements.to_json(),
+            },
+        )
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "ImportResult":
+        """
+        Restore a result serialized with `to_bytes()`.
+
+        Args:
+            data : The serialized result
+
+        Response:
+            ImportResult : The restored result.
+        """
+        content = _load("ImportResult", data)
+        elapsed_time = content["elapsed_time"]
+
+        result = ImportResult(
+            messages=ImportMessages.from_json(content["messages"]),
+            elements=ImportElements.from_json(content["elements"]),
+            total_rows=content["total_rows"],
+            elapsed_time=None if elapsed_time is None else timedelta(microseconds=elapsed_time),
+        )
+        result.has_error = content["has_error"]
+        result.error_msg = content["error_msg"]
+        return result
+
+    def __reduce__(self):
+        return (ImportResult.from_bytes, (self.to_bytes(),))
+
     def __bool__(self) -> bool:
         return not self.has_error
 
@@ -276,6 +888,38 @@ class ImportResult(BaseResult):
 
         return result
 
+    def _indexes(self) -> _ImportIndex:
+        """The indexes of the messages and elements, rebuilt when the lists were changed without `add_message()`"""
+        index = self._index
+        if index is None or not index.is_current(self.messages, self.elements):
+            index = self._index = _ImportIndex(self.messages, self.elements)
+        return index
+
+    @property
+    def messages_by_status(self) -> Mapping[str, list[ImportMessage]]:
+        """The messages by their status. Statuses without messages aren't included."""
+        return _IndexMapping(self._indexes().messages_by_status, self.messages)
+
+    @property
+    def messages_by_row(self) -> Mapping[int, list[ImportMessage]]:
+        """The messages by their row number. Messages that aren't about a specific row have row 0."""
+        return _IndexMapping(self._indexes().messages_by_row, self.messages)
+
+    @property
+    def elements_by_action(self) -> Mapping[str, list[ImportElement]]:
+        """The elements by their action. Actions without elements aren't included."""
+        return _IndexMapping(self._indexes().elements_by_action, self.elements)
+
+    @property
+    def elements_by_foreign_key(self) -> Mapping[str, ImportElement]:
+        """The elements by their foreign key, for elements with a foreign key. The last one wins for duplicates."""
+        return _IndexMapping(self._indexes().elements_by_foreign_key, self.elements)
+
+    @property
+    def elements_by_id(self) -> Mapping[str, ImportElement]:
+        """The elements by their ID"""
+        return _IndexMapping(self._indexes().elements_by_id, self.elements)
+
     def filter_messages(self, status: ImportMessageStatus) -> list[ImportMessage]:
         """
         Return the list of messages with the given status
@@ -283,7 +927,7 @@ class ImportResult(BaseResult):
         Returns:
             list[ImportMessage]: List of messages
         """
-        return [_ for _ in self.messages if _.status == status]
+        return [self.messages[position] for position in self._indexes().messages_by_status.get(status, ())]
 
     # ["Progress", "Comment", "Success", "Warning", "Error"]
     @property
@@ -318,7 +962,7 @@ class ImportResult(BaseResult):
         Returns:
             list[ImportMessage]: List of messages
         """
-        return [_ for _ in self.elements if _.action == action]
+        return [self.elements[position] for position in self._indexes().elements_by_action.get(action, ())]
 
     # ["Add", "Update"]
     @property
@@ -333,3 +977,24 @@ class ImportResult(BaseResult):
 
 
 # pylint: enable=W0212
+
+
+@dataclass(kw_only=True, slots=True)
+class BatchResult:
+    """
+    Data class linking the outcome of a single job in a batch to that job.
+
+    Will evaluate as Falsy when the job raised an exception or its result contains an error, otherwise Truthy.
+    """
+
+    index: int
+    """Position of the job in the supplied jobs"""
+    job: tuple[str, Any]
+    """The job itself: the operation name with its parameters or data"""
+    result: ExportResult | ImportResult | None = None
+    """The result of the job, or None when an exception was raised"""
+    exception: BaseException | None = None
+    """The exception raised while running the job"""
+
+    def __bool__(self) -> bool:
+        return self.exception is None and bool(self.result)
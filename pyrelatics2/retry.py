@@ -0,0 +1,348 @@
+import asyncio
+import random
+import socket
+import time
+from dataclasses import dataclass
+from dataclasses import replace
+from http.client import BadStatusLine
+from http.client import IncompleteRead
+from logging import getLogger
+from threading import Lock
+from typing import Awaitable
+from typing import Callable
+from typing import Literal
+from typing import TypeAlias
+from typing import TypeVar
+
+from suds.transport import TransportError
+
+from .exceptions import CircuitOpenError
+
+log = getLogger(__name__)
+
+T = TypeVar("T")
+CircuitState: TypeAlias = Literal["closed", "open", "half_open"]
+
+TRANSIENT_STATUSES = frozenset({429, 500, 502, 503, 504})
+"""HTTP statuses of a failure that may succeed when the request is sent again"""
+UNPROCESSED_STATUSES = frozenset({429, 503})
+"""HTTP statuses of a request that was refused by the server, before it was processed"""
+
+# Errors of the connection, like resets and timeouts. Other OS errors, like certificate errors, aren't transient.
+TRANSIENT_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    socket.gaierror,
+    BadStatusLine,
+    IncompleteRead,
+    asyncio.IncompleteReadError,
+    asyncio.TimeoutError,
+)
+# Errors raised before the request was sent, so the server never received it
+UNSENT_ERRORS = (ConnectionRefusedError, socket.gaierror)
+
+
+def http_status(error: BaseException) -> int | None:
+    """
+    The HTTP status of a failed request, or None when the error isn't about an HTTP response.
+
+    The raw engine raises a TransportError with the status, suds raises a plain Exception with a tuple of the status
+    and the reason.
+    """
+    if isinstance(error, TransportError):
+        return error.httpcode
+    if type(error) is Exception and error.args and isinstance(error.args[0], tuple):  # pylint: disable=C0123
+        status = error.args[0][0] if error.args[0] else None
+        return status if isinstance(status, int) else None
+    return None
+
+
+def is_transient(error: BaseException, statuses: frozenset[int] = TRANSIENT_STATUSES) -> bool:
+    """Whether the error may be gone when the request is sent again: a connection error or one of the statuses"""
+    status = http_status(error)
+    if status is not None:
+        return status in statuses
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+def is_unprocessed(error: BaseException) -> bool:
+    """Whether the error means for sure that the server didn't process the request"""
+    return isinstance(error, UNSENT_ERRORS) or http_status(error) in UNPROCESSED_STATUSES
+
+
+@dataclass(slots=True)
+class RetryStatistics:
+    """
+    Data class with the statistics of a RetryPolicy
+    """
+
+    retries: int = 0
+    """Number of requests that were sent again after a transient failure"""
+    exhausted: int = 0
+    """Number of requests that still failed after the maximum number of attempts"""
+
+
+@dataclass(slots=True)
+class CircuitStatistics:
+    """
+    Data class with the statistics of a CircuitBreaker
+    """
+
+    opened: int = 0
+    """Number of times a circuit was opened, because of consecutive failures"""
+    half_opened: int = 0
+    """Number of times a trial request was let through an open circuit"""
+    closed: int = 0
+    """Number of times a circuit was closed again, after a successful trial request"""
+    rejected: int = 0
+    """Number of requests that failed fast, because the circuit was open"""
+
+
+class RetryPolicy:
+    """
+    Thread-safe policy for sending a request again after a transient failure, with exponential backoff and jitter.
+
+    Transient failures are connection errors (like resets and timeouts) and the HTTP statuses in `retry_statuses`. A
+    SOAP fault is never retried, since the server processed the request. Imports aren't idempotent, so by default they
+    are only retried when the server didn't process the request: the connection was refused, or the status was 429 or
+    503.
+
+    Args:
+        max_attempts : Maximum number of times a request is sent, including the first time. Defaults to 3.
+        backoff_base : Seconds of the backoff after the first failure, doubled after every next failure. Defaults to
+            0.5.
+        backoff_max : Maximum seconds of the backoff. Defaults to 30.
+        retry_imports : Retry imports after any transient failure, for imports that can be sent twice without harm.
+            Doesn't apply to imports with callbacks, which could fire twice. Defaults to False.
+        retry_statuses : HTTP statuses of a transient failure. Defaults to TRANSIENT_STATUSES.
+    """
+
+    max_attempts: int
+    """Maximum number of times a request is sent, including the first time"""
+    backoff_base: float
+    """Seconds of the backoff after the first failure, doubled after every next failure"""
+    backoff_max: float
+    """Maximum seconds of the backoff"""
+    retry_imports: bool
+    """Retry imports after any transient failure, instead of only when they weren't processed"""
+    retry_statuses: frozenset[int]
+    """HTTP statuses of a transient failure"""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        retry_imports: bool = False,
+        retry_statuses: frozenset[int] = TRANSIENT_STATUSES,
+    ):
+        if max_attempts < 1:
+            raise ValueError("The 'max_attempts' must be at least 1.")
+
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_imports = retry_imports
+        self.retry_statuses = retry_statuses
+        self._lock = Lock()
+        self._statistics = RetryStatistics()
+
+    @property
+    def statistics(self) -> RetryStatistics:
+        """A snapshot of the statistics of the policy"""
+        with self._lock:
+            return replace(self._statistics)
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after the given failed attempt: a random part of the exponential backoff ("full jitter")"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def is_retryable(self, error: BaseException, idempotent: bool, retry_imports: bool = True) -> bool:
+        """
+        Whether a request that failed with the error can be sent again.
+
+        Args:
+            error : The error of the failed request
+            idempotent : Whether the request can be sent twice without harm
+            retry_imports : Whether `retry_imports` applies to the request. False for an import whose response is
+                delivered while it is received, which can't be taken back when it fails partway.
+        """
+        if not is_transient(error, self.retry_statuses):
+            return False
+        return idempotent or (self.retry_imports and retry_imports) or is_unprocessed(error)
+
+    def _should_retry(
+        self, hostname: str, error: Exception, attempt: int, idempotent: bool, retry_imports: bool
+    ) -> bool:
+        if not self.is_retryable(error, idempotent, retry_imports):
+            return False
+
+        with self._lock:
+            if attempt >= self.max_attempts:
+                self._statistics.exhausted += 1
+                return False
+            self._statistics.retries += 1
+
+        log.info("Request to %s failed (attempt %d of %d): %r", hostname, attempt, self.max_attempts, error)
+        return True
+
+    def call(
+        self,
+        hostname: str,
+        send: Callable[[], T],
+        idempotent: bool = True,
+        circuit_breaker: "CircuitBreaker | None" = None,
+        retry_imports: bool = True,
+    ) -> T:
+        """
+        Call `send` until it succeeds, fails with an error that can't be retried, or the attempts are used up.
+
+        Args:
+            hostname : The hostname the request is sent to
+            send : Callable sending the request and returning its result
+            idempotent : Whether the request can be sent twice without harm. Defaults to True.
+            circuit_breaker : Optional circuit breaker, consulted before every attempt
+            retry_imports : Whether `retry_imports` applies to the request, see `is_retryable()`. Defaults to True.
+
+        Returns:
+            T : The result of `send`
+        """
+        attempt = 1
+        while True:
+            if circuit_breaker is not None:
+                circuit_breaker.before_call(hostname)
+
+            try:
+                result = send()
+            except Exception as error:
+                # Suds raises a plain Exception with the HTTP status, so any error is checked and raised again
+                if circuit_breaker is not None:
+                    circuit_breaker.record(hostname, succeeded=not is_transient(error, self.retry_statuses))
+                if self._should_retry(hostname, error, attempt, idempotent, retry_imports):
+                    time.sleep(self.delay(attempt))
+                    attempt += 1
+                    continue
+                raise
+
+            if circuit_breaker is not None:
+                circuit_breaker.record(hostname, succeeded=True)
+            return result
+
+    async def call_async(
+        self,
+        hostname: str,
+        send: Callable[[], Awaitable[T]],
+        idempotent: bool = True,
+        circuit_breaker: "CircuitBreaker | None" = None,
+        retry_imports: bool = True,
+    ) -> T:
+        """Await `send` until it succeeds, without blocking the event loop while waiting. See `call()`."""
+        attempt = 1
+        while True:
+            if circuit_breaker is not None:
+                circuit_breaker.before_call(hostname)
+
+            try:
+                result = await send()
+            except Exception as error:
+                # Suds raises a plain Exception with the HTTP status, so any error is checked and raised again
+                if circuit_breaker is not None:
+                    circuit_breaker.record(hostname, succeeded=not is_transient(error, self.retry_statuses))
+                if self._should_retry(hostname, error, attempt, idempotent, retry_imports):
+                    await asyncio.sleep(self.delay(attempt))
+                    attempt += 1
+                    continue
+                raise
+
+            if circuit_breaker is not None:
+                circuit_breaker.record(hostname, succeeded=True)
+            return result
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker per hostname, failing fast while the server is degraded.
+
+    After `failure_threshold` consecutive transient failures the circuit for the hostname opens, and requests raise a
+    CircuitOpenError without being sent. After `reset_timeout` seconds a single trial request is let through
+    ("half open"): when it succeeds the circuit closes again, otherwise it stays open for another `reset_timeout`.
+
+    Args:
+        failure_threshold : Number of consecutive transient failures that open the circuit. Defaults to 5.
+        reset_timeout : Seconds the circuit stays open, before a trial request is let through. Defaults to 30.
+    """
+
+    failure_threshold: int
+    """Number of consecutive transient failures that open the circuit"""
+    reset_timeout: float
+    """Seconds the circuit stays open, before a trial request is let through"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        if failure_threshold < 1:
+            raise ValueError("The 'failure_threshold' must be at least 1.")
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = Lock()
+        self._failures: dict[str, int] = {}
+        # Moment the circuit of a hostname was opened, or its trial request was let through
+        self._opened_at: dict[str, float] = {}
+        self._trials: set[str] = set()
+        self._statistics = CircuitStatistics()
+
+    @property
+    def statistics(self) -> CircuitStatistics:
+        """A snapshot of the statistics of the circuit breaker"""
+        with self._lock:
+            return replace(self._statistics)
+
+    def state(self, hostname: str) -> CircuitState:
+        """The state of the circuit for the hostname: 'closed', 'open' or 'half_open'"""
+        with self._lock:
+            if hostname in self._trials:
+                return "half_open"
+            return "open" if hostname in self._opened_at else "closed"
+
+    def before_call(self, hostname: str) -> None:
+        """Raise a CircuitOpenError when no request to the hostname is allowed right now"""
+        with self._lock:
+            opened_at = self._opened_at.get(hostname)
+            if opened_at is None:
+                return
+
+            retry_after = opened_at + self.reset_timeout - time.monotonic()
+            if retry_after > 0:
+                self._statistics.rejected += 1
+                raise CircuitOpenError(hostname, retry_after)
+
+            # Let a single trial request through, the others fail fast until it is done (or timed out as well)
+            self._opened_at[hostname] = time.monotonic()
+            self._trials.add(hostname)
+            self._statistics.half_opened += 1
+
+        log.info("Circuit for %s is half open, sending a trial request", hostname)
+
+    def record(self, hostname: str, succeeded: bool) -> None:
+        """Record the outcome of a request to the hostname"""
+        with self._lock:
+            if succeeded:
+                self._failures.pop(hostname, None)
+                self._trials.discard(hostname)
+                if self._opened_at.pop(hostname, None) is None:
+                    return
+                self._statistics.closed += 1
+            else:
+                failures = self._failures[hostname] = self._failures.get(hostname, 0) + 1
+                was_trial = hostname in self._trials
+                self._trials.discard(hostname)
+                if not was_trial and (failures < self.failure_threshold or hostname in self._opened_at):
+                    return
+                self._opened_at[hostname] = time.monotonic()
+                self._statistics.opened += 1
+
+        if succeeded:
+            log.info("Circuit for %s is closed again", hostname)
+        else:
+            log.warning(
+                "Circuit for %s is open for %s seconds, after %d failures", hostname, self.reset_timeout, failures
+            )
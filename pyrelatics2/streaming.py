@@ -0,0 +1,150 @@
+from logging import getLogger
+from typing import Any
+from typing import Callable
+from typing import Generator
+from typing import Iterable
+from typing import Iterator
+
+from .documents import Documents
+from .raw_soap import iter_result_events
+from .raw_soap import local_name
+from .result_classes import BaseResult
+
+log = getLogger(__name__)
+
+
+class ExportRows(BaseResult):
+    """
+    The rows of an export, parsed incrementally while the response is received.
+
+    Every row is a plain dict with the attributes of its element, and its child elements as lists of such dicts under
+    their name. Parsed elements are released as soon as their row is yielded, so memory use doesn't depend on the
+    number of rows. The documents of the report are decoded separately, and available once all rows are read.
+
+    The rows can only be iterated once. Will evaluate as Falsy when an error response was received, after the rows
+    were read.
+
+    Args:
+        chunks : Callable sending the request, and returning the blocks of the SOAP response
+        row_depth : The depth of the row elements below the report. Defaults to 1, the direct children of the report.
+        row_name : Only yield the rows with this element name. Defaults to all elements at the `row_depth`.
+    """
+
+    report: dict[str, str]
+    """The attributes of the report element, like its ReportName"""
+    documents: Documents
+    """The documents that are part of the response, available once all rows are read"""
+    row_count: int
+    """Number of rows that were yielded so far"""
+
+    def __init__(
+        self,
+        chunks: Callable[[], Generator[bytes, None, None]],
+        row_depth: int = 1,
+        row_name: str | None = None,
+    ):
+        if row_depth < 1:
+            raise ValueError("The 'row_depth' must be at least 1.")
+
+        self.has_error = False
+        self.error_msg = None
+        self.report = {}
+        self.documents = Documents()
+        self.row_count = 0
+        self._chunks = chunks
+        self._row_depth = row_depth
+        self._row_name = row_name
+        self._iterated = False
+
+    def __bool__(self) -> bool:
+        return not self.has_error
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        if self._iterated:
+            raise RuntimeError("The rows of an export can only be iterated once.")
+        self._iterated = True
+
+        return self._iter_rows()
+
+    def _iter_rows(self) -> Iterator[dict[str, Any]]:
+        chunks = self._chunks()
+        try:
+            yield from self.parse(chunks)
+        finally:
+            # Closes the response as well, when the iteration is stopped early
+            chunks.close()
+
+    def parse(self, body: bytes | Iterable[bytes]) -> Iterator[dict[str, Any]]:
+        """
+        Parse the rows from a SOAP response of an export.
+
+        Args:
+            body : The response, as bytes or an iterable of blocks of bytes
+
+        Returns:
+            Iterator[dict[str, Any]] : The rows
+        """
+        # Depth of the rows below the result element, the report is at depth 1
+        row_depth = self._row_depth + 1
+        root = None
+        in_row = False
+        stack: list[dict[str, Any]] = []
+
+        for event, element, depth in iter_result_events(body):
+            if depth == 1:
+                if event == "start":
+                    root = self._handle_root(element.tag, element.attrib)
+                continue
+
+            if root != "Report":
+                continue
+
+            # The documents are a single base64 encoded zip file, after the rows
+            if depth == 2 and local_name(element.tag) == "Documents":
+                if event == "end":
+                    self.documents = Documents.from_b64(element.text or "")
+                continue
+
+            if depth < row_depth:
+                continue
+
+            if event == "start":
+                if depth == row_depth:
+                    in_row = self._row_name is None or local_name(element.tag) == self._row_name
+                if in_row:
+                    stack.append(dict(element.attrib))
+                continue
+
+            if not in_row:
+                continue
+
+            row = stack.pop()
+            if depth > row_depth:
+                stack[-1].setdefault(local_name(element.tag), []).append(row)
+                continue
+
+            in_row = False
+            self.row_count += 1
+            yield row
+
+        if root is None:
+            self.has_error = True
+            self.error_msg = ""
+            log.warning("Empty response received from the export request. This indicates an undefined error.")
+
+    def _handle_root(self, tag: str, attributes: dict[str, str]) -> str:
+        """Handle the element at the root of the response: a report or an error"""
+        root = local_name(tag)
+
+        if root == "Report":
+            self.report = dict(attributes)
+        elif root == "Export":
+            self.has_error = True
+            self.error_msg = attributes.get("Error", "")
+            log.info("Received an error response from the export request: %s", self.error_msg)
+        else:
+            self.has_error = True
+            self.error_msg = root
+            log.warning("Unrecognized response received from the export request.")
+
+        return root
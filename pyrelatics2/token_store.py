@@ -0,0 +1,175 @@
+import errno
+import json
+import os
+import sys
+from abc import ABC
+from abc import abstractmethod
+from contextlib import contextmanager
+from contextlib import nullcontext
+from datetime import datetime
+from hashlib import sha256
+from logging import getLogger
+from typing import TYPE_CHECKING
+from typing import ContextManager
+from typing import Iterator
+
+from .utils import write_file_atomic
+
+if TYPE_CHECKING:
+    from .credentials import TokenData
+
+log = getLogger(__name__)
+
+
+class TokenStore(ABC):
+    """
+    Base class of a store for OAuth2 tokens, shared by multiple ClientCredential instances or processes.
+
+    Tokens are stored per client_id and hostname. Subclasses implement `load()` and `save()`, and can implement
+    `lock()` to make sure only a single process requests a new token at the same time.
+    """
+
+    @abstractmethod
+    def load(self, client_id: str, hostname: str) -> "TokenData | None":
+        """
+        Load the token for the client_id and hostname.
+
+        Args:
+            client_id : The OAuth2 client_id
+            hostname : The Relatics hostname
+
+        Returns:
+            TokenData | None : The stored token, or None when there is no token that hasn't expired yet
+        """
+
+    @abstractmethod
+    def save(self, client_id: str, hostname: str, token: "TokenData") -> None:
+        """
+        Save the token for the client_id and hostname, replacing any previous token.
+
+        Args:
+            client_id : The OAuth2 client_id
+            hostname : The Relatics hostname
+            token : The token to save
+        """
+
+    def lock(self, client_id: str, hostname: str) -> ContextManager[None]:  # pylint: disable=unused-argument
+        """
+        Lock the token for the client_id and hostname, while a new token is requested. Doesn't lock by default.
+
+        Args:
+            client_id : The OAuth2 client_id
+            hostname : The Relatics hostname
+
+        Returns:
+            ContextManager[None] : Context manager holding the lock
+        """
+        return nullcontext()
+
+
+class FileTokenStore(TokenStore):
+    """
+    Token store keeping every token in a file, so short-lived processes on the same machine share their tokens.
+
+    The files are only readable by the current user, and their names are a hash of the client_id and hostname. While a
+    process requests a new token, the token is locked with a lock file, so other processes wait and then use the
+    same token.
+
+    Args:
+        location : The directory of the token files. Created when it doesn't exist.
+    """
+
+    location: str
+    """The directory of the token files"""
+
+    def __init__(self, location: str):
+        self.location = location
+
+    def _path(self, client_id: str, hostname: str, extension: str) -> str:
+        key = sha256(f"{client_id}@{hostname}".encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.location, f"token_{key}.{extension}")
+
+    def load(self, client_id: str, hostname: str) -> "TokenData | None":
+        try:
+            with open(self._path(client_id, hostname, "json"), "r", encoding="utf-8") as token_file:
+                stored = json.load(token_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            log.warning("Ignoring unreadable token file for %s", hostname, exc_info=True)
+            return None
+
+        try:
+            if stored["client_id"] != client_id or stored["hostname"] != hostname:
+                return None
+
+            token = stored["token"]
+            expires_on = datetime.fromisoformat(stored["expires_on"])
+            if not isinstance(token, str):
+                raise TypeError(f"Invalid token of type {type(token).__name__}")
+        except (KeyError, TypeError, ValueError):
+            log.warning("Ignoring corrupt token file for %s", hostname, exc_info=True)
+            return None
+
+        if expires_on <= datetime.now():
+            return None
+
+        return {"token": token, "expires_on": expires_on}
+
+    def save(self, client_id: str, hostname: str, token: "TokenData") -> None:
+        stored = {
+            "client_id": client_id,
+            "hostname": hostname,
+            "token": token["token"],
+            "expires_on": token["expires_on"].isoformat(),
+        }
+
+        write_file_atomic(self._path(client_id, hostname, "json"), [json.dumps(stored).encode("utf-8")])
+
+    @contextmanager
+    def lock(self, client_id: str, hostname: str) -> Iterator[None]:
+        os.makedirs(self.location, mode=0o700, exist_ok=True)
+        file_descriptor = os.open(self._path(client_id, hostname, "lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            _lock_file(file_descriptor)
+            try:
+                yield
+            finally:
+                _unlock_file(file_descriptor)
+        finally:
+            os.close(file_descriptor)
+
+
+if sys.platform == "win32":
+    import msvcrt  # pylint: disable=import-error
+
+    LOCK_ATTEMPTS = 30
+    """Number of times LK_LOCK is tried, each of which waits about 10 seconds for the lock"""
+
+    def _lock_file(file_descriptor: int) -> None:
+        """Take an exclusive lock on the file, waiting about 5 minutes at most until it is available"""
+        os.lseek(file_descriptor, 0, os.SEEK_SET)
+        for _ in range(LOCK_ATTEMPTS - 1):
+            try:
+                msvcrt.locking(file_descriptor, msvcrt.LK_LOCK, 1)
+                return
+            except OSError as error:
+                # LK_LOCK gives up with EDEADLOCK after about 10 seconds, any other error is raised
+                if error.errno != errno.EDEADLOCK:
+                    raise
+
+        msvcrt.locking(file_descriptor, msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(file_descriptor: int) -> None:
+        os.lseek(file_descriptor, 0, os.SEEK_SET)
+        msvcrt.locking(file_descriptor, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_file(file_descriptor: int) -> None:
+        """Take an exclusive lock on the file, waiting until it is available"""
+        fcntl.flock(file_descriptor, fcntl.LOCK_EX)
+
+    def _unlock_file(file_descriptor: int) -> None:
+        fcntl.flock(file_descriptor, fcntl.LOCK_UN)
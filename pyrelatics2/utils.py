@@ -1,3 +1,7 @@
+import os
+from contextlib import suppress
+from threading import get_ident
+from typing import Iterable
 from typing import overload
 
 from suds.sax.text import Text
@@ -98,3 +102,30 @@ def suds_get_as_str(obj: SudsObject | None, path: str | list[str]) -> str | None
         result = str(current)
 
     return result
+
+
+def write_file_atomic(path: str, contents: Iterable[bytes]) -> None:
+    """
+    Write a file only accessible by the current user, replacing any existing file at once.
+
+    The contents are written to a temporary file next to it, which is moved in place when complete. So other threads
+    and processes never read a partially written file. The directory is created when it doesn't exist.
+
+    Args:
+        path: The path of the file
+        contents: The blocks of bytes to write
+    """
+    os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+
+    # Unique per process and thread, so simultaneous writers don't share a temporary file
+    temporary_path = f"{path}.{os.getpid()}.{get_ident()}.tmp"
+    file_descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with open(file_descriptor, "wb") as target:
+            for block in contents:
+                target.write(block)
+        os.replace(temporary_path, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.remove(temporary_path)
+        raise
@@ -0,0 +1,203 @@
+from datetime import timedelta
+from logging import getLogger
+from threading import Lock
+from time import monotonic
+from typing import Any
+from typing import Callable
+
+from suds.cache import ObjectCache
+from suds.client import Client
+from suds.client import ServiceSelector
+from suds.options import Options
+from suds.properties import Unskin
+from suds.reader import Reader
+from suds.transport import Transport
+from suds.transport.https import HttpAuthenticated
+
+log = getLogger(__name__)
+
+
+def clone_client(prototype: Client, transport: Transport | None = None) -> Client:
+    """
+    Create a clone of a suds Client, sharing the parsed WSDL but with its own options.
+
+    Replaces `Client.clone()`, which fails on recent suds versions because the options can't be deep-copied. The
+    option values themselves are shared, which is fine since they are replaced (not mutated) by `set_options()`. Only
+    the transport isn't taken from the prototype, since its options are linked to the options of the client, and it
+    belongs to the instance that created the prototype.
+
+    Args:
+        prototype : The client to be cloned
+        transport : The transport for the clone. Defaults to the default transport of suds.
+
+    Returns:
+        suds.client.Client : The cloned client
+    """
+    clone = Client.__new__(Client)
+    clone.options = Options()
+    # Unskin() returns the suds Properties behind the options from its __new__, which pylint can't infer
+    defined = Unskin(prototype.options).defined  # pylint: disable=no-member
+    Unskin(clone.options).update(  # pylint: disable=no-member
+        {name: value for name, value in defined.items() if name != "transport"}
+    )
+    clone.options.transport = HttpAuthenticated() if transport is None else transport
+    clone.wsdl = prototype.wsdl
+    clone.factory = prototype.factory
+    clone.service = ServiceSelector(clone, prototype.wsdl.services)
+    clone.sd = prototype.sd
+    clone.messages = {"tx": None, "rx": None}
+
+    return clone
+
+
+class WsdlCache:
+    """
+    Process-wide cache of parsed WSDL documents, keyed by the Relatics hostname.
+
+    For every hostname a single "prototype" suds Client is created, which holds the parsed WSDL. Each request gets a
+    cheap clone of that prototype (sharing the WSDL, but with its own options), so the WSDL is downloaded and parsed
+    only once per hostname. The cache is safe to use from multiple threads.
+
+    Args:
+        location : Optional directory for an on-disk store of the parsed WSDL, which makes cold starts of new
+            processes fast. When None, suds' default document cache is used.
+        ttl : Time after which a cached WSDL is considered stale and will be retrieved again. Applies to both the
+            in-memory and on-disk store. Defaults to 1 day.
+    """
+
+    location: str | None
+    """Directory of the on-disk WSDL store, or None when not used"""
+    ttl: timedelta
+    """Time after which a cached WSDL will be retrieved again"""
+
+    def __init__(self, location: str | None = None, ttl: timedelta = timedelta(days=1)):
+        self.location = location
+        self.ttl = ttl
+        self._clients: dict[str, tuple[Client, float]] = {}
+        self._lock = Lock()
+        self._host_locks: dict[str, Lock] = {}
+
+    @staticmethod
+    def wsdl_url(hostname: str) -> str:
+        """Return the complete WSDL url for the given hostname"""
+        return f"https://{hostname}/DataExchange.asmx?wsdl"
+
+    def _client_options(self) -> dict[str, Any]:
+        """Options used when creating the prototype client"""
+        if self.location is None:
+            return {}
+
+        return {
+            "cache": ObjectCache(location=self.location, seconds=int(self.ttl.total_seconds())),
+            "cachingpolicy": 1,  # Store the fully parsed WSDL, instead of the raw XML document
+        }
+
+    def __contains__(self, hostname: str) -> bool:
+        """Whether a WSDL, which isn't stale, is cached in memory for the given hostname"""
+        return self.cached(hostname) is not None
+
+    def cached(self, hostname: str) -> Client | None:
+        """
+        Get the prototype client of the given hostname, when a WSDL which isn't stale is cached in memory.
+
+        Use the returned prototype directly instead of checking `hostname in cache` first, since the cached WSDL may
+        turn stale in between.
+
+        Args:
+            hostname : The Relatics hostname
+
+        Returns:
+            suds.client.Client | None : The prototype client, which must only be used through `clone_client()`
+        """
+        cached = self._clients.get(hostname)
+        if cached is not None and monotonic() - cached[1] < self.ttl.total_seconds():
+            return cached[0]
+        return None
+
+    def _host_lock(self, hostname: str) -> Lock:
+        with self._lock:
+            return self._host_locks.setdefault(hostname, Lock())
+
+    def _get_prototype(self, hostname: str, options: dict[str, Any]) -> Client:
+        # Fast path, without taking the per-host lock
+        if (prototype := self.cached(hostname)) is not None:
+            return prototype
+
+        # Only one thread per hostname builds the prototype, others wait for it to be ready
+        with self._host_lock(hostname):
+            if (prototype := self.cached(hostname)) is not None:
+                return prototype
+
+            log.info("Retrieving WSDL for %s", hostname)
+            prototype = Client(self.wsdl_url(hostname), **self._client_options(), **options)
+            # The transport (and its connection pool) belongs to the caller retrieving the WSDL, so it isn't kept.
+            # Every clone gets the transport of its own caller.
+            prototype.options.transport = HttpAuthenticated()
+            self._clients[hostname] = (prototype, monotonic())
+
+            return prototype
+
+    def get_client(
+        self, hostname: str, transport_factory: Callable[[], Transport] | None = None, **options: Any
+    ) -> Client:
+        """
+        Get a suds Client for the given hostname, based on the cached WSDL.
+
+        The returned client is a private clone, so options (like headers and plugins) can be set on it freely.
+
+        Args:
+            hostname : The Relatics hostname
+            transport_factory : Optional callable creating the transport for the client, which is also used to
+                retrieve the WSDL. A transport can only be used by a single client, so a new one is created for every
+                client. When None, the default transport of suds is used.
+            options : Additional suds options, used when the WSDL needs to be retrieved
+
+        Returns:
+            suds.client.Client : A client ready to use for a single request
+        """
+        prototype = self.get_prototype(hostname, transport_factory, **options)
+        return clone_client(prototype, None if transport_factory is None else transport_factory())
+
+    def get_prototype(
+        self, hostname: str, transport_factory: Callable[[], Transport] | None = None, **options: Any
+    ) -> Client:
+        """
+        Get the prototype client of the given hostname, retrieving and parsing the WSDL when it isn't cached yet.
+
+        Args:
+            hostname : The Relatics hostname
+            transport_factory : Optional callable creating the transport used to retrieve the WSDL. The prototype
+                doesn't keep this transport.
+            options : Additional suds options, used when the WSDL needs to be retrieved
+
+        Returns:
+            suds.client.Client : The prototype client, which must only be used through `clone_client()`
+        """
+        if transport_factory is not None:
+            options = {"transport": transport_factory(), **options}
+        return self._get_prototype(hostname, options)
+
+    def invalidate(self, hostname: str | None = None) -> None:
+        """
+        Remove cached WSDL documents, forcing them to be retrieved again on the next request.
+
+        Args:
+            hostname : The hostname to invalidate. When None, the whole cache is invalidated.
+        """
+        with self._lock:
+            hostnames = list(self._clients) if hostname is None else [hostname]
+            for name in hostnames:
+                self._clients.pop(name, None)
+
+        if self.location is not None:
+            disk_cache = ObjectCache(location=self.location)
+            if hostname is None:
+                disk_cache.clear()
+            else:
+                disk_cache.purge(Reader(Options()).mangle(self.wsdl_url(hostname), "wsdl"))
+
+        log.info("Invalidated cached WSDL for %s", "all hosts" if hostname is None else hostname)
+
+
+WSDL_CACHE = WsdlCache()
+"""Default WSDL cache, shared by all RelaticsWebservices instances"""
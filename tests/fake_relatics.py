@@ -0,0 +1,191 @@
+"""
+Local stand-in for a Relatics host, to test requests end-to-end without network access
+"""
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+from contextlib import ExitStack
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from threading import Lock
+from threading import Thread
+from typing import Callable
+
+from pyrelatics2.async_client import AsyncRelaticsWebservices
+from pyrelatics2.client import RelaticsWebservices
+from pyrelatics2.transport import AsyncConnectionPool
+from pyrelatics2.transport import ConnectionPool
+from pyrelatics2.wsdl_cache import WsdlCache
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,invalid-name
+
+if sys.version_info < (3, 11):
+    # Backport of the TestCase.enterContext() and enterClassContext() of Python 3.11, used to run a FakeRelatics
+
+    def _enter_context(test_case: unittest.TestCase, context_manager):
+        stack = ExitStack()
+        result = stack.enter_context(context_manager)
+        test_case.addCleanup(stack.close)
+        return result
+
+    def _enter_class_context(cls: type[unittest.TestCase], context_manager):
+        stack = ExitStack()
+        result = stack.enter_context(context_manager)
+        cls.addClassCleanup(stack.close)
+        return result
+
+    unittest.TestCase.enterContext = _enter_context
+    unittest.TestCase.enterClassContext = classmethod(_enter_class_context)
+
+WSDL_PATH = os.path.join(os.path.dirname(__file__), "data", "DataExchange.wsdl")
+WORKSPACE_ID = "9b167eea-d546-49c3-8cd0-1da09e7e9177"
+
+SOAP_RESPONSE_TEMPLATE = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+    '<{action}Response xmlns="http://www.relatics.com/"><{action}Result>{content}</{action}Result></{action}Response>'
+    "</soap:Body></soap:Envelope>"
+)
+
+
+def soap_response(action: str, content: str) -> bytes:
+    """Wrap the content of a GetResult or Import result into a full SOAP response"""
+    return SOAP_RESPONSE_TEMPLATE.format(action=action, content=content).encode("utf-8")
+
+
+def sample_handler(action: str, body: bytes) -> bytes:  # pylint: disable=unused-argument
+    """SOAP handler replying a report with two rows to a GetResult, and a successful import to an Import"""
+    if action == "GetResult":
+        return soap_response(action, '<Report ReportName="sample"><Row Name="a"/><Row Name="b"/></Report>')
+    return soap_response(
+        action,
+        '<Import><Message Time="13:17:54" Result="Progress">Processing row : 1</Message>'
+        '<Message Time="13:17:55" Result="Progress">Total rows imported: 1</Message></Import>',
+    )
+
+
+class FakeRelatics:
+    """
+    HTTP server acting like a Relatics host. Serves the WSDL, OAuth2 tokens and canned SOAP responses.
+
+    The responses for the webservice are made by `soap_handler`, which receives the SOAP action and request body.
+    Requests with one of the `rejected_tokens` get a 401 response, like a request with an expired token. The statuses
+    in `failures` are replied to the next requests, one status per request, like a degraded server.
+
+    Use it as context manager, in a test with `self.enterContext(FakeRelatics(...))`.
+    """
+
+    def __init__(self, soap_handler: Callable[[str, bytes], bytes] | None = None):
+        self.soap_handler = soap_handler or (lambda action, body: soap_response(action, "<Report/>"))
+        self.requests: list[tuple[str, str, dict[str, str], bytes]] = []
+        self.token_count = 0
+        self.rejected_tokens: set[str] = set()
+        self.failures: list[int] = []
+        self.connections = 0
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def __enter__(self) -> "FakeRelatics":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def pool(self, **kwargs) -> ConnectionPool:
+        """Connection pool that redirects all requests to this server"""
+        port = self.port
+
+        class RedirectingConnectionPool(ConnectionPool):
+            def _connect(self, scheme: str, netloc: str) -> HTTPConnection:
+                return HTTPConnection("127.0.0.1", port, timeout=self.timeout)
+
+        return RedirectingConnectionPool(**{"proxies": {}, **kwargs})
+
+    def async_pool(self, **kwargs) -> AsyncConnectionPool:
+        """Asyncio connection pool that redirects all requests to this server"""
+        port = self.port
+
+        class RedirectingAsyncConnectionPool(AsyncConnectionPool):
+            async def _connect(self, scheme: str, netloc: str):
+                return await asyncio.open_connection("127.0.0.1", port)
+
+        return RedirectingAsyncConnectionPool(**{"proxies": {}, **kwargs})
+
+    def client(self, **options) -> RelaticsWebservices:
+        """Client for the "Python" host that sends its requests to this server, with a WSDL cache of its own"""
+        return RelaticsWebservices(
+            "Python", WORKSPACE_ID, wsdl_cache=WsdlCache(), connection_pool=self.pool(), **options
+        )
+
+    def async_client(self, **options) -> AsyncRelaticsWebservices:
+        """Asyncio client for the "Python" host that sends its requests to this server, see `client()`"""
+        return AsyncRelaticsWebservices(
+            "Python", WORKSPACE_ID, wsdl_cache=WsdlCache(), connection_pool=self.async_pool(), **options
+        )
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with fake._lock:  # pylint: disable=protected-access
+                    fake.connections += 1
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+            def _reply(self, status: int, content_type: str, body: bytes):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                fake.requests.append(("GET", self.path, dict(self.headers), b""))
+                with open(WSDL_PATH, "rb") as wsdl_file:
+                    self._reply(200, "text/xml; charset=utf-8", wsdl_file.read())
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                fake.requests.append(("POST", self.path, dict(self.headers), body))
+
+                if self.path == "/oauth2/token":
+                    with fake._lock:  # pylint: disable=protected-access
+                        fake.token_count += 1
+                        token = f"token-{fake.token_count}"
+                    response = {"access_token": token, "token_type": "bearer", "expires_in": 3600}
+                    self._reply(200, "application/json", json.dumps(response).encode("utf-8"))
+                    return
+
+                if self.headers.get("Authorization", "").removeprefix("Bearer ") in fake.rejected_tokens:
+                    self._reply(401, "text/html; charset=utf-8", b"<html>Unauthorized</html>")
+                    return
+
+                with fake._lock:  # pylint: disable=protected-access
+                    failure = fake.failures.pop(0) if fake.failures else None
+                if failure is not None:
+                    self._reply(failure, "text/html; charset=utf-8", b"<html>Service Unavailable</html>")
+                    return
+
+                action = self.headers.get("SOAPAction", "").strip('"').rsplit("/", 1)[-1]
+                if not action:
+                    # SOAP 1.2 passes the action in the content type
+                    action = self.headers.get("Content-Type", "").rsplit("/", 1)[-1].strip('"')
+                self._reply(200, "text/xml; charset=utf-8", fake.soap_handler(action, body))
+
+        return Handler
@@ -0,0 +1,125 @@
+"""
+Testing the "async_client.py" module
+"""
+
+import asyncio
+import unittest
+from datetime import datetime
+from datetime import timedelta
+
+from fake_relatics import FakeRelatics
+from fake_relatics import sample_handler
+from fake_relatics import soap_response
+
+from pyrelatics2.async_client import AsyncRelaticsWebservices
+from pyrelatics2.client import ClientCredential
+from pyrelatics2.client import TokenData
+from pyrelatics2.imports import ResubmitOptions
+from pyrelatics2.result_classes import ExportResult
+from pyrelatics2.result_classes import ImportResult
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods
+
+
+class TestAsyncRelaticsWebservices(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.fake = self.enterContext(FakeRelatics(sample_handler))
+
+    def _client(self) -> AsyncRelaticsWebservices:
+        return self.fake.async_client()
+
+    async def test_get_result_exception_operation_empty(self):
+        async with self._client() as client:
+            with self.assertRaises(ValueError):
+                await client.get_result("")
+
+    async def test_get_result(self):
+        async with self._client() as client:
+            result = await client.get_result("sample_operation", parameters={"param1": "value1"})
+
+        self.assertIsInstance(result, ExportResult)
+        self.assertTrue(result)
+        self.assertEqual(len(result.data.Report.Row), 2)
+        self.assertIn(b'Parameter Name="param1" Value="value1"/>', self.fake.requests[-1][3])
+
+    async def test_run_import(self):
+        async with self._client() as client:
+            result = await client.run_import("sample_operation", [{"name": "a"}], authentication="entry_code")
+
+        self.assertIsInstance(result, ImportResult)
+        self.assertEqual(result.total_rows, 1)
+        self.assertIn(b"Entrycode>entry_code</", self.fake.requests[-1][3])
+
+    async def test_concurrent_requests_single_token(self):
+        credential = ClientCredential("client_id", "client_secret")
+
+        async with self._client() as client:
+            results = await asyncio.gather(
+                *(client.get_result("sample_operation", authentication=credential) for _ in range(20))
+            )
+
+        self.assertTrue(all(results))
+        self.assertEqual(self.fake.token_count, 1)
+        self.assertEqual(self.fake.requests[-1][2]["Authorization"], "Bearer token-1")
+        self.assertLessEqual(client.connection_pool.statistics.new_connections, 10)
+
+    async def test_token_background_refresh(self):
+        credential = ClientCredential("client_id", "client_secret")
+        credential.tokens["python.relaticsonline.com"] = TokenData(
+            token="old", expires_on=datetime.now() + timedelta(seconds=400)
+        )
+
+        async with self._client() as client:
+            await client.get_result("sample_operation", authentication=credential)
+
+            # Give the background task the chance to finish
+            for _ in range(100):
+                if credential.tokens["python.relaticsonline.com"]["token"] != "old":
+                    break
+                await asyncio.sleep(0.01)
+
+            await client.get_result("sample_operation", authentication=credential)
+
+        authorizations = [
+            request[2]["Authorization"] for request in self.fake.requests if request[1] == "/DataExchange.asmx"
+        ]
+        self.assertEqual(authorizations, ["Bearer old", "Bearer token-1"])
+        self.assertEqual(self.fake.token_count, 1)
+
+    async def test_token_rejected(self):
+        credential = ClientCredential("client_id", "client_secret")
+        self.fake.rejected_tokens.add("token-1")
+
+        async with self._client() as client:
+            export_result = await client.get_result("sample_operation", authentication=credential)
+            import_result = await client.run_import("sample_operation", [{"name": "a"}], authentication=credential)
+
+        authorizations = [
+            request[2]["Authorization"] for request in self.fake.requests if request[1] == "/DataExchange.asmx"
+        ]
+        self.assertTrue(export_result)
+        self.assertEqual(import_result.total_rows, 1)
+        self.assertEqual(authorizations, ["Bearer token-1", "Bearer token-2", "Bearer token-2"])
+
+    async def test_run_import_resubmit_failed(self):
+        responses = [
+            '<Message Time="10:00:00" Result="Progress">Processing row : 1</Message>'
+            '<Message Time="10:00:00" Result="Progress">Processing row : 2</Message>'
+            '<Message Time="10:00:00" Result="Error">Element is locked</Message>',
+            '<Message Time="10:00:01" Result="Progress">Processing row : 1</Message>',
+        ]
+        self.fake.soap_handler = lambda action, body: soap_response(action, f"<Import>{responses.pop(0)}</Import>")
+
+        async with self._client() as client:
+            result = await client.run_import(
+                "sample_operation", [{"name": "a"}, {"name": "b"}], resubmit=ResubmitOptions(max_resubmits=2)
+            )
+
+        self.assertEqual(result.failed_rows(), [])
+        self.assertEqual(sorted(msg.row for msg in result.messages), [1, 2])
+        self.assertEqual(responses, [])
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)
@@ -0,0 +1,92 @@
+"""
+Testing the "chunking.py" module
+"""
+
+import unittest
+from base64 import b64encode
+from io import BytesIO
+
+from pyrelatics2.chunking import CHUNK_ENVELOPE_SIZE
+from pyrelatics2.chunking import row_size
+from pyrelatics2.chunking import split_rows
+from pyrelatics2.payload import generate_data_b64
+from pyrelatics2.payload import write_data_xml
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods
+
+
+def data_xml(rows: list[dict[str, str]]) -> bytes:
+    out = BytesIO()
+    write_data_xml(rows, out)
+    return out.getvalue()
+
+
+class TestSplitRows(unittest.TestCase):
+    def test_max_rows(self):
+        rows = [{"name": str(index)} for index in range(7)]
+
+        chunks = list(split_rows(rows, max_rows=3))
+
+        self.assertEqual([start for start, _ in chunks], [0, 3, 6])
+        self.assertEqual([len(chunk) for _, chunk in chunks], [3, 3, 1])
+        self.assertEqual([row for _, chunk in chunks for row in chunk], rows)
+
+    def test_max_bytes(self):
+        rows = [{"name": "x" * 50} for _ in range(10)]
+        max_bytes = CHUNK_ENVELOPE_SIZE + 3 * row_size(rows[0])
+
+        chunks = list(split_rows(rows, max_bytes=max_bytes))
+
+        self.assertEqual([len(chunk) for _, chunk in chunks], [3, 3, 3, 1])
+
+    def test_max_bytes_encoded_size(self):
+        rows = [
+            {
+                "name": f"Object {index}",
+                "description": "x" * (index % 13) + " & <y>" * (index % 3),
+                "code": "é" * (index % 11),
+            }
+            for index in range(40)
+        ]
+
+        for max_bytes in (250, 333, 1000, 4096):
+            with self.subTest(max_bytes=max_bytes):
+                # No row is larger than a chunk, so every chunk fits
+                with self.assertNoLogs("pyrelatics2.chunking", level="WARNING"):
+                    chunks = [chunk for _, chunk in split_rows(rows, max_bytes=max_bytes)]
+
+                self.assertGreater(len(chunks), 1)
+                self.assertEqual([row for chunk in chunks for row in chunk], rows)
+                for chunk in chunks:
+                    self.assertLessEqual(len(generate_data_b64(chunk)), max_bytes)
+
+    def test_max_bytes_oversized_row(self):
+        rows = [{"name": "a"}, {"name": "x" * 500}, {"name": "b"}]
+
+        with self.assertLogs("pyrelatics2.chunking", level="WARNING"):
+            chunks = list(split_rows(rows, max_bytes=100))
+
+        self.assertEqual([start for start, _ in chunks], [0, 1, 2])
+
+    def test_no_limits(self):
+        rows = [{"name": str(index)} for index in range(5)]
+
+        self.assertEqual(list(split_rows(rows)), [(0, rows)])
+
+    def test_exception_invalid_limit(self):
+        with self.assertRaises(ValueError):
+            list(split_rows([{"name": "a"}], max_rows=0))
+        with self.assertRaises(ValueError):
+            list(split_rows([{"name": "a"}], max_bytes=CHUNK_ENVELOPE_SIZE))
+
+    def test_row_size_matches_data_xml(self):
+        rows = [{"name": 'Object "1" & <2>', "description": "Ünïcode"}, {"name": "Object 2"}]
+        empty_size = len(b64encode(data_xml([])))
+        full_size = len(b64encode(data_xml(rows)))
+
+        self.assertAlmostEqual(sum(row_size(row) for row in rows), full_size - empty_size, delta=16)
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)
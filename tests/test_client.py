@@ -1,15 +1,35 @@
 """
 Testing the "client.py" module
 """
+
+import asyncio
 import os
+import re
+import time
 import unittest
+from base64 import b64decode
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from datetime import timedelta
+from threading import Barrier
+from threading import Lock
 from uuid import UUID
 
+from fake_relatics import FakeRelatics
+from fake_relatics import soap_response
+from parameterized import parameterized
+from suds import WebFault
+from suds.transport import TransportError
+
 from pyrelatics2.client import USER_AGENT
+from pyrelatics2.client import ClientCredential
 from pyrelatics2.client import RelaticsWebservices
-
-# from parameterized import parameterized
-
+from pyrelatics2.client import TokenData
+from pyrelatics2.client import is_token_rejected
+from pyrelatics2.concurrency import HostLimiter
+from pyrelatics2.concurrency import ResilienceOptions
+from pyrelatics2.imports import ResubmitOptions
+from pyrelatics2.result_classes import ImportCallbacks
 
 # pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods
 
@@ -113,6 +133,409 @@ class TestRelaticsWebservices(unittest.TestCase):
         self.assertEqual(str(context.exception), "Duplicate filenames in document list.")
 
 
+class TestClientCredential(unittest.TestCase):
+    hostname = "python.relaticsonline.com"
+
+    def setUp(self):
+        self.fake = self.enterContext(FakeRelatics())
+
+    def _wait_for_token(self, credential: ClientCredential, token: str) -> None:
+        deadline = time.monotonic() + 5
+        while credential.tokens[self.hostname]["token"] != token and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_get_token_single_flight(self):
+        credential = ClientCredential("client_id", "client_secret", connection_pool=self.fake.pool())
+        barrier = Barrier(32)
+
+        def get_token(_):
+            barrier.wait()
+            return credential.get_token(self.hostname)
+
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            tokens = list(executor.map(get_token, range(32)))
+
+        self.assertEqual(tokens, ["token-1"] * 32)
+        self.assertEqual(self.fake.token_count, 1)
+
+    def test_get_token_force_refresh(self):
+        credential = ClientCredential("client_id", "client_secret", connection_pool=self.fake.pool())
+
+        self.assertEqual(credential.get_token(self.hostname), "token-1")
+        self.assertEqual(credential.get_token(self.hostname, force_refresh=True), "token-2")
+
+    def test_get_token_background_refresh(self):
+        credential = ClientCredential("client_id", "client_secret", connection_pool=self.fake.pool())
+        credential.tokens[self.hostname] = TokenData(token="old", expires_on=datetime.now() + timedelta(seconds=400))
+
+        # The token is still valid, so it is used while a new token is requested in the background
+        self.assertEqual(credential.get_token(self.hostname), "old")
+        self._wait_for_token(credential, "token-1")
+
+        self.assertEqual(credential.get_token(self.hostname), "token-1")
+        self.assertEqual(self.fake.token_count, 1)
+
+    def test_get_token_background_refresh_disabled(self):
+        credential = ClientCredential(
+            "client_id", "client_secret", connection_pool=self.fake.pool(), background_refresh=False
+        )
+        credential.tokens[self.hostname] = TokenData(token="old", expires_on=datetime.now() + timedelta(seconds=400))
+
+        self.assertEqual(credential.get_token(self.hostname), "old")
+        time.sleep(0.05)
+        self.assertEqual(self.fake.token_count, 0)
+
+    @parameterized.expand([(timedelta(seconds=-400),), (timedelta(days=-3),), (timedelta(seconds=200),)])
+    def test_get_token_expired(self, expires_in: timedelta):
+        credential = ClientCredential("client_id", "client_secret", connection_pool=self.fake.pool())
+        credential.tokens[self.hostname] = TokenData(token="old", expires_on=datetime.now() + expires_in)
+
+        self.assertEqual(credential.get_token(self.hostname), "token-1")
+
+    def test_get_token_expiry_skew(self):
+        credential = ClientCredential(
+            "client_id", "client_secret", connection_pool=self.fake.pool(), expiry_skew=timedelta(hours=1)
+        )
+
+        # The tokens of 3600 seconds are never used again with this skew
+        self.assertEqual(credential.get_token(self.hostname), "token-1")
+        self.assertEqual(credential.get_token(self.hostname), "token-2")
+
+    def test_get_token_wall_clock_change(self):
+        credential = ClientCredential("client_id", "client_secret", connection_pool=self.fake.pool())
+        token = credential.get_token(self.hostname)
+
+        # The expiry of a retrieved token is measured with the monotonic clock, so a change of the wall clock (here
+        # simulated by changing expires_on) doesn't make it expire
+        credential.tokens[self.hostname]["expires_on"] = datetime.now() - timedelta(hours=2)
+
+        self.assertEqual(credential.get_token(self.hostname), token)
+        self.assertEqual(self.fake.token_count, 1)
+
+    def test_get_token_async_multiple_event_loops(self):
+        credential = ClientCredential("client_id", "client_secret")
+
+        async def get_tokens():
+            pool = self.fake.async_pool()
+            try:
+                # Concurrent calls wait for each other, which binds the lock to the event loop
+                return await asyncio.gather(
+                    *(credential.get_token_async(self.hostname, connection_pool=pool) for _ in range(2))
+                )
+            finally:
+                await pool.close()
+
+        self.assertEqual(asyncio.run(get_tokens()), ["token-1"] * 2)
+        credential.tokens.clear()
+        self.assertEqual(asyncio.run(get_tokens()), ["token-2"] * 2)
+
+    def test_get_token_sync_and_async_single_flight(self):
+        credential = ClientCredential("client_id", "client_secret", connection_pool=self.fake.pool())
+        barrier = Barrier(2)
+
+        def get_token():
+            barrier.wait()
+            return credential.get_token(self.hostname)
+
+        async def get_token_async():
+            pool = self.fake.async_pool()
+            barrier.wait()
+            try:
+                return await credential.get_token_async(self.hostname, connection_pool=pool)
+            finally:
+                await pool.close()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(get_token)
+            token_async = asyncio.run(get_token_async())
+
+        self.assertEqual([future.result(), token_async], ["token-1"] * 2)
+        self.assertEqual(self.fake.token_count, 1)
+
+
+class TestTokenRetry(unittest.TestCase):
+    def setUp(self):
+        self.fake = self.enterContext(
+            FakeRelatics(
+                lambda action, body: soap_response(
+                    action,
+                    (
+                        '<Report><Row Name="a"/></Report>'
+                        if action == "GetResult"
+                        else '<Import><Message Time="13:17:54" Result="Progress">Total rows imported: 1</Message></Import>'
+                    ),
+                )
+            )
+        )
+        self.credential = ClientCredential("client_id", "client_secret", connection_pool=self.fake.pool())
+
+    def _client(self, engine: str) -> RelaticsWebservices:
+        return self.fake.client(engine=engine)
+
+    def _authorizations(self) -> list[str]:
+        return [
+            request[2].get("Authorization") for request in self.fake.requests if request[1] == "/DataExchange.asmx"
+        ]
+
+    @parameterized.expand([("suds",), ("raw",)])
+    def test_get_result_token_rejected(self, engine: str):
+        self.fake.rejected_tokens.add("token-1")
+
+        result = self._client(engine).get_result("sample_operation", authentication=self.credential)
+
+        self.assertTrue(result)
+        self.assertEqual(self._authorizations(), ["Bearer token-1", "Bearer token-2"])
+
+    @parameterized.expand([("suds",), ("raw",)])
+    def test_run_import_token_rejected(self, engine: str):
+        self.fake.rejected_tokens.add("token-1")
+
+        result = self._client(engine).run_import("sample_operation", [{"name": "a"}], authentication=self.credential)
+
+        self.assertEqual(result.total_rows, 1)
+        self.assertEqual(self._authorizations(), ["Bearer token-1", "Bearer token-2"])
+
+    def test_iter_result_token_rejected(self):
+        self.fake.rejected_tokens.add("token-1")
+
+        rows = list(self._client("raw").iter_result("sample_operation", authentication=self.credential))
+
+        self.assertEqual(rows, [{"Name": "a"}])
+        self.assertEqual(self._authorizations(), ["Bearer token-1", "Bearer token-2"])
+
+    def test_token_rejected_twice(self):
+        self.fake.rejected_tokens.update({"token-1", "token-2"})
+
+        with self.assertRaises(TransportError):
+            self._client("raw").get_result("sample_operation", authentication=self.credential)
+
+        # Only retried once
+        self.assertEqual(self.fake.token_count, 2)
+
+    def test_not_retried_without_client_credential(self):
+        client = self._client("raw")
+        # Requests with an entry code don't have an Authorization header
+        self.fake.rejected_tokens.add("")
+
+        with self.assertRaises(TransportError):
+            client.get_result("sample_operation", authentication="entrycode")
+
+        self.assertEqual(len(self._authorizations()), 1)
+
+    @parameterized.expand(
+        [
+            (TransportError("Unauthorized", 401), True),
+            (TransportError("Internal Server Error", 500), False),
+            (Exception((401, "Unauthorized")), True),
+            (Exception((403, "Forbidden")), False),
+            (Exception("Something else"), False),
+            (WebFault(type("Fault", (), {"faultstring": "The access token has expired."})(), None), True),
+            (WebFault(type("Fault", (), {"faultstring": "Invalid token"})(), None), True),
+            (WebFault(type("Fault", (), {"faultstring": "Server was unable to process request."})(), None), False),
+        ]
+    )
+    def test_is_token_rejected(self, error: Exception, expected: bool):
+        self.assertEqual(is_token_rejected(error), expected)
+
+
+class TestRelaticsWebservicesBatch(unittest.TestCase):
+    def setUp(self):
+        self.active = 0
+        self.max_active = 0
+        self.lock = Lock()
+        self.fake = self.enterContext(FakeRelatics(self.handler))
+
+    def handler(self, action: str, body: bytes) -> bytes:
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+
+        operation = re.search(rb"Operation>([^<]*)<", body).group(1).decode("utf-8")
+        if action == "GetResult":
+            return soap_response(action, f'<Report ReportName="{operation}"/>')
+        return soap_response(
+            action,
+            '<Import><Message Time="13:17:54" Result="Progress">Processing row : 1</Message>'
+            '<Message Time="13:17:55" Result="Progress">Total rows imported: 1</Message></Import>',
+        )
+
+    def _client(self, max_concurrent_per_host: int = 4) -> RelaticsWebservices:
+        return self.fake.client(resilience=ResilienceOptions(host_limiter=HostLimiter(max_concurrent_per_host)))
+
+    def test_get_results_many(self):
+        jobs = [(f"operation_{index}", {"index": str(index)}) for index in range(12)]
+
+        results = list(self._client().get_results_many(jobs, max_workers=6))
+
+        self.assertEqual(sorted(result.index for result in results), list(range(12)))
+        for result in results:
+            self.assertTrue(result)
+            self.assertIs(result.job, jobs[result.index])
+            self.assertEqual(result.result.data.Report._ReportName, result.job[0])  # pylint: disable=protected-access
+
+    def test_get_results_many_per_host_limit(self):
+        list(self._client(max_concurrent_per_host=2).get_results_many([("operation", None)] * 10, max_workers=8))
+
+        self.assertLessEqual(self.max_active, 2)
+
+    def test_get_results_many_exception(self):
+        results = sorted(self._client().get_results_many([("operation", None), ("", None)]), key=lambda r: r.index)
+
+        self.assertTrue(results[0])
+        self.assertFalse(results[1])
+        self.assertIsInstance(results[1].exception, ValueError)
+
+    def test_run_imports_many(self):
+        jobs = [("import_operation", [{"name": f"row {index}"}]) for index in range(5)]
+
+        results = list(self._client().run_imports_many(jobs))
+
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result.result.total_rows == 1 for result in results))
+
+
+class TestRelaticsWebservicesChunkedImport(unittest.TestCase):
+    def setUp(self):
+        self.fail_row = None
+        self.fake = self.enterContext(FakeRelatics(self.handler))
+        self.client = self.fake.client()
+
+    def handler(self, action: str, body: bytes) -> bytes:
+        data = b64decode(re.search(rb"Data>([^<]*)<", body).group(1)).decode("utf-8")
+        names = re.findall(r'name="([^"]*)"', data)
+        if self.fail_row in names:
+            return soap_response(action, '<Export Error="Import failed"/>')
+
+        messages = [
+            f'<Message Time="10:00:00" Result="Progress">Processing row : {row}</Message>'
+            for row in range(1, len(names) + 1)
+        ]
+        messages.append(f'<Message Time="10:00:01" Result="Progress">Total rows imported: {len(names)}</Message>')
+        messages.append('<Message Time="10:00:01" Result="Progress">Total time (ms): 10</Message>')
+        elements = "".join(f'<Element Action="Add" ID="id-{name}" ForeignKey="{name}"/>' for name in names)
+        return soap_response(action, f"<Import>{''.join(messages)}<Elements>{elements}</Elements></Import>")
+
+    def test_run_import_chunked(self):
+        rows = [{"name": f"row{index}"} for index in range(10)]
+
+        result = self.client.run_import_chunked("import_operation", rows, max_rows=4)
+
+        self.assertTrue(result)
+        self.assertEqual(result.total_rows, 10)
+        self.assertEqual(result.elapsed_time, timedelta(milliseconds=30))
+        self.assertEqual(
+            [msg.row for msg in result.messages if msg.message.startswith("Processing")], list(range(1, 11))
+        )
+        self.assertEqual([elem.foreign_key for elem in result.elements], [row["name"] for row in rows])
+        self.assertEqual(len([request for request in self.fake.requests if request[1] == "/DataExchange.asmx"]), 3)
+
+    def test_run_import_chunked_parallel(self):
+        rows = [{"name": f"row{index}"} for index in range(25)]
+
+        result = self.client.run_import_chunked("import_operation", rows, max_rows=None, max_bytes=200, max_workers=4)
+
+        self.assertEqual(result.total_rows, 25)
+        self.assertEqual([elem.foreign_key for elem in result.elements], [row["name"] for row in rows])
+
+    def test_run_import_chunked_failed_chunk(self):
+        self.fail_row = "row5"
+        rows = [{"name": f"row{index}"} for index in range(10)]
+
+        result = self.client.run_import_chunked("import_operation", rows, max_rows=4)
+
+        self.assertFalse(result)
+        self.assertEqual(result.error_msg, "Import failed")
+        self.assertEqual(result.total_rows, 6)
+
+    def test_run_import_chunked_exception_data_empty(self):
+        with self.assertRaises(ValueError):
+            self.client.run_import_chunked("import_operation", [])
+
+
+class TestRelaticsWebservicesResubmitFailed(unittest.TestCase):
+    def setUp(self):
+        # Number of times a row fails, before it is imported
+        self.failures: dict[str, int] = {}
+        self.sent: list[list[str]] = []
+        self.fake = self.enterContext(FakeRelatics(self.handler))
+        self.client = self.fake.client()
+
+    def handler(self, action: str, body: bytes) -> bytes:
+        data = b64decode(re.search(rb"Data>([^<]*)<", body).group(1)).decode("utf-8")
+        names = re.findall(r'name="([^"]*)"', data)
+        self.sent.append(names)
+
+        messages = []
+        elements = []
+        for row, name in enumerate(names, start=1):
+            messages.append(f'<Message Time="10:00:00" Result="Progress">Processing row : {row}</Message>')
+            if self.failures.get(name, 0) > 0:
+                self.failures[name] -= 1
+                messages.append(f'<Message Time="10:00:00" Result="Error">Element {name} is locked</Message>')
+            else:
+                elements.append(f'<Element Action="Add" ID="id-{name}" ForeignKey="{name}"/>')
+        messages.append(f'<Message Time="10:00:01" Result="Progress">Total rows imported: {len(names)}</Message>')
+        return soap_response(action, f"<Import>{''.join(messages)}<Elements>{''.join(elements)}</Elements></Import>")
+
+    def test_resubmit_failed_rows(self):
+        self.failures = {"row2": 1, "row4": 2}
+        rows = ({"name": f"row{index}"} for index in range(6))
+
+        result = self.client.run_import("import_operation", rows, resubmit=ResubmitOptions(max_resubmits=3))
+
+        self.assertTrue(result)
+        self.assertEqual(self.sent, [[f"row{index}" for index in range(6)], ["row2", "row4"], ["row4"]])
+        self.assertEqual(result.failed_rows(), [])
+        self.assertEqual(sorted(elem.foreign_key for elem in result.elements), [f"row{index}" for index in range(6)])
+        self.assertEqual(
+            [msg.row for msg in result.messages if msg.message.startswith("Processing")], [1, 2, 4, 6, 3, 5]
+        )
+
+    def test_resubmit_bounded(self):
+        self.failures = {"row1": 10}
+
+        result = self.client.run_import(
+            "import_operation", [{"name": "row0"}, {"name": "row1"}], resubmit=ResubmitOptions(max_resubmits=2)
+        )
+
+        self.assertEqual(len(self.sent), 3)
+        self.assertEqual(result.failed_rows(), [1])
+        self.assertFalse(result.row_results([{"name": "row0"}, {"name": "row1"}])[1])
+
+    def test_no_resubmit_by_default(self):
+        self.failures = {"row0": 1}
+
+        result = self.client.run_import("import_operation", [{"name": "row0"}])
+
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(result.failed_rows(), [0])
+
+    @parameterized.expand(
+        [
+            ("data.csv", None, 1, True),
+            ([{"name": "row0"}], ImportCallbacks(keep_messages=False), 1, True),
+            ([{"name": "row0"}], None, -1, True),
+            ([{"name": "row0"}], None, 1, False),
+        ]
+    )
+    def test_resubmit_exception(
+        self, data, callbacks: ImportCallbacks | None, max_resubmits: int, auto_parse_response: bool
+    ):
+        with self.assertRaises(ValueError):
+            self.client.run_import(
+                "import_operation",
+                data,
+                auto_parse_response=auto_parse_response,
+                callbacks=callbacks,
+                resubmit=ResubmitOptions(max_resubmits=max_resubmits),
+            )
+
+        self.assertEqual(self.sent, [])
+
+
 if __name__ == "__main__":
     # unittest.main()
     unittest.main(argv=["first-arg-is-ignored"], exit=False)
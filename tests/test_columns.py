@@ -0,0 +1,120 @@
+"""
+Testing the "columns.py" module
+"""
+
+import unittest
+from dataclasses import replace
+
+from pyrelatics2.columns import ImportElement
+from pyrelatics2.columns import ImportElements
+from pyrelatics2.columns import ImportMessage
+from pyrelatics2.columns import ImportMessages
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long
+
+
+class TestImportMessages(unittest.TestCase):
+    def _messages(self, count: int) -> list[ImportMessage]:
+        return [
+            ImportMessage(
+                time=f"10:00:{second:02}",
+                status="Error" if second % 2 else "Progress",
+                message=f"Message {second}",
+                row=second,
+            )
+            for second in range(count)
+        ]
+
+    def test_sequence(self):
+        # Arrange
+        expected = self._messages(5)
+
+        # Act
+        instance = ImportMessages(expected)
+
+        # Assert
+        self.assertEqual(len(instance), 5)
+        self.assertEqual(instance, expected)
+        self.assertEqual(instance[-1], expected[-1])
+        self.assertEqual(instance[1:4:2], expected[1:4:2])
+        self.assertEqual(repr(instance), repr(expected))
+        with self.assertRaises(IndexError):
+            instance[5]  # pylint: disable=pointless-statement
+
+    def test_changes(self):
+        expected = self._messages(6)
+        instance = ImportMessages(expected)
+        extra = ImportMessage(time="11:00:00", status="Warning", message="Extra", row=9)
+
+        for messages in (expected, instance):
+            messages[0] = extra
+            messages.insert(2, extra)
+            del messages[3]
+            messages[4:6] = [extra]
+            del messages[::3]
+
+        self.assertEqual(instance, expected)
+
+    def test_time_parsed_when_read(self):
+        instance = ImportMessages()
+        instance.add(time="not a time", status="Progress", message="Started", row=0)
+
+        self.assertEqual((len(instance), instance.status(0), instance.row(0)), (1, "Progress", 0))
+        with self.assertRaises(ValueError):
+            instance[0]  # pylint: disable=pointless-statement
+
+    def test_views(self):
+        instance = ImportMessages(self._messages(1))
+
+        # A view is a copy, which is stored by assigning it back
+        message = instance[0]
+        message.row = 5
+        self.assertEqual(instance[0].row, 0)
+        instance[0] = message
+        self.assertEqual(instance[0].row, 5)
+
+        self.assertIsNot(instance[0], instance[0])
+        self.assertEqual(instance[0], replace(instance[0], row=5))
+
+    def test_list_behaviour(self):
+        expected = self._messages(4)
+        instance = ImportMessages(expected)
+        extra = ImportMessage(time="11:00:00", status="Warning", message="Extra", row=9)
+
+        self.assertEqual(instance + [extra], expected + [extra])
+        self.assertIsInstance(instance + [extra], ImportMessages)
+        self.assertEqual([extra] + instance, [extra] + expected)
+        self.assertEqual(instance + instance, expected + expected)
+        with self.assertRaises(TypeError):
+            instance + (extra,)  # pylint: disable=pointless-statement
+
+        copy = instance.copy()
+        copy.sort(key=lambda msg: msg.message, reverse=True)
+        expected.sort(key=lambda msg: msg.message, reverse=True)
+        self.assertEqual(copy, expected)
+        self.assertNotEqual(instance, expected)
+
+        copy.clear()
+        self.assertEqual((len(copy), copy), (0, []))
+
+
+class TestImportElements(unittest.TestCase):
+    def test_sequence(self):
+        expected = [
+            ImportElement(action="Add" if index % 2 else "Update", id=f"id-{index}", foreign_key=f"fk-{index}")
+            for index in range(4)
+        ]
+
+        instance = ImportElements(expected)
+        instance.append(ImportElement(action="Add", id="id-4", foreign_key=""))
+        expected.append(ImportElement(action="Add", id="id-4", foreign_key=""))
+
+        self.assertEqual(instance, expected)
+        self.assertEqual(list(reversed(instance)), list(reversed(expected)))
+        self.assertIn(expected[2], instance)
+        self.assertEqual(instance.index(expected[3]), 3)
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)
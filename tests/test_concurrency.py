@@ -0,0 +1,207 @@
+"""
+Testing the "concurrency.py" module
+"""
+
+import asyncio
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from fake_relatics import FakeRelatics
+from fake_relatics import soap_response
+from suds.transport import TransportError
+
+from pyrelatics2.concurrency import AdaptiveLimiter
+from pyrelatics2.concurrency import RateLimiter
+from pyrelatics2.concurrency import ResilienceOptions
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods
+
+KEY = ("python.relaticsonline.com", "9b167eea-d546-49c3-8cd0-1da09e7e9177")
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_then_rate(self):
+        limiter = RateLimiter(rate=50, burst=5)
+
+        started = time.monotonic()
+        for _ in range(5):
+            limiter.acquire(KEY)
+        self.assertLess(time.monotonic() - started, 0.05)
+
+        # The next 10 requests wait for the bucket to refill, at 50 per second
+        for _ in range(10):
+            limiter.acquire(KEY)
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+    def test_keys_independent(self):
+        limiter = RateLimiter(rate=1, burst=1)
+
+        started = time.monotonic()
+        limiter.acquire(KEY)
+        limiter.acquire(("python.relaticsonline.com", "other"))
+
+        self.assertLess(time.monotonic() - started, 0.05)
+
+    def test_threads(self):
+        limiter = RateLimiter(rate=100, burst=1)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: limiter.acquire(KEY), range(21)))
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+    def test_init_exception_rate(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(rate=0)
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=4)
+
+        for _ in range(20):
+            with limiter.limit(KEY):
+                pass
+
+        self.assertEqual(limiter.current_limit(KEY), 4)
+        self.assertGreaterEqual(limiter.statistics.increases, 2)
+
+    def test_multiplicative_decrease_on_failure(self):
+        limiter = AdaptiveLimiter(initial_limit=8)
+
+        with self.assertRaises(TransportError):
+            with limiter.limit(KEY):
+                raise TransportError("Service Unavailable", 503)
+
+        self.assertEqual(limiter.current_limit(KEY), 4)
+        self.assertEqual(limiter.statistics.decreases, 1)
+
+    def test_permanent_error_no_change(self):
+        limiter = AdaptiveLimiter(initial_limit=8)
+
+        with self.assertRaises(ValueError):
+            with limiter.limit(KEY):
+                raise ValueError("Not a server problem")
+
+        self.assertEqual(limiter.current_limit(KEY), 8)
+
+    def test_decrease_on_latency_spike(self):
+        limiter = AdaptiveLimiter(initial_limit=8, latency_tolerance=2)
+        for _ in range(3):
+            with limiter.limit(KEY):
+                time.sleep(0.01)
+
+        with limiter.limit(KEY):
+            time.sleep(0.1)
+
+        self.assertEqual(limiter.current_limit(KEY), 4)
+
+    def test_min_limit(self):
+        limiter = AdaptiveLimiter(initial_limit=2, min_limit=2)
+
+        for _ in range(3):
+            with self.assertRaises(ConnectionResetError):
+                with limiter.limit(KEY):
+                    raise ConnectionResetError()
+
+        self.assertEqual(limiter.current_limit(KEY), 2)
+
+    def test_limits_threads(self):
+        limiter = AdaptiveLimiter(initial_limit=3, max_limit=3)
+        lock = Lock()
+        active = []
+        peak = []
+
+        def work(_):
+            with limiter.limit(KEY):
+                with lock:
+                    active.append(1)
+                    peak.append(len(active))
+                time.sleep(0.01)
+                with lock:
+                    active.pop()
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            list(executor.map(work, range(30)))
+
+        self.assertEqual(max(peak), 3)
+
+    def test_limits_tasks(self):
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+        active = []
+        peak = []
+
+        async def work():
+            async with limiter.limit_async(KEY):
+                active.append(1)
+                peak.append(len(active))
+                await asyncio.sleep(0.01)
+                active.pop()
+
+        async def main():
+            await asyncio.gather(*(work() for _ in range(10)))
+
+        asyncio.run(main())
+
+        self.assertEqual(max(peak), 2)
+
+    def test_init_exception_limits(self):
+        with self.assertRaises(ValueError):
+            AdaptiveLimiter(initial_limit=10, max_limit=5)
+        with self.assertRaises(ValueError):
+            AdaptiveLimiter(backoff_ratio=1)
+
+
+class TestLimitedWebservices(unittest.TestCase):
+    def setUp(self):
+        self.fake = self.enterContext(
+            FakeRelatics(lambda action, body: soap_response(action, '<Report><Row Name="a"/></Report>'))
+        )
+
+    def test_get_result(self):
+        concurrency_limiter = AdaptiveLimiter(initial_limit=1)
+        client = self.fake.client(
+            engine="raw",
+            resilience=ResilienceOptions(rate_limiter=RateLimiter(rate=1000), concurrency_limiter=concurrency_limiter),
+        )
+
+        results = list(client.get_results_many([("sample_operation", None)] * 10))
+
+        self.assertTrue(all(results))
+        self.assertEqual(client.limiter_key, KEY)
+        self.assertGreaterEqual(concurrency_limiter.statistics.increases, 1)
+
+    def test_failure_shrinks_limit(self):
+        concurrency_limiter = AdaptiveLimiter(initial_limit=4)
+        client = self.fake.client(engine="raw", resilience=ResilienceOptions(concurrency_limiter=concurrency_limiter))
+        self.fake.failures.append(503)
+
+        with self.assertRaises(TransportError):
+            client.get_result("sample_operation")
+
+        self.assertEqual(concurrency_limiter.current_limit(KEY), 2)
+
+    def test_async(self):
+        concurrency_limiter = AdaptiveLimiter(initial_limit=1)
+
+        async def main():
+            async with self.fake.async_client(
+                engine="raw",
+                resilience=ResilienceOptions(
+                    rate_limiter=RateLimiter(rate=1000), concurrency_limiter=concurrency_limiter
+                ),
+            ) as client:
+                return await asyncio.gather(*(client.get_result("sample_operation") for _ in range(10)))
+
+        results = asyncio.run(main())
+
+        self.assertTrue(all(results))
+        self.assertGreaterEqual(concurrency_limiter.statistics.increases, 1)
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)
@@ -0,0 +1,162 @@
+"""
+Testing the "delta.py" module
+"""
+
+import os
+import re
+import tempfile
+import unittest
+from base64 import b64decode
+
+from fake_relatics import FakeRelatics
+from fake_relatics import soap_response
+
+from pyrelatics2.delta import DeltaState
+from pyrelatics2.delta import row_hash
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods
+
+SCOPE = "python.relaticsonline.com/9b167eea-d546-49c3-8cd0-1da09e7e9177/import_operation"
+
+
+class TestRowHash(unittest.TestCase):
+    def test_column_order(self):
+        self.assertEqual(row_hash({"a": "1", "b": "2"}), row_hash({"b": "2", "a": "1"}))
+
+    def test_differs(self):
+        self.assertNotEqual(row_hash({"a": "1", "b": "2"}), row_hash({"a": "1", "b": "3"}))
+        self.assertNotEqual(row_hash({"a": "1"}), row_hash({"a": "1", "b": ""}))
+
+
+class TestDeltaState(unittest.TestCase):
+    def setUp(self):
+        self.state = DeltaState(":memory:")
+        self.addCleanup(self.state.close)
+
+    def test_changed_rows(self):
+        rows = [{"key": "1", "name": "a"}, {"key": "2", "name": "b"}]
+        _, pending = self.state.changed_rows(SCOPE, rows, "key")
+        self.state.commit(SCOPE, pending)
+
+        changed, pending = self.state.changed_rows(
+            SCOPE, [{"key": "1", "name": "a"}, {"key": "2", "name": "changed"}, {"key": "3", "name": "c"}], "key"
+        )
+
+        self.assertEqual(changed, [{"key": "2", "name": "changed"}, {"key": "3", "name": "c"}])
+        self.assertEqual(set(pending), {"2", "3"})
+
+    def test_not_committed(self):
+        self.state.changed_rows(SCOPE, [{"key": "1"}], "key")
+
+        changed, _ = self.state.changed_rows(SCOPE, [{"key": "1"}], "key")
+
+        self.assertEqual(changed, [{"key": "1"}])
+
+    def test_scopes_independent(self):
+        _, pending = self.state.changed_rows(SCOPE, [{"key": "1"}], "key")
+        self.state.commit(SCOPE, pending)
+
+        changed, _ = self.state.changed_rows("other", [{"key": "1"}], "key")
+
+        self.assertEqual(changed, [{"key": "1"}])
+        self.assertEqual(self.state.hashes(SCOPE), {"1": row_hash({"key": "1"})})
+
+    def test_clear(self):
+        _, pending = self.state.changed_rows(SCOPE, [{"key": "1"}], "key")
+        self.state.commit(SCOPE, pending)
+
+        self.state.clear(SCOPE)
+
+        self.assertEqual(self.state.hashes(SCOPE), {})
+
+    def test_missing_key_column(self):
+        with self.assertRaises(ValueError):
+            self.state.changed_rows(SCOPE, [{"key": "1"}, {"name": "a"}], "key")
+
+    def test_duplicate_key(self):
+        with self.assertRaises(ValueError):
+            self.state.changed_rows(SCOPE, [{"key": "1"}, {"key": "1"}], "key")
+
+    def test_stored(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "delta.sqlite")
+            with DeltaState(path) as state:
+                _, pending = state.changed_rows(SCOPE, [{"key": "1"}], "key")
+                state.commit(SCOPE, pending)
+
+            with DeltaState(path) as state:
+                changed, _ = state.changed_rows(SCOPE, [{"key": "1"}], "key")
+
+        self.assertEqual(changed, [])
+
+
+class TestRelaticsWebservicesDeltaImport(unittest.TestCase):
+    def setUp(self):
+        self.fail = False
+        self.error_rows: set[int] = set()
+        self.sent: list[list[str]] = []
+        self.fake = self.enterContext(FakeRelatics(self.handler))
+        self.client = self.fake.client()
+        self.state = DeltaState(":memory:")
+        self.addCleanup(self.state.close)
+
+    def handler(self, action: str, body: bytes) -> bytes:
+        data = b64decode(re.search(rb"Data>([^<]*)<", body).group(1)).decode("utf-8")
+        keys = re.findall(r'key="([^"]*)"', data)
+        self.sent.append(keys)
+        if self.fail:
+            return soap_response(action, '<Export Error="Import failed"/>')
+
+        messages = "".join(
+            f'<Message Time="10:00:01" Result="Progress">Processing row : {row}</Message>'
+            + (
+                f'<Message Time="10:00:01" Result="Error">Invalid value in row {row}</Message>'
+                if row in self.error_rows
+                else ""
+            )
+            for row in range(1, len(keys) + 1)
+        )
+        return soap_response(
+            action,
+            f'<Import>{messages}<Message Time="10:00:01" Result="Progress">Total rows imported: {len(keys)}</Message>'
+            "</Import>",
+        )
+
+    def test_run_import_delta(self):
+        rows = [{"key": str(index), "name": f"row{index}"} for index in range(5)]
+
+        first = self.client.run_import_delta("import_operation", rows, "key", self.state)
+        rows[3] = {"key": "3", "name": "changed"}
+        second = self.client.run_import_delta("import_operation", rows, "key", self.state)
+        third = self.client.run_import_delta("import_operation", rows, "key", self.state)
+
+        self.assertEqual((first.total_rows, second.total_rows, third.total_rows), (5, 1, 0))
+        self.assertTrue(third)
+        self.assertEqual(self.sent, [["0", "1", "2", "3", "4"], ["3"]])
+
+    def test_failed_not_committed(self):
+        rows = [{"key": "1", "name": "a"}]
+        self.fail = True
+
+        self.assertFalse(self.client.run_import_delta("import_operation", rows, "key", self.state))
+        self.fail = False
+        self.assertTrue(self.client.run_import_delta("import_operation", rows, "key", self.state))
+
+        self.assertEqual(self.sent, [["1"], ["1"]])
+
+    def test_failed_rows_sent_again(self):
+        rows = [{"key": str(index), "name": f"row{index}"} for index in range(4)]
+        self.error_rows = {2}
+
+        self.assertTrue(self.client.run_import_delta("import_operation", rows, "key", self.state))
+        self.error_rows = set()
+        self.client.run_import_delta("import_operation", rows, "key", self.state)
+        self.client.run_import_delta("import_operation", rows, "key", self.state)
+
+        # The second row had an error, so only that row is sent again
+        self.assertEqual(self.sent, [["0", "1", "2", "3"], ["1"]])
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)
@@ -0,0 +1,154 @@
+"""
+Testing the "documents.py" module
+"""
+
+import os
+import pickle
+import unittest
+from base64 import b64decode
+from base64 import b64encode
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from zipfile import ZIP_DEFLATED
+from zipfile import ZIP_STORED
+from zipfile import ZipFile
+
+from parameterized import parameterized
+
+from pyrelatics2.client import BaseRelaticsWebservices
+from pyrelatics2.documents import CompressionPolicy
+from pyrelatics2.documents import Documents
+from pyrelatics2.documents import write_document
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods,protected-access
+
+SAMPLE_DATA = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sample-data")
+
+
+class TestCompressionPolicy(unittest.TestCase):
+    @parameterized.expand(
+        [
+            ("photo.jpg", ZIP_STORED),
+            ("PHOTO.JPEG", ZIP_STORED),
+            ("sheet.xlsx", ZIP_STORED),
+            ("data.xml", ZIP_DEFLATED),
+            ("notes.txt", ZIP_DEFLATED),
+            ("no_extension", ZIP_DEFLATED),
+        ]
+    )
+    def test_compress_type(self, filename: str, expected: int):
+        self.assertEqual(CompressionPolicy().compress_type(filename), expected)
+
+    def test_custom_stored_extensions(self):
+        policy = CompressionPolicy(stored_extensions=frozenset({"txt"}))
+
+        self.assertEqual(policy.compress_type("notes.txt"), ZIP_STORED)
+        self.assertEqual(policy.compress_type("photo.jpg"), ZIP_DEFLATED)
+
+
+class TestWriteDocument(unittest.TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.text_path = os.path.join(directory.name, "notes.txt")
+        with open(self.text_path, "wb") as text_file:
+            text_file.write(b"Lorem ipsum dolor sit amet. " * 1000)
+        self.image_path = os.path.join(SAMPLE_DATA, "global-warming.jpg")
+
+    def test_compression_per_extension(self):
+        buffer = BytesIO()
+        with ZipFile(buffer, "w") as import_zip:
+            write_document(import_zip, self.image_path, "Documents/global-warming.jpg")
+            write_document(import_zip, self.text_path, "Documents/notes.txt")
+
+        with ZipFile(buffer) as import_zip, open(self.text_path, "rb") as text_file:
+            self.assertIsNone(import_zip.testzip())
+            self.assertEqual(import_zip.getinfo("Documents/global-warming.jpg").compress_type, ZIP_STORED)
+            self.assertEqual(import_zip.getinfo("Documents/notes.txt").compress_type, ZIP_DEFLATED)
+            self.assertEqual(import_zip.read("Documents/notes.txt"), text_file.read())
+
+    def test_compresslevel(self):
+        sizes = []
+        for compresslevel in (1, 9):
+            buffer = BytesIO()
+            with ZipFile(buffer, "w") as import_zip:
+                write_document(
+                    import_zip, self.text_path, "Documents/notes.txt", CompressionPolicy(compresslevel=compresslevel)
+                )
+            with ZipFile(buffer) as import_zip:
+                sizes.append(import_zip.getinfo("Documents/notes.txt").compress_size)
+
+        self.assertGreaterEqual(sizes[0], sizes[1])
+
+    def test_prepare_import(self):
+        instance = BaseRelaticsWebservices("Python", "9b167eea-d546-49c3-8cd0-1da09e7e9177")
+
+        _, data_str = instance._prepare_import(
+            [{"name": "Object 1", "file": "notes.txt"}], documents=[self.text_path, self.image_path]
+        )
+
+        with ZipFile(BytesIO(b64decode(data_str))) as import_zip:
+            self.assertIsNone(import_zip.testzip())
+            self.assertEqual(
+                {info.filename: info.compress_type for info in import_zip.infolist()},
+                {
+                    os.path.join("Documents", "notes.txt"): ZIP_DEFLATED,
+                    os.path.join("Documents", "global-warming.jpg"): ZIP_STORED,
+                    "pyrelatics_webservice.xml": ZIP_DEFLATED,
+                },
+            )
+
+
+class TestDocuments(unittest.TestCase):
+    def setUp(self):
+        self.contents = {"Documents/notes.txt": b"Lorem ipsum dolor sit amet. " * 1000, "image.jpg": os.urandom(2048)}
+        buffer = BytesIO()
+        with ZipFile(buffer, "w", compression=ZIP_DEFLATED) as docs_zip:
+            for name, content in self.contents.items():
+                docs_zip.writestr(name, content)
+        self.documents = Documents.from_b64(b64encode(buffer.getvalue()).decode("ascii"))
+
+    def test_mapping(self):
+        self.assertEqual(len(self.documents), 2)
+        self.assertEqual(list(self.documents), list(self.contents))
+        self.assertIn("image.jpg", self.documents)
+        self.assertEqual(self.documents["image.jpg"], self.contents["image.jpg"])
+        self.assertEqual(self.documents, self.contents)
+        self.assertEqual(self.documents.size("Documents/notes.txt"), 28000)
+        with self.assertRaises(KeyError):
+            self.documents["missing.txt"]  # pylint: disable=pointless-statement
+
+    def test_repr(self):
+        self.assertEqual(repr(Documents()), "{}")
+        self.assertEqual(repr(self.documents), "{'Documents/notes.txt': <28000 bytes>, 'image.jpg': <2048 bytes>}")
+
+    def test_open(self):
+        with self.documents.open("Documents/notes.txt") as document_file:
+            self.assertEqual(document_file.read(28), b"Lorem ipsum dolor sit amet. ")
+
+    def test_extract_to(self):
+        with TemporaryDirectory() as directory:
+            paths = self.documents.extract_to(directory)
+
+            self.assertEqual(len(paths), 2)
+            for path, content in zip(paths, self.contents.values()):
+                with open(path, "rb") as document_file:
+                    self.assertEqual(document_file.read(), content)
+
+    def test_extract_to_unsafe_name(self):
+        buffer = BytesIO()
+        with ZipFile(buffer, "w") as docs_zip:
+            docs_zip.writestr("../../outside.txt", b"contents")
+
+        with TemporaryDirectory() as directory:
+            (path,) = Documents(buffer.getvalue()).extract_to(os.path.join(directory, "target"))
+
+            self.assertTrue(path.startswith(os.path.join(directory, "target")))
+
+    def test_pickle(self):
+        self.assertEqual(pickle.loads(pickle.dumps(self.documents)), self.contents)
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)
@@ -0,0 +1,210 @@
+"""
+Testing the "payload.py" module
+"""
+
+import os
+import random
+import unittest
+from base64 import b64decode
+from base64 import b64encode
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from zipfile import ZipFile
+
+from parameterized import parameterized
+from suds.sax.document import Document
+from suds.sax.element import Element
+
+from pyrelatics2.client import BaseRelaticsWebservices
+from pyrelatics2.imports import IMPORT_BASENAME
+from pyrelatics2.payload import ENCODE_CHUNK_SIZE
+from pyrelatics2.payload import Base64Writer
+from pyrelatics2.payload import encode_b64
+from pyrelatics2.payload import escape_attribute
+from pyrelatics2.payload import generate_data_b64
+from pyrelatics2.payload import write_data_xml
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods,protected-access
+
+
+def suds_data_xml(rows: list[dict[str, str]]) -> bytes:
+    """The data xml built as a suds document, the way the imports were built before the row serializer"""
+    root = Element("Import")
+    root.append([Element("Row") for _ in rows])
+    for row, data_row in zip(root.getChildren(), rows):
+        for name, value in data_row.items():
+            row.set(name, value)
+
+    return Document(root).str().encode("utf-8")
+
+
+ROWS = [
+    {"name": "Object 1", "description": "Lorem ipsum dolor sit amet."},
+    {"name": "Quotes \" and ' and <tags> & entities &amp;", "description": "Ünïcödé ✓"},
+    {},
+    {"name": "Object 4"},
+]
+
+
+class TestBase64Writer(unittest.TestCase):
+    def test_incremental_writes(self):
+        data = bytes(range(256)) * 7
+
+        for step in (1, 2, 3, 5, 64, 1000):
+            with self.subTest(step=step):
+                out = BytesIO()
+                with Base64Writer(out) as writer:
+                    for start in range(0, len(data), step):
+                        writer.write(data[start : start + step])
+
+                self.assertEqual(out.getvalue(), b64encode(data))
+
+
+class TestEncodeB64(unittest.TestCase):
+    def test_encode(self):
+        data = os.urandom(ENCODE_CHUNK_SIZE * 2 + 5)
+
+        self.assertEqual(encode_b64(BytesIO(data)), b64encode(data).decode("ascii"))
+
+
+class TestEscapeAttribute(unittest.TestCase):
+    @parameterized.expand(
+        [
+            ("plain",),
+            ("",),
+            ("a & b",),
+            ("&amp; &lt; &gt; &quot; &apos; &nbsp; &#38;",),
+            ("<tag attr=\"value\" other='value'>",),
+            ("line 1\nline 2\ttab",),
+            (None,),
+            (42,),
+            (b"bytes",),
+        ]
+    )
+    def test_identical_to_suds(self, value: object):
+        row = Element("Row")
+        row.set(name="value", value=value)
+
+        self.assertEqual(f'   <Row value="{escape_attribute(value)}"/>', row.str(indent=1))
+
+    def test_identical_to_suds_random(self):
+        generator = random.Random(7)
+        alphabet = "ab &;<>\"'ampltgquoé✓"
+
+        for _ in range(500):
+            value = "".join(generator.choice(alphabet) for _ in range(generator.randint(0, 12)))
+            row = Element("Row")
+            row.set(name="value", value=value)
+
+            self.assertEqual(f'   <Row value="{escape_attribute(value)}"/>', row.str(indent=1), value)
+
+
+class TestWriteDataXml(unittest.TestCase):
+    def test_identical_to_suds_document(self):
+        out = BytesIO()
+
+        row_count = write_data_xml(iter(ROWS), out)
+
+        self.assertEqual(row_count, 4)
+        self.assertEqual(out.getvalue(), suds_data_xml(ROWS))
+
+    def test_empty(self):
+        out = BytesIO()
+
+        self.assertEqual(write_data_xml([], out), 0)
+        self.assertEqual(out.getvalue(), suds_data_xml([]))
+
+
+class TestGenerateDataB64(unittest.TestCase):
+    def test_generator(self):
+        rows = ({"name": f"Object {index}"} for index in range(5000))
+        expected = suds_data_xml([{"name": f"Object {index}"} for index in range(5000)])
+
+        data_str = generate_data_b64(rows)
+
+        self.assertEqual(b64decode(data_str), expected)
+
+    def test_exception_empty_generator(self):
+        with self.assertRaises(ValueError) as context:
+            generate_data_b64(row for row in [])
+        self.assertEqual(str(context.exception), "Supplied data is empty.")
+
+
+class TestPrepareImport(unittest.TestCase):
+    def setUp(self):
+        self.instance = BaseRelaticsWebservices("Python", "9b167eea-d546-49c3-8cd0-1da09e7e9177")
+
+    def test_generator(self):
+        file_name, data_str = self.instance._prepare_import(row for row in ROWS)
+
+        self.assertEqual(file_name, f"{IMPORT_BASENAME}.xml")
+        self.assertEqual(b64decode(data_str), suds_data_xml(ROWS))
+
+    def test_generator_with_documents(self):
+        with TemporaryDirectory() as directory:
+            document_path = os.path.join(directory, "document.txt")
+            with open(document_path, "wb") as document_file:
+                document_file.write(b"document contents")
+
+            file_name, data_str = self.instance._prepare_import(
+                (row for row in ROWS), file_name="streamed", documents=[document_path]
+            )
+
+        self.assertEqual(file_name, "streamed.zip")
+        with ZipFile(BytesIO(b64decode(data_str))) as import_zip:
+            self.assertEqual(import_zip.read(os.path.join("Documents", "document.txt")), b"document contents")
+            self.assertEqual(import_zip.read("streamed.xml"), suds_data_xml(ROWS))
+
+    def test_documents_in_memory(self):
+        with TemporaryDirectory() as directory, TemporaryDirectory() as temp_directory:
+            document_path = os.path.join(directory, "document.txt")
+            with open(document_path, "wb") as document_file:
+                document_file.write(b"document contents")
+
+            with patch("tempfile.tempdir", temp_directory):
+                self.instance._prepare_import(ROWS, documents=[document_path])
+
+            self.assertEqual(os.listdir(temp_directory), [])
+
+    def test_documents_spilled_to_disk(self):
+        self.instance.spool_max_size = 64
+
+        with TemporaryDirectory() as directory:
+            document_path = os.path.join(directory, "document.txt")
+            with open(document_path, "wb") as document_file:
+                document_file.write(os.urandom(4096))
+
+            _, data_str = self.instance._prepare_import(ROWS, documents=[document_path])
+
+            with ZipFile(BytesIO(b64decode(data_str))) as import_zip, open(document_path, "rb") as document_file:
+                self.assertEqual(import_zip.read(os.path.join("Documents", "document.txt")), document_file.read())
+
+    def test_keep_zip_file_unique(self):
+        self.instance.keep_zip_file = True
+
+        with TemporaryDirectory() as directory, TemporaryDirectory() as temp_directory:
+            document_path = os.path.join(directory, "document.txt")
+            with open(document_path, "wb") as document_file:
+                document_file.write(b"document contents")
+
+            with patch("tempfile.tempdir", temp_directory):
+                _, data_str_1 = self.instance._prepare_import(ROWS, documents=[document_path])
+                _, data_str_2 = self.instance._prepare_import(ROWS, documents=[document_path])
+
+            zip_files = sorted(os.listdir(temp_directory))
+            self.assertEqual(len(zip_files), 2)
+            self.assertTrue(
+                all(name.startswith(f"{IMPORT_BASENAME}_") and name.endswith(".zip") for name in zip_files)
+            )
+            with open(os.path.join(temp_directory, zip_files[0]), "rb") as zip_file:
+                self.assertIn(b64encode(zip_file.read()).decode("ascii"), (data_str_1, data_str_2))
+
+    def test_exception_type(self):
+        with self.assertRaises(TypeError):
+            self.instance._prepare_import(42)  # type: ignore
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)
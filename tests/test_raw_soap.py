@@ -0,0 +1,339 @@
+"""
+Testing the "raw_soap.py" module
+"""
+
+import unittest
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from io import BytesIO
+
+from fake_relatics import FakeRelatics
+from fake_relatics import sample_handler
+from fake_relatics import soap_response
+from parameterized import parameterized
+from suds import WebFault
+from suds.transport import TransportError
+
+from pyrelatics2.client import RelaticsWebservices
+from pyrelatics2.exceptions import ImportAbortedError
+from pyrelatics2.raw_soap import build_get_result_envelope
+from pyrelatics2.raw_soap import build_import_envelope
+from pyrelatics2.raw_soap import parse_import_response
+from pyrelatics2.raw_soap import parse_response
+from pyrelatics2.result_classes import ExportResult
+from pyrelatics2.result_classes import ImportCallbacks
+from pyrelatics2.result_classes import ImportResult
+from pyrelatics2.retry import RetryPolicy
+from pyrelatics2.transport import HttpResponse
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods
+
+WORKSPACE_ID = "9b167eea-d546-49c3-8cd0-1da09e7e9177"
+NAMESPACES = {"soap": "http://www.w3.org/2003/05/soap-envelope", "r": "http://www.relatics.com/"}
+
+RESPONSES = [
+    ('<Report ReportName="r" EntrycodeUsed="true"><Row a="1"/></Report>',),
+    (
+        '<Report ReportName="r"><Row a="1"/><Row a="2"><Sub x="y">text</Sub><Sub x="z"/></Row>'
+        "<Documents>UEsFBgAAAAAAAAAAAAAAAAAAAAAAAA==</Documents></Report>",
+    ),
+    ('<Report><Row>plain</Row><Other/><class def="x">a &amp;amp; b &lt;</class></Report>',),
+    ('<Report>\n  <Row a="&quot;q&quot; &amp; ü">\n   spaced text  \n</Row>\n  <Row/>\n</Report>',),
+    (
+        '<Report xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+        '<Row xsi:nil="true"/><Row xsi:type="x" a="1"/></Report>',
+    ),
+    ('<Export Error="Something failed"/>',),
+    (
+        '<Import><Message Time="13:17:54" Result="Progress">one</Message>'
+        '<Elements><Element Action="Add" ID="i" ForeignKey="f"/></Elements></Import>',
+    ),
+    (
+        '<Import><Message Time="13:17:54" Result="Progress">Processing row : 1</Message>'
+        '<Message Time="13:17:54" Result="Error">two</Message>'
+        '<Elements><Element Action="Add" ID="i" ForeignKey="f"/><Element Action="Update" ID="j" ForeignKey=""/>'
+        "</Elements>"
+        "</Import>",
+    ),
+    ("<Import><Elements/></Import>",),
+    ("",),
+]
+
+SOAP11_FAULT = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body><soap:Fault>'
+    b"<faultcode>soap:Server</faultcode><faultstring>Server was unable to process request.</faultstring>"
+    b"</soap:Fault></soap:Body></soap:Envelope>"
+)
+SOAP12_FAULT = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope"><soap:Body><soap:Fault>'
+    b"<soap:Code><soap:Value>soap:Receiver</soap:Value></soap:Code>"
+    b'<soap:Reason><soap:Text xml:lang="en">Server was unable to process request.</soap:Text></soap:Reason>'
+    b"</soap:Fault></soap:Body></soap:Envelope>"
+)
+
+
+class ErrorConnectionPool:
+    def request(self, method, url, body=None, headers=None, **options):  # pylint: disable=unused-argument
+        return HttpResponse(status=500, reason="Internal Server Error", headers={}, body=b"<html>oops</html>")
+
+
+class CutOffResponse:
+    status = 200
+    reason = "OK"
+
+    def __init__(self, body: bytes):
+        self.body = BytesIO(body)
+
+    def getheaders(self):
+        return []
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.body.read(size)
+        if not data:
+            raise ConnectionResetError("Connection reset by peer")
+        return data
+
+
+class CutOffConnectionPool:
+    """Pool giving a response that is cut off after the given number of bytes"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.requests = 0
+
+    @contextmanager
+    def stream(self, method, url, body=None, headers=None, **options):  # pylint: disable=unused-argument
+        self.requests += 1
+        yield CutOffResponse(self.body)
+
+
+class TestBuildEnvelope(unittest.TestCase):
+    def test_get_result(self):
+        envelope = build_get_result_envelope("operation & co", WORKSPACE_ID, {"a": 'x"y'}, "code<1>")
+
+        request = ET.fromstring(envelope).find("soap:Body/r:GetResult", NAMESPACES)
+        self.assertEqual(request.findtext("r:Operation", namespaces=NAMESPACES), "operation & co")
+        self.assertEqual(
+            request.findtext("r:Identification/r:Identification/r:Workspace", namespaces=NAMESPACES), WORKSPACE_ID
+        )
+        self.assertEqual(
+            request.find("r:Parameters/r:Parameters/r:Parameter", NAMESPACES).attrib, {"Name": "a", "Value": 'x"y'}
+        )
+        self.assertEqual(
+            request.findtext("r:Authentication/r:Authentication/r:Entrycode", namespaces=NAMESPACES), "code<1>"
+        )
+
+    def test_get_result_without_parameters(self):
+        envelope = build_get_result_envelope("operation", WORKSPACE_ID, {})
+
+        self.assertNotIn(b"Parameters", envelope)
+        self.assertIn(b"<Authentication><Authentication/></Authentication>", envelope)
+
+    def test_import(self):
+        envelope = build_import_envelope("operation", WORKSPACE_ID, "file.xml", "PEltcG9ydC8+")
+
+        request = ET.fromstring(envelope).find("soap:Body/r:Import", NAMESPACES)
+        self.assertEqual(request.findtext("r:Filename", namespaces=NAMESPACES), "file.xml")
+        self.assertEqual(request.findtext("r:Data", namespaces=NAMESPACES), "PEltcG9ydC8+")
+
+
+class TestParseResponse(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.content = ""
+        cls.fake = cls.enterClassContext(FakeRelatics(lambda action, body: soap_response(action, cls.content)))
+        cls.client = cls.fake.client()
+
+    @parameterized.expand(RESPONSES)
+    def test_same_as_suds(self, content: str):
+        type(self).content = content
+
+        expected = self.client.get_result("operation", auto_parse_response=False)
+        actual = parse_response(soap_response("GetResult", content))
+
+        self.assertEqual(type(actual), type(expected))
+        self.assertEqual(repr(actual), repr(expected))
+
+    @parameterized.expand([response for response in RESPONSES if response[0].startswith(("<Import", "<Export"))])
+    def test_import_same_as_suds(self, content: str):
+        type(self).content = content
+
+        expected = ImportResult.from_suds(self.client.get_result("operation", auto_parse_response=False))
+        actual = parse_import_response(soap_response("Import", content))
+
+        self.assertEqual(bool(actual), bool(expected))
+        self.assertEqual(actual.error_msg, expected.error_msg)
+        self.assertEqual(actual.messages, expected.messages)
+        self.assertEqual(actual.elements, expected.elements)
+        self.assertEqual(actual.total_rows, expected.total_rows)
+
+    def test_streamed_blocks(self):
+        body = soap_response("GetResult", RESPONSES[1][0])
+
+        actual = parse_response(body[start : start + 7] for start in range(0, len(body), 7))
+
+        self.assertEqual(repr(actual), repr(parse_response(body)))
+
+    def test_import_callbacks_streamed(self):
+        body = soap_response("Import", RESPONSES[7][0])
+        blocks_read = []
+        events = []
+
+        def blocks():
+            for start in range(0, len(body), 7):
+                blocks_read.append(start)
+                yield body[start : start + 7]
+
+        callbacks = ImportCallbacks(
+            on_message=lambda msg: events.append(("message", msg.status, msg.row, len(blocks_read))),
+            on_element=lambda elem: events.append(("element", elem.id, len(blocks_read))),
+            on_progress=lambda row: events.append(("progress", row)),
+        )
+
+        actual = parse_import_response(blocks(), callbacks)
+
+        self.assertEqual(
+            [event[:3] for event in events],
+            [
+                ("progress", 1),
+                ("message", "Progress", 1),
+                ("message", "Error", 1),
+                ("element", "i", 53),
+                ("element", "j", 60),
+            ],
+        )
+        # The messages were handled before the whole response was read
+        self.assertLess(events[1][3], len(blocks_read))
+        self.assertEqual(actual.messages, parse_import_response(body).messages)
+
+    def test_import_callbacks_not_kept(self):
+        elements = []
+        callbacks = ImportCallbacks(on_element=elements.append, keep_messages=False)
+
+        actual = parse_import_response(soap_response("Import", RESPONSES[7][0]), callbacks)
+
+        self.assertEqual((len(actual.messages), len(actual.elements)), (0, 0))
+        self.assertEqual([elem.id for elem in elements], ["i", "j"])
+
+    def test_import_abort_on_error(self):
+        with self.assertRaises(ImportAbortedError) as context:
+            parse_import_response(soap_response("Import", RESPONSES[7][0]), ImportCallbacks(abort_on_error=True))
+
+        self.assertEqual(context.exception.message.message, "two")
+        self.assertEqual(context.exception.message.row, 1)
+        self.assertEqual(len(context.exception.result.messages), 2)
+        self.assertEqual(len(context.exception.result.elements), 0)
+        self.assertEqual(str(context.exception), "Import aborted at row 1: two")
+
+    @parameterized.expand([(RESPONSES[-1][0],), ('<Report ReportName="r"/>',)])
+    def test_import_streamed_not_import(self, content: str):
+        body = soap_response("Import", content)
+
+        actual = parse_import_response(body[start : start + 7] for start in range(0, len(body), 7))
+
+        self.assertEqual(repr(actual), repr(parse_import_response(body)))
+        self.assertEqual(actual.error_msg, parse_import_response(body).error_msg)
+
+    @parameterized.expand([(SOAP11_FAULT,), (SOAP12_FAULT,)])
+    def test_fault(self, body: bytes):
+        with self.assertRaises(WebFault) as context:
+            parse_response(body)
+
+        self.assertEqual(context.exception.fault.faultstring, "Server was unable to process request.")
+
+
+class TestRawEngine(unittest.TestCase):
+    def setUp(self):
+        self.fake = self.enterContext(FakeRelatics(sample_handler))
+        self.client = self.fake.client(engine="raw")
+
+    def test_init_exception_engine(self):
+        with self.assertRaises(ValueError):
+            RelaticsWebservices("Python", WORKSPACE_ID, engine="zeep")
+
+    def test_get_result(self):
+        result = self.client.get_result("sample_operation", parameters={"param1": "value1"}, authentication="code")
+
+        self.assertIsInstance(result, ExportResult)
+        self.assertEqual(len(result.data.Report.Row), 2)
+        # No WSDL is needed, and the request is a SOAP 1.2 request
+        self.assertEqual([request[0] for request in self.fake.requests], ["POST"])
+        self.assertIn('action="http://www.relatics.com/GetResult"', self.fake.requests[0][2]["Content-Type"])
+        self.assertIn(b'<Parameter Name="param1" Value="value1"/>', self.fake.requests[0][3])
+        self.assertIn(b"<Entrycode>code</Entrycode>", self.fake.requests[0][3])
+
+    def test_run_import(self):
+        result = self.client.run_import("sample_operation", [{"name": "a"}])
+
+        self.assertIsInstance(result, ImportResult)
+        self.assertEqual(result.total_rows, 1)
+        self.assertEqual(result.messages[1].row, 1)
+
+    @parameterized.expand([("raw",), ("suds",)])
+    def test_run_import_callbacks(self, engine: str):
+        self.client.engine = engine
+        progress = []
+
+        result = self.client.run_import(
+            "sample_operation", [{"name": "a"}], callbacks=ImportCallbacks(on_progress=progress.append)
+        )
+
+        self.assertEqual(progress, [1])
+        self.assertEqual(result.total_rows, 1)
+
+    def test_run_import_callbacks_exception(self):
+        with self.assertRaises(ValueError):
+            self.client.run_import(
+                "sample_operation", [{"name": "a"}], auto_parse_response=False, callbacks=ImportCallbacks()
+            )
+
+    def test_run_import_callbacks_not_retried(self):
+        messages = "".join(
+            f'<Message Time="10:00:00" Result="Progress">Processing row : {row}</Message>' for row in (1, 2)
+        )
+        body = soap_response("Import", f"<Import>{messages}</Import>")
+        self.client.connection_pool = CutOffConnectionPool(body[: body.index(b"</Import>")])
+        self.client.retry_policy = RetryPolicy(backoff_base=0, retry_imports=True)
+        received = []
+
+        with self.assertRaises(ConnectionResetError):
+            self.client.run_import(
+                "sample_operation", [{"name": "a"}], callbacks=ImportCallbacks(on_message=received.append)
+            )
+
+        # The messages that were received before the connection was reset are delivered only once
+        self.assertEqual(self.client.connection_pool.requests, 1)
+        self.assertEqual([msg.row for msg in received], [1, 2])
+
+    def test_http_error(self):
+        self.client.connection_pool = ErrorConnectionPool()
+
+        with self.assertRaises(TransportError):
+            self.client.get_result("sample_operation")
+
+
+class TestAsyncRawEngine(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.fake = self.enterContext(FakeRelatics(sample_handler))
+
+    async def test_get_result_and_run_import(self):
+        async with self.fake.async_client(engine="raw") as client:
+            export_result = await client.get_result("sample_operation")
+            import_result = await client.run_import("sample_operation", [{"name": "a"}])
+            progress = []
+            await client.run_import(
+                "sample_operation", [{"name": "a"}], callbacks=ImportCallbacks(on_progress=progress.append)
+            )
+
+        self.assertEqual(progress, [1])
+
+        self.assertEqual(len(export_result.data.Report.Row), 2)
+        self.assertEqual(import_result.total_rows, 1)
+        self.assertNotIn("GET", [request[0] for request in self.fake.requests])
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)
@@ -0,0 +1,306 @@
+"""
+Testing the "result_cache.py" module
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Barrier
+from threading import Event
+from unittest import mock
+
+from fake_relatics import FakeRelatics
+from fake_relatics import soap_response
+from parameterized import parameterized
+
+from pyrelatics2.client import ClientCredential
+from pyrelatics2.client import RelaticsWebservices
+from pyrelatics2.plugins import KeepReplyPlugin
+from pyrelatics2.result_cache import CacheStatistics
+from pyrelatics2.result_cache import FileResultStore
+from pyrelatics2.result_cache import MemoryResultStore
+from pyrelatics2.result_cache import ResultCache
+from pyrelatics2.result_cache import result_cache_key
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods
+
+WORKSPACE_ID = "9b167eea-d546-49c3-8cd0-1da09e7e9177"
+
+
+class TestResultCacheKey(unittest.TestCase):
+    def test_parameters_order(self):
+        self.assertEqual(
+            result_cache_key("host", WORKSPACE_ID, "operation", {"a": "1", "b": "2"}, ""),
+            result_cache_key("host", WORKSPACE_ID, "operation", {"b": "2", "a": "1"}, ""),
+        )
+
+    @parameterized.expand(
+        [
+            ("other", WORKSPACE_ID, "operation", {"a": "1"}, ""),
+            ("host", "other", "operation", {"a": "1"}, ""),
+            ("host", WORKSPACE_ID, "other", {"a": "1"}, ""),
+            ("host", WORKSPACE_ID, "operation", {"a": "2"}, ""),
+            ("host", WORKSPACE_ID, "operation", None, ""),
+            ("host", WORKSPACE_ID, "operation", {"a": "1"}, "client_id:x"),
+        ]
+    )
+    def test_differs(self, *request):
+        self.assertNotEqual(
+            result_cache_key("host", WORKSPACE_ID, "operation", {"a": "1"}, ""), result_cache_key(*request)
+        )
+
+
+class TestMemoryResultStore(unittest.TestCase):
+    def test_lru_entries(self):
+        store = MemoryResultStore(max_entries=2)
+        store.set("a", b"1", 60)
+        store.set("b", b"2", 60)
+        store.get("a")
+        store.set("c", b"3", 60)
+
+        self.assertEqual((store.get("a"), store.get("b"), store.get("c")), (b"1", None, b"3"))
+
+    def test_max_size(self):
+        store = MemoryResultStore(max_size=10)
+        store.set("a", b"x" * 6, 60)
+        store.set("b", b"x" * 6, 60)
+        store.set("c", b"x" * 11, 60)
+
+        self.assertEqual((store.get("a"), store.get("b"), store.get("c")), (None, b"x" * 6, None))
+
+    def test_ttl(self):
+        store = MemoryResultStore()
+        store.set("a", b"1", 0.01)
+        time.sleep(0.02)
+
+        self.assertIsNone(store.get("a"))
+
+
+class TestFileResultStore(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, "results")
+
+    def test_set_get(self):
+        FileResultStore(self.location).set("a", b"<body/>", 60)
+
+        # Another instance (like in another process) reads the same file
+        self.assertEqual(FileResultStore(self.location).get("a"), b"<body/>")
+        self.assertIsNone(FileResultStore(self.location).get("b"))
+        if os.name == "posix":
+            self.assertEqual(os.stat(os.path.join(self.location, "result_a.bin")).st_mode & 0o777, 0o600)
+
+    def test_ttl(self):
+        store = FileResultStore(self.location)
+        store.set("a", b"1", -1)
+
+        self.assertIsNone(store.get("a"))
+        self.assertEqual(os.listdir(self.location), [])
+
+    def test_max_size(self):
+        store = FileResultStore(self.location, max_size=100)
+        store.set("a", b"x" * 60, 60)
+        os.utime(os.path.join(self.location, "result_a.bin"), (time.time() - 10, time.time() - 10))
+        store.set("b", b"x" * 60, 60)
+
+        self.assertIsNone(store.get("a"))
+        self.assertIsNotNone(store.get("b"))
+
+    def test_clear(self):
+        store = FileResultStore(self.location)
+        store.set("a", b"1", 60)
+        store.set("b", b"2", 60)
+        store.clear()
+
+        self.assertEqual(os.listdir(self.location), [])
+
+
+class TestResultCache(unittest.TestCase):
+    def test_get_or_fetch(self):
+        cache = ResultCache()
+        fetched = []
+
+        def fetch():
+            fetched.append(1)
+            return b"body", "result"
+
+        self.assertEqual(cache.get_or_fetch("key", "operation", fetch), (b"body", "result"))
+        self.assertEqual(cache.get_or_fetch("key", "operation", fetch), (b"body", None))
+        self.assertEqual(len(fetched), 1)
+        self.assertEqual(cache.statistics, CacheStatistics(hits=1, misses=1, coalesced=0))
+
+    def test_coalesce(self):
+        cache = ResultCache()
+        barrier = Barrier(8)
+        release = Event()
+        fetched = []
+
+        def fetch():
+            fetched.append(1)
+            release.wait(5)
+            return b"body", "result"
+
+        def get(_):
+            barrier.wait()
+            return cache.get_or_fetch("key", "operation", fetch)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(get, index) for index in range(8)]
+            while cache.statistics.coalesced < 7:
+                time.sleep(0.01)
+            release.set()
+
+        results = [future.result() for future in futures]
+        self.assertEqual(results.count((b"body", None)), 7)
+        self.assertIn((b"body", "result"), results)
+        self.assertEqual(len(fetched), 1)
+
+    def test_exception_shared_and_not_stored(self):
+        cache = ResultCache()
+
+        def fetch():
+            raise ConnectionResetError()
+
+        with self.assertRaises(ConnectionResetError):
+            cache.get_or_fetch("key", "operation", fetch)
+        self.assertEqual(cache.get_or_fetch("key", "operation", lambda: (b"body", None)), (b"body", None))
+
+    def test_operation_ttls(self):
+        cache = ResultCache(ttl=timedelta(minutes=1), operation_ttls={"volatile": timedelta(0)})
+
+        cache.get_or_fetch("key1", "volatile", lambda: (b"1", None))
+        cache.get_or_fetch("key2", "stable", lambda: (b"2", None))
+
+        self.assertIsNone(cache.store.get("key1"))
+        self.assertEqual(cache.store.get("key2"), b"2")
+        self.assertEqual(cache.ttl_for("volatile"), timedelta(0))
+
+    def test_not_cacheable(self):
+        cache = ResultCache()
+
+        cache.get_or_fetch(
+            "key", "operation", lambda: (b"error", "failed"), cacheable=lambda result: result != "failed"
+        )
+
+        self.assertIsNone(cache.store.get("key"))
+
+    def test_invalidate(self):
+        cache = ResultCache()
+        cache.get_or_fetch("key1", "operation", lambda: (b"1", None))
+        cache.get_or_fetch("key2", "operation", lambda: (b"2", None))
+
+        cache.invalidate("key1")
+        self.assertIsNone(cache.store.get("key1"))
+        cache.invalidate()
+        self.assertIsNone(cache.store.get("key2"))
+
+
+class TestCachedWebservices(unittest.TestCase):
+    def setUp(self):
+        self.content = '<Report ReportName="sample"><Row Name="a"/><Row Name="b"/></Report>'
+        self.fake = self.enterContext(FakeRelatics(lambda action, body: soap_response(action, self.content)))
+
+    def _client(self, engine: str) -> RelaticsWebservices:
+        client = self.fake.client(engine=engine)
+        client.result_cache = ResultCache()
+        return client
+
+    def _soap_requests(self) -> list[bytes]:
+        return [request[3] for request in self.fake.requests if request[1] == "/DataExchange.asmx"]
+
+    @parameterized.expand([("suds",), ("raw",)])
+    def test_get_result(self, engine: str):
+        client = self._client(engine)
+
+        first = client.get_result("sample_operation", parameters={"a": "1", "b": "2"})
+        second = client.get_result("sample_operation", parameters={"b": "2", "a": "1"})
+        client.get_result("sample_operation", parameters={"a": "other"})
+
+        self.assertEqual(len(self._soap_requests()), 2)
+        self.assertIsNot(first, second)
+        self.assertEqual(repr(first), repr(second))
+        self.assertEqual(len(second.data.Report.Row), 2)
+        self.assertIn(b'Name="a" Value="1"', self._soap_requests()[0])
+
+    def test_get_result_not_parsed(self):
+        client = self._client("suds")
+
+        expected = client.get_result("sample_operation", auto_parse_response=False)
+        actual = client.get_result("sample_operation", auto_parse_response=False)
+
+        self.assertEqual(repr(actual), repr(expected))
+
+    @parameterized.expand([(True,), (False,)])
+    def test_suds_engine_parses_once(self, auto_parse_response: bool):
+        client = self._client("suds")
+        uncached = self.fake.client()
+
+        with mock.patch("pyrelatics2.client.parse_response") as parse_response:
+            with mock.patch.object(
+                KeepReplyPlugin, "received", autospec=True, side_effect=KeepReplyPlugin.received
+            ) as received:
+                first = client.get_result("sample_operation", auto_parse_response=auto_parse_response)
+                second = client.get_result("sample_operation", auto_parse_response=auto_parse_response)
+
+        # Parsed by suds only, both when fetched and when taken from the cache
+        parse_response.assert_not_called()
+        self.assertEqual(received.call_count, 1)
+        expected = uncached.get_result("sample_operation", auto_parse_response=auto_parse_response)
+        self.assertEqual(repr(first), repr(expected))
+        self.assertEqual(repr(second), repr(expected))
+
+    def test_authentication_identity(self):
+        client = self._client("raw")
+
+        client.get_result("sample_operation", authentication="code1")
+        client.get_result("sample_operation", authentication="code2")
+        client.get_result(
+            "sample_operation",
+            authentication=ClientCredential("client_id", "secret", connection_pool=self.fake.pool()),
+        )
+
+        self.assertEqual(len(self._soap_requests()), 3)
+
+    def test_error_not_cached(self):
+        client = self._client("raw")
+        self.content = '<Export Error="Something failed"/>'
+
+        self.assertFalse(client.get_result("sample_operation"))
+        self.assertFalse(client.get_result("sample_operation"))
+
+        self.assertEqual(len(self._soap_requests()), 2)
+
+    def test_get_results_many_coalesced(self):
+        client = self._client("raw")
+
+        results = list(client.get_results_many([("sample_operation", None)] * 20, max_workers=10))
+
+        self.assertTrue(all(results))
+        statistics = client.result_cache.statistics
+        self.assertEqual(statistics.misses, len(self._soap_requests()))
+        self.assertEqual(statistics.hits + statistics.coalesced + statistics.misses, 20)
+        self.assertLess(len(self._soap_requests()), 20)
+
+    def test_async(self):
+        async def main():
+            async with self.fake.async_client() as client:
+                client.result_cache = ResultCache()
+                results = await asyncio.gather(*(client.get_result("sample_operation") for _ in range(10)))
+                results.append(await client.get_result("sample_operation"))
+                return results
+
+        results = asyncio.run(main())
+
+        self.assertTrue(all(results))
+        self.assertEqual(len(results[-1].data.Report.Row), 2)
+        self.assertEqual(len(self._soap_requests()), 1)
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)
@@ -1,15 +1,35 @@
 """
 Testing the "result_classes.py" module
 """
+
+import importlib.util
 import logging
+import operator
+import os
+import pickle
+import sys
+import tempfile
 import unittest
+from base64 import b64encode
+from dataclasses import replace
+from datetime import timedelta
+from io import BytesIO
+from unittest.mock import patch
+from zipfile import ZipFile
 
+from fake_relatics import soap_response
 from parameterized import parameterized
+from suds.sax.text import Text
+from suds.sudsobject import Object
 
+from pyrelatics2.raw_soap import parse_import_response
+from pyrelatics2.raw_soap import parse_response
 from pyrelatics2.result_classes import ExportResult
 from pyrelatics2.result_classes import ImportElement
 from pyrelatics2.result_classes import ImportElementActions
+from pyrelatics2.result_classes import ImportElements
 from pyrelatics2.result_classes import ImportMessage
+from pyrelatics2.result_classes import ImportMessages
 from pyrelatics2.result_classes import ImportMessageStatus
 from pyrelatics2.result_classes import ImportResult
 
@@ -36,6 +56,141 @@ class TestExportResult(unittest.TestCase):
         self.assertEqual(repr(instance), "ExportResult(data=None, documents={})", "wrong __repr__()")
         self.assertEqual(str(instance), "ERROR: None\n", "wrong __str__()")
 
+    def test_from_suds_documents(self):
+        # Arrange
+        buffer = BytesIO()
+        with ZipFile(buffer, "w") as docs_zip:
+            docs_zip.writestr("file_a.txt", b"contents of a")
+        suds_response = Object()
+        suds_response.Report = Object()
+        suds_response.Report.Documents = Text(b64encode(buffer.getvalue()).decode("ascii"))
+
+        # Act
+        instance = ExportResult.from_suds(suds_response)
+
+        # Assert
+        self.assertTrue(instance)
+        self.assertEqual(dict(instance.documents), {"file_a.txt": b"contents of a"})
+        self.assertFalse(hasattr(instance.data.Report, "Documents"))
+        self.assertIn("file_a.txt                                              13", str(instance))
+
+    @parameterized.expand(
+        [
+            (
+                '<Report ReportName="r"><Employees><Employee Name="a" Age="1"><Skill N="x"/></Employee>'
+                '<Employee Name="b"/><Employee Age="3" Name="c" Extra="e"/></Employees></Report>',
+                {"Name": ["a", "b", "c"], "Age": ["1", None, "3"], "Extra": [None, None, "e"]},
+            ),
+            # A single row isn't a list in suds
+            ('<Report><Employees><Employee Name="a"/></Employees></Report>', {"Name": ["a"]}),
+            (
+                '<Report><Row Name="a">text</Row><Row Name="b"/></Report>',
+                {"Name": ["a", "b"], "value": ["text", None]},
+            ),
+            ("<Report><Row>a</Row><Row>b</Row></Report>", {"value": ["a", "b"]}),
+        ]
+    )
+    def test_to_columns(self, report: str, expected: dict):
+        instance = ExportResult.from_suds(parse_response(soap_response("GetResult", report)))
+
+        self.assertEqual(instance.to_columns(), expected)
+
+    def test_to_columns_path(self):
+        report = (
+            '<Report><Employees><Employee Name="a"/></Employees>'
+            '<Managers><Manager Name="b"/><Manager Name="c"/></Managers></Report>'
+        )
+        instance = ExportResult.from_suds(parse_response(soap_response("GetResult", report)))
+
+        self.assertEqual(instance.to_columns(["Report", "Managers", "Manager"]), {"Name": ["b", "c"]})
+        with self.assertRaises(ValueError) as context:
+            instance.to_columns()
+        self.assertIn("Report.Employees, Report.Managers", str(context.exception))
+
+    def test_to_pandas_missing_dependency(self):
+        instance = ExportResult.from_suds(parse_response(soap_response("GetResult", '<Report><Row a="1"/></Report>')))
+
+        with patch.dict(sys.modules, {"pandas": None, "pyarrow": None}):
+            with self.assertRaises(ImportError):
+                instance.to_pandas()
+            with self.assertRaises(ImportError):
+                instance.to_arrow()
+
+    @unittest.skipUnless(importlib.util.find_spec("pandas"), "pandas isn't installed")
+    def test_to_pandas(self):
+        instance = ExportResult.from_suds(
+            parse_response(soap_response("GetResult", '<Report><Row a="1"/><Row a="2"/></Report>'))
+        )
+
+        self.assertEqual(list(instance.to_pandas()["a"]), ["1", "2"])
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow isn't installed")
+    def test_to_arrow(self):
+        instance = ExportResult.from_suds(
+            parse_response(soap_response("GetResult", '<Report><Row a="1"/><Row a="2"/></Report>'))
+        )
+
+        self.assertEqual(instance.to_arrow().to_pydict(), {"a": ["1", "2"]})
+
+
+class TestExportResultSerialization(unittest.TestCase):
+    def setUp(self):
+        buffer = BytesIO()
+        with ZipFile(buffer, "w") as docs_zip:
+            docs_zip.writestr("file_a.txt", b"contents of a")
+        documents = b64encode(buffer.getvalue()).decode("ascii")
+        report = (
+            '<Report ReportName="r"><Row Name="a">text &amp; \u00e9</Row><Row Name="b"/>'
+            f'<Totals Count="2"><Empty/></Totals><Documents>{documents}</Documents></Report>'
+        )
+        self.instance = ExportResult.from_suds(parse_response(soap_response("GetResult", report)))
+
+    def test_round_trip(self):
+        restored = ExportResult.from_bytes(self.instance.to_bytes())
+
+        self.assertEqual(repr(restored), repr(self.instance))
+        self.assertEqual(
+            restored.to_columns(["Report", "Row"]), {"value": ["text & \u00e9", None], "Name": ["a", "b"]}
+        )
+        self.assertIsInstance(restored.data.Report._ReportName, Text)  # pylint: disable=protected-access
+        self.assertEqual(dict(restored.documents), {"file_a.txt": b"contents of a"})
+
+    def test_pickle(self):
+        restored = pickle.loads(pickle.dumps(self.instance))
+
+        self.assertEqual(repr(restored), repr(self.instance))
+
+    def test_documents_by_reference(self):
+        with tempfile.TemporaryDirectory() as directory:
+            location = os.path.join(directory, "documents")
+            data = self.instance.to_bytes(documents_location=location)
+            self.instance.to_bytes(documents_location=location)
+
+            restored = ExportResult.from_bytes(data, documents_location=location)
+            self.assertEqual(len(os.listdir(location)), 1)
+            self.assertNotIn(self.instance.documents.zip_bytes, data)
+            self.assertEqual(dict(restored.documents), {"file_a.txt": b"contents of a"})
+            with self.assertRaises(ValueError):
+                ExportResult.from_bytes(data)
+
+    def test_error(self):
+        instance = ExportResult.from_suds(
+            parse_response(soap_response("GetResult", '<Export Error="Something failed"/>'))
+        )
+
+        restored = ExportResult.from_bytes(instance.to_bytes())
+
+        self.assertFalse(restored)
+        self.assertEqual(restored.error_msg, "Something failed")
+        self.assertEqual(repr(restored), repr(instance))
+
+    @parameterized.expand(
+        [(b"not json",), (b'{"format":"ImportResult","version":1}',), (b'{"format":"ExportResult","version":99}',)]
+    )
+    def test_invalid(self, data: bytes):
+        with self.assertRaises(ValueError):
+            ExportResult.from_bytes(data)
+
 
 class TestImportResult(unittest.TestCase):
     def test_from_suds_none(self):
@@ -53,6 +208,181 @@ class TestImportResult(unittest.TestCase):
         )
         self.assertEqual(str(instance), "ERROR: None\n", "wrong __str__()")
 
+    def test_merge(self):
+        # Arrange
+        def chunk_result(rows: int, milliseconds: int) -> ImportResult:
+            result = ImportResult(total_rows=rows, elapsed_time=timedelta(milliseconds=milliseconds))
+            result.messages.append(ImportMessage(time="10:00:00", status="Progress", message="Started", row=0))
+            for row in range(1, rows + 1):
+                result.messages.append(
+                    ImportMessage(time="10:00:01", status="Progress", message=f"Processing row : {row}", row=row)
+                )
+            result.elements.append(ImportElement(action="Add", id=f"id-{rows}", foreign_key=f"fk-{rows}"))
+            return result
+
+        # Act
+        instance = ImportResult.merge([(2, chunk_result(1, 30)), (0, chunk_result(2, 20))])
+
+        # Assert
+        self.assertTrue(instance)
+        self.assertEqual(instance.total_rows, 3)
+        self.assertEqual(instance.elapsed_time, timedelta(milliseconds=50))
+        self.assertEqual([msg.row for msg in instance.messages], [0, 1, 2, 0, 3])
+        self.assertEqual([elem.id for elem in instance.elements], ["id-2", "id-1"])
+
+    def test_merge_error(self):
+        # Arrange
+        failed = ImportResult()
+        failed.has_error = True
+        failed.error_msg = "Chunk 1 failed"
+
+        # Act
+        instance = ImportResult.merge([(0, ImportResult(total_rows=5)), (5, failed)])
+
+        # Assert
+        self.assertFalse(instance)
+        self.assertEqual(instance.error_msg, "Chunk 1 failed")
+        self.assertEqual(instance.total_rows, 5)
+
+    @staticmethod
+    def _row_errors_result(rows: int, error_rows: set[int]) -> ImportResult:
+        result = ImportResult()
+        result.add_message(time="10:00:00", status="Progress", message="Started")
+        for row in range(1, rows + 1):
+            result.add_message(time="10:00:01", status="Progress", message=f"Processing row : {row}")
+            if row in error_rows:
+                result.add_message(time="10:00:01", status="Error", message=f"Invalid value in row {row}")
+            elif row % 2 == 0:
+                result.add_message(time="10:00:01", status="Warning", message=f"Unknown column in row {row}")
+                result.add_element(action="Add", id=f"id-{row}", foreign_key=f"fk-{row}")
+        return result
+
+    def test_row_results(self):
+        # Arrange
+        data = [{"key": f"fk-{row}"} for row in range(1, 5)]
+        instance = self._row_errors_result(4, {3})
+
+        # Act
+        results = instance.row_results(data, foreign_key="key")
+
+        # Assert
+        self.assertEqual([result.index for result in results], [0, 1, 2, 3])
+        self.assertEqual([bool(result) for result in results], [True, True, False, True])
+        self.assertEqual([result.has_warning for result in results], [False, True, False, True])
+        self.assertEqual(results[2].row, {"key": "fk-3"})
+        self.assertEqual(
+            [msg.message for msg in results[2].messages], ["Processing row : 3", "Invalid value in row 3"]
+        )
+        self.assertEqual([[elem.id for elem in result.elements] for result in results], [[], ["id-2"], [], ["id-4"]])
+
+    def test_row_results_without_foreign_key(self):
+        results = self._row_errors_result(2, set()).row_results([{"key": "fk-1"}, {"key": "fk-2"}])
+
+        self.assertEqual([result.elements for result in results], [[], []])
+
+    @parameterized.expand(
+        [
+            (("Error",), [1, 3]),
+            (("Error", "Warning"), [1, 3, 5]),
+            (("Comment",), []),
+        ]
+    )
+    def test_failed_rows(self, statuses: tuple[ImportMessageStatus, ...], expected: list[int]):
+        self.assertEqual(self._row_errors_result(6, {2, 4}).failed_rows(statuses), expected)
+
+    def test_replace_rows(self):
+        # Arrange
+        instance = self._row_errors_result(4, {2, 3})
+        instance.total_rows = 4
+        instance.elapsed_time = timedelta(milliseconds=20)
+        resubmitted = self._row_errors_result(2, {2})
+        resubmitted.total_rows = 2
+        resubmitted.elapsed_time = timedelta(milliseconds=10)
+
+        # Act
+        combined = instance.replace_rows([1, 2], resubmitted)
+
+        # Assert
+        self.assertTrue(combined)
+        self.assertEqual(combined.failed_rows(), [2])
+        self.assertEqual(combined.total_rows, 4)
+        self.assertEqual(combined.elapsed_time, timedelta(milliseconds=30))
+        self.assertEqual(sorted({msg.row for msg in combined.messages}), [0, 1, 2, 3, 4])
+        self.assertEqual([elem.id for elem in combined.elements], ["id-4"])
+        # The original result isn't changed
+        self.assertEqual(instance.failed_rows(), [1, 2])
+
+    def test_indexes(self):
+        # Arrange
+        body = soap_response(
+            "Import",
+            "<Import>"
+            '<Message Time="10:00:00" Result="Progress">Processing row : 1</Message>'
+            '<Message Time="10:00:00" Result="Error">Invalid value</Message>'
+            '<Message Time="10:00:01" Result="Progress">Processing row : 2</Message>'
+            '<Elements><Element Action="Add" ID="id-1" ForeignKey="fk-1"/>'
+            '<Element Action="Update" ID="id-2" ForeignKey=""/></Elements>'
+            "</Import>",
+        )
+
+        # Act
+        instance = parse_import_response(body)
+
+        # Assert
+        self.assertEqual([msg.message for msg in instance.messages_by_status["Error"]], ["Invalid value"])
+        self.assertNotIn("Warning", instance.messages_by_status)
+        self.assertEqual([msg.status for msg in instance.messages_by_row[1]], ["Progress", "Error"])
+        self.assertEqual(instance.elements_by_foreign_key["fk-1"].id, "id-1")
+        self.assertNotIn("", instance.elements_by_foreign_key)
+        self.assertEqual(instance.elements_by_id["id-2"].action, "Update")
+        self.assertEqual([elem.id for elem in instance.elements_by_action["Add"]], ["id-1"])
+        with self.assertRaises(TypeError):
+            operator.setitem(instance.elements_by_id, "id-3", instance.elements[0])
+
+    def test_indexes_lists_changed(self):
+        instance = self._row_errors_result(2, {1})
+        self.assertEqual(len(instance.error_messages), 1)
+
+        # Changing the lists directly makes the indexes rebuilt
+        instance.messages.append(ImportMessage(time="10:00:02", status="Error", message="Another error", row=2))
+        instance.elements = [ImportElement(action="Add", id="id-9", foreign_key="fk-9")]
+
+        self.assertEqual(instance.failed_rows(), [0, 1])
+        self.assertEqual(list(instance.elements_by_foreign_key), ["fk-9"])
+        self.assertEqual(instance.added_elements, instance.elements)
+
+    def test_indexes_items_replaced(self):
+        instance = self._row_errors_result(3, {3})
+        self.assertEqual(instance.failed_rows(), [2])
+
+        # Replacing or removing messages keeps the length, but still makes the indexes rebuilt
+        instance.messages[-1] = replace(instance.messages[-1], status="Warning")
+        self.assertEqual((instance.failed_rows(), instance.failed_rows(("Warning",))), ([], [1, 2]))
+
+        instance.messages.insert(0, ImportMessage(time="10:00:09", status="Error", message="Another error", row=1))
+        del instance.messages[-1]
+        self.assertEqual((instance.failed_rows(), instance.failed_rows(("Warning",))), ([0], [1]))
+        self.assertEqual([msg.message for msg in instance.messages_by_status["Error"]], ["Another error"])
+
+    def test_indexes_not_in_repr_or_eq(self):
+        instance = self._row_errors_result(2, set())
+        other = self._row_errors_result(2, set())
+        _ = instance.messages_by_row
+
+        self.assertEqual(instance, other)
+        self.assertNotIn("_index", repr(instance))
+
+    def test_replace_rows_failed(self):
+        failed = ImportResult()
+        failed.has_error = True
+        failed.error_msg = "Import failed"
+
+        combined = self._row_errors_result(2, {1}).replace_rows([0], failed)
+
+        self.assertFalse(combined)
+        self.assertEqual(combined.error_msg, "Import failed")
+        self.assertEqual(combined.failed_rows(), [])
+
 
 class TestImportMessage(unittest.TestCase):
     @parameterized.expand(
@@ -127,6 +457,89 @@ class TestImportElement(unittest.TestCase):
     #     # Still to be done
 
 
+class TestImportResultColumns(unittest.TestCase):
+    def test_parsed_into_columns(self):
+        body = soap_response(
+            "Import",
+            '<Import><Message Time="10:00:00" Result="Progress">Processing row : 1</Message>'
+            '<Elements><Element Action="Add" ID="id-1" ForeignKey="fk-1"/></Elements></Import>',
+        )
+
+        instance = parse_import_response(body)
+
+        self.assertIsInstance(instance.messages, ImportMessages)
+        self.assertIsInstance(instance.elements, ImportElements)
+        self.assertEqual(
+            repr(instance),
+            "ImportResult(messages=[ImportMessage(time=datetime.time(10, 0), status='Progress', "
+            "message='Processing row : 1', row=1)], elements=[ImportElement(action='Add', id='id-1', "
+            "foreign_key='fk-1')], total_rows=None, elapsed_time=None)",
+        )
+
+    def test_lists_assigned(self):
+        instance = ImportResult()
+        instance.messages = []
+        instance.elements = []
+
+        message = instance.add_message(time="10:00:00", status="Progress", message="Processing row : 3")
+        instance.add_element(action="Add", id="id-1", foreign_key="fk-1")
+
+        self.assertEqual(instance.messages, [message])
+        self.assertEqual(message.row, 3)
+        self.assertEqual(instance.elements_by_id["id-1"].foreign_key, "fk-1")
+
+
+class TestImportResultSerialization(unittest.TestCase):
+    def setUp(self):
+        body = soap_response(
+            "Import",
+            '<Import><Message Time="10:00:00" Result="Progress">Processing row : 1</Message>'
+            '<Message Time="10:00:01" Result="Error">Row failed</Message>'
+            '<Message Time="10:00:02" Result="Progress">Total rows imported: 1</Message>'
+            '<Message Time="10:00:02" Result="Progress">Total time (ms): 1500</Message>'
+            '<Elements><Element Action="Add" ID="id-1" ForeignKey="fk-1"/></Elements></Import>',
+        )
+        self.instance = parse_import_response(body)
+
+    def test_round_trip(self):
+        restored = ImportResult.from_bytes(self.instance.to_bytes())
+
+        self.assertEqual(restored, self.instance)
+        self.assertEqual((restored.total_rows, restored.elapsed_time), (1, timedelta(seconds=1.5)))
+        self.assertEqual(restored.failed_rows(), [0])
+        self.assertEqual(restored.elements_by_foreign_key["fk-1"].id, "id-1")
+
+        # Messages added after restoring continue at the last row
+        restored.add_message(time="10:00:03", status="Comment", message="Done")
+        self.assertEqual(restored.messages[-1].row, 1)
+
+    def test_pickle(self):
+        restored = pickle.loads(pickle.dumps(self.instance))
+
+        self.assertEqual(repr(restored), repr(self.instance))
+
+    def test_lists_assigned(self):
+        self.instance.messages = list(self.instance.messages)
+        self.instance.elements = list(self.instance.elements)
+
+        restored = ImportResult.from_bytes(self.instance.to_bytes())
+
+        self.assertIsInstance(restored.messages, ImportMessages)
+        self.assertEqual(restored, self.instance)
+
+    def test_error(self):
+        instance = parse_import_response(soap_response("Import", '<Export Error="Import failed"/>'))
+
+        restored = ImportResult.from_bytes(instance.to_bytes())
+
+        self.assertFalse(restored)
+        self.assertEqual(restored.error_msg, "Import failed")
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            ImportResult.from_bytes(ExportResult().to_bytes())
+
+
 if __name__ == "__main__":
     # unittest.main()
     unittest.main(argv=["first-arg-is-ignored"], exit=False)
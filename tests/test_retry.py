@@ -0,0 +1,295 @@
+"""
+Testing the "retry.py" module
+"""
+
+import socket
+import ssl
+import time
+import unittest
+from http.client import IncompleteRead
+
+from fake_relatics import FakeRelatics
+from fake_relatics import soap_response
+from parameterized import parameterized
+from suds import WebFault
+from suds.transport import TransportError
+
+from pyrelatics2.client import RelaticsWebservices
+from pyrelatics2.concurrency import ResilienceOptions
+from pyrelatics2.exceptions import CircuitOpenError
+from pyrelatics2.retry import CircuitBreaker
+from pyrelatics2.retry import CircuitStatistics
+from pyrelatics2.retry import RetryPolicy
+from pyrelatics2.retry import RetryStatistics
+from pyrelatics2.retry import is_transient
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods
+
+HOSTNAME = "python.relaticsonline.com"
+
+
+def handler(action: str, body: bytes) -> bytes:
+    if action == "GetResult":
+        return soap_response(action, '<Report ReportName="sample"><Row Name="a"/></Report>')
+    return soap_response(
+        action, '<Import><Message Time="13:17:55" Result="Progress">Total rows imported: 1</Message></Import>'
+    )
+
+
+class Flaky:
+    """Callable raising the errors one after the other, and returning "ok" after that"""
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class TestRetryPolicy(unittest.TestCase):
+    @parameterized.expand(
+        [
+            (ConnectionResetError(),),
+            (TimeoutError(),),
+            (socket.gaierror(),),
+            (IncompleteRead(b""),),
+            (TransportError("Bad Gateway", 502),),
+            (Exception((503, "Service Unavailable")),),
+        ]
+    )
+    def test_retry_transient(self, error: Exception):
+        policy = RetryPolicy(backoff_base=0)
+        send = Flaky(error)
+
+        self.assertEqual(policy.call(HOSTNAME, send), "ok")
+        self.assertEqual(send.calls, 2)
+        self.assertEqual(policy.statistics, RetryStatistics(retries=1, exhausted=0))
+
+    @parameterized.expand(
+        [
+            (TransportError("Not Found", 404),),
+            (WebFault(type("Fault", (), {"faultstring": "Server was unable to process request."})(), None),),
+            (ValueError("Supplied data is empty."),),
+            (FileNotFoundError("data.csv"),),
+            (ssl.SSLCertVerificationError(),),
+        ]
+    )
+    def test_no_retry_permanent(self, error: Exception):
+        policy = RetryPolicy(backoff_base=0)
+        send = Flaky(error)
+
+        with self.assertRaises(type(error)):
+            policy.call(HOSTNAME, send)
+        self.assertEqual(send.calls, 1)
+
+    def test_exhausted(self):
+        policy = RetryPolicy(max_attempts=3, backoff_base=0)
+        send = Flaky(*(ConnectionResetError() for _ in range(5)))
+
+        with self.assertRaises(ConnectionResetError):
+            policy.call(HOSTNAME, send)
+        self.assertEqual(send.calls, 3)
+        self.assertEqual(policy.statistics, RetryStatistics(retries=2, exhausted=1))
+
+    @parameterized.expand(
+        [
+            (ConnectionResetError(), False, 1),
+            (TransportError("Bad Gateway", 502), False, 1),
+            (ConnectionRefusedError(), False, 2),
+            (TransportError("Service Unavailable", 503), False, 2),
+            (ConnectionResetError(), True, 2),
+        ]
+    )
+    def test_retry_not_idempotent(self, error: Exception, retry_imports: bool, expected_calls: int):
+        policy = RetryPolicy(backoff_base=0, retry_imports=retry_imports)
+        send = Flaky(error)
+
+        try:
+            policy.call(HOSTNAME, send, idempotent=False)
+        except type(error):
+            pass
+        self.assertEqual(send.calls, expected_calls)
+
+    @parameterized.expand([(ConnectionResetError(), 1), (ConnectionRefusedError(), 2)])
+    def test_retry_imports_not_applied(self, error: Exception, expected_calls: int):
+        policy = RetryPolicy(backoff_base=0, retry_imports=True)
+        send = Flaky(error)
+
+        try:
+            policy.call(HOSTNAME, send, idempotent=False, retry_imports=False)
+        except type(error):
+            pass
+        self.assertEqual(send.calls, expected_calls)
+
+    def test_delay(self):
+        policy = RetryPolicy(backoff_base=1, backoff_max=5)
+
+        for attempt, maximum in ((1, 1), (2, 2), (3, 4), (4, 5), (10, 5)):
+            delays = [policy.delay(attempt) for _ in range(100)]
+            self.assertTrue(all(0 <= delay <= maximum for delay in delays))
+        # Jitter spreads the delays
+        self.assertGreater(len({policy.delay(3) for _ in range(10)}), 1)
+
+    def test_init_exception_max_attempts(self):
+        with self.assertRaises(ValueError):
+            RetryPolicy(max_attempts=0)
+
+    def test_is_transient(self):
+        self.assertTrue(is_transient(TransportError("Internal Server Error", 500)))
+        self.assertFalse(is_transient(TransportError("Internal Server Error", 500), statuses=frozenset({503})))
+        self.assertFalse(is_transient(Exception("Something else")))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_open_and_close(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        policy = RetryPolicy(max_attempts=1)
+
+        for _ in range(2):
+            with self.assertRaises(ConnectionResetError):
+                policy.call(HOSTNAME, Flaky(ConnectionResetError()), circuit_breaker=breaker)
+        self.assertEqual(breaker.state(HOSTNAME), "open")
+
+        # Fails fast, without calling
+        send = Flaky()
+        with self.assertRaises(CircuitOpenError) as context:
+            policy.call(HOSTNAME, send, circuit_breaker=breaker)
+        self.assertEqual(send.calls, 0)
+        self.assertEqual(context.exception.hostname, HOSTNAME)
+        self.assertEqual(breaker.state("other.relaticsonline.com"), "closed")
+
+        # A successful trial request closes the circuit
+        time.sleep(0.06)
+        self.assertEqual(policy.call(HOSTNAME, send, circuit_breaker=breaker), "ok")
+        self.assertEqual(breaker.state(HOSTNAME), "closed")
+        self.assertEqual(breaker.statistics, CircuitStatistics(opened=1, half_opened=1, closed=1, rejected=1))
+
+    def test_failed_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        policy = RetryPolicy(max_attempts=1)
+
+        with self.assertRaises(TransportError):
+            policy.call(HOSTNAME, Flaky(TransportError("Bad Gateway", 502)), circuit_breaker=breaker)
+        time.sleep(0.06)
+
+        breaker.before_call(HOSTNAME)
+        self.assertEqual(breaker.state(HOSTNAME), "half_open")
+        # Only a single trial request at the same time
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call(HOSTNAME)
+
+        breaker.record(HOSTNAME, succeeded=False)
+        self.assertEqual(breaker.state(HOSTNAME), "open")
+        self.assertEqual(breaker.statistics.opened, 2)
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+
+        breaker.record(HOSTNAME, succeeded=False)
+        breaker.record(HOSTNAME, succeeded=True)
+        breaker.record(HOSTNAME, succeeded=False)
+
+        self.assertEqual(breaker.state(HOSTNAME), "closed")
+
+    def test_permanent_errors_dont_open(self):
+        breaker = CircuitBreaker(failure_threshold=1)
+        policy = RetryPolicy(max_attempts=1)
+
+        with self.assertRaises(TransportError):
+            policy.call(HOSTNAME, Flaky(TransportError("Not Found", 404)), circuit_breaker=breaker)
+
+        self.assertEqual(breaker.state(HOSTNAME), "closed")
+
+
+class TestRetryWebservices(unittest.TestCase):
+    def setUp(self):
+        self.fake = self.enterContext(FakeRelatics(handler))
+        self.policy = RetryPolicy(backoff_base=0)
+
+    def _client(self, engine: str) -> RelaticsWebservices:
+        return self.fake.client(engine=engine, resilience=ResilienceOptions(retry_policy=self.policy))
+
+    def _soap_requests(self) -> int:
+        return sum(1 for request in self.fake.requests if request[1] == "/DataExchange.asmx")
+
+    @parameterized.expand([("suds",), ("raw",)])
+    def test_get_result(self, engine: str):
+        self.fake.failures.extend([502, 503])
+
+        result = self._client(engine).get_result("sample_operation")
+
+        self.assertTrue(result)
+        self.assertEqual(self._soap_requests(), 3)
+
+    @parameterized.expand([("suds",), ("raw",)])
+    def test_run_import_not_replayed(self, engine: str):
+        self.fake.failures.append(502)
+
+        with self.assertRaises(Exception):
+            self._client(engine).run_import("sample_operation", [{"name": "a"}])
+
+        self.assertEqual(self._soap_requests(), 1)
+
+    def test_run_import_unprocessed(self):
+        self.fake.failures.append(503)
+
+        result = self._client("raw").run_import("sample_operation", [{"name": "a"}])
+
+        self.assertEqual(result.total_rows, 1)
+        self.assertEqual(self._soap_requests(), 2)
+
+    def test_iter_result(self):
+        self.fake.failures.append(504)
+
+        rows = list(self._client("raw").iter_result("sample_operation"))
+
+        self.assertEqual(rows, [{"Name": "a"}])
+
+    def test_circuit_breaker(self):
+        client = self._client("raw")
+        client.retry_policy = RetryPolicy(max_attempts=1)
+        client.circuit_breaker = CircuitBreaker(failure_threshold=2)
+        self.fake.failures.extend([500, 500, 500])
+
+        for _ in range(2):
+            with self.assertRaises(TransportError):
+                client.get_result("sample_operation")
+        with self.assertRaises(CircuitOpenError):
+            client.get_result("sample_operation")
+
+        self.assertEqual(self._soap_requests(), 2)
+
+    def test_no_retries_by_default(self):
+        client = self.fake.client(engine="raw")
+        self.fake.failures.append(503)
+
+        with self.assertRaises(TransportError):
+            client.get_result("sample_operation")
+        self.assertEqual(self._soap_requests(), 1)
+
+
+class TestAsyncRetryWebservices(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.fake = self.enterContext(FakeRelatics(handler))
+
+    async def test_get_result_and_run_import(self):
+        policy = RetryPolicy(backoff_base=0)
+
+        async with self.fake.async_client(engine="raw", resilience=ResilienceOptions(retry_policy=policy)) as client:
+            self.fake.failures.append(502)
+            export_result = await client.get_result("sample_operation")
+            self.fake.failures.append(503)
+            import_result = await client.run_import("sample_operation", [{"name": "a"}])
+
+        self.assertTrue(export_result)
+        self.assertEqual(import_result.total_rows, 1)
+        self.assertEqual(policy.statistics.retries, 2)
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)
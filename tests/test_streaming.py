@@ -0,0 +1,134 @@
+"""
+Testing the "streaming.py" module
+"""
+
+import unittest
+from base64 import b64encode
+from io import BytesIO
+from zipfile import ZipFile
+
+from fake_relatics import FakeRelatics
+from fake_relatics import soap_response
+
+from pyrelatics2.streaming import ExportRows
+from pyrelatics2.transport import PoolStatistics
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods
+
+
+def make_documents() -> str:
+    zip_buffer = BytesIO()
+    with ZipFile(zip_buffer, "w") as zip_file:
+        zip_file.writestr("file_a.txt", b"contents of a")
+    return b64encode(zip_buffer.getvalue()).decode("ascii")
+
+
+REPORT = (
+    '<Report ReportName="employees">'
+    '<Employees><Employee Name="Alice" Age="30"><Skill Name="Python"/><Skill Name="SQL"/></Employee>'
+    '<Employee Name="Bob &amp; co"/><Manager Name="Carol"/></Employees>'
+    f"<Documents>{make_documents()}</Documents>"
+    "</Report>"
+)
+
+
+def parse(content: str, **kwargs) -> tuple[ExportRows, list[dict]]:
+    rows = ExportRows(lambda: iter(()), **kwargs)  # type: ignore[arg-type,return-value]
+    return rows, list(rows.parse(soap_response("GetResult", content)))
+
+
+class TestExportRows(unittest.TestCase):
+    def test_rows(self):
+        rows, result = parse(REPORT, row_depth=2)
+
+        self.assertTrue(rows)
+        self.assertEqual(rows.report, {"ReportName": "employees"})
+        self.assertEqual(
+            result,
+            [
+                {"Name": "Alice", "Age": "30", "Skill": [{"Name": "Python"}, {"Name": "SQL"}]},
+                {"Name": "Bob & co"},
+                {"Name": "Carol"},
+            ],
+        )
+        self.assertEqual(rows.row_count, 3)
+        self.assertEqual(dict(rows.documents), {"file_a.txt": b"contents of a"})
+
+    def test_rows_by_name(self):
+        _, result = parse(REPORT, row_depth=2, row_name="Employee")
+
+        self.assertEqual([row["Name"] for row in result], ["Alice", "Bob & co"])
+
+    def test_rows_default_depth(self):
+        rows, result = parse(REPORT)
+
+        # The documents are never a row
+        self.assertEqual(len(result), 1)
+        self.assertEqual(len(result[0]["Employee"]), 2)
+        self.assertEqual(len(rows.documents), 1)
+
+    def test_error(self):
+        rows, result = parse('<Export Error="Something failed"/>')
+
+        self.assertFalse(rows)
+        self.assertEqual(rows.error_msg, "Something failed")
+        self.assertEqual(result, [])
+
+    def test_empty(self):
+        rows, result = parse("")
+
+        self.assertFalse(rows)
+        self.assertEqual(result, [])
+
+    def test_init_exception_row_depth(self):
+        with self.assertRaises(ValueError):
+            ExportRows(lambda: iter(()), row_depth=0)  # type: ignore[arg-type,return-value]
+
+
+class TestIterResult(unittest.TestCase):
+    def setUp(self):
+        self.content = REPORT
+        self.fake = self.enterContext(FakeRelatics(lambda action, body: soap_response(action, self.content)))
+        self.client = self.fake.client()
+
+    def test_iter_result(self):
+        rows = self.client.iter_result("employees", parameters={"param1": "value1"}, row_depth=2)
+
+        # The request is only sent when the iteration starts
+        self.assertEqual(self.fake.requests, [])
+        self.assertEqual([row["Name"] for row in rows], ["Alice", "Bob & co", "Carol"])
+        self.assertEqual(list(rows.documents), ["file_a.txt"])
+        self.assertIn(b'<Parameter Name="param1" Value="value1"/>', self.fake.requests[0][3])
+        with self.assertRaises(RuntimeError):
+            iter(rows)
+
+    def test_iter_result_large(self):
+        self.content = (
+            "<Report><Rows>" + "".join(f'<Row Index="{index}"/>' for index in range(50_000)) + "</Rows></Report>"
+        )
+
+        count = sum(1 for _ in self.client.iter_result("large", row_depth=2))
+
+        self.assertEqual(count, 50_000)
+        self.assertEqual(
+            self.client.connection_pool.statistics, PoolStatistics(hits=0, new_connections=1, idle_evictions=0)
+        )
+
+    def test_iter_result_stopped_early(self):
+        self.content = (
+            "<Report><Rows>" + "".join(f'<Row Index="{index}"/>' for index in range(50_000)) + "</Rows></Report>"
+        )
+        rows = iter(self.client.iter_result("large", row_depth=2))
+
+        self.assertEqual(next(rows), {"Index": "0"})
+        rows.close()
+
+        # The partially read response isn't reused
+        self.content = REPORT
+        self.assertEqual(len(list(self.client.iter_result("employees", row_depth=2))), 3)
+        self.assertEqual(self.client.connection_pool.statistics.new_connections, 2)
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)
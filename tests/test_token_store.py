@@ -0,0 +1,139 @@
+"""
+Testing the "token_store.py" module
+"""
+
+import multiprocessing
+import os
+import stat
+import sys
+import unittest
+from datetime import datetime
+from datetime import timedelta
+from tempfile import TemporaryDirectory
+
+from fake_relatics import FakeRelatics
+from parameterized import parameterized
+
+from pyrelatics2.client import ClientCredential
+from pyrelatics2.client import TokenData
+from pyrelatics2.token_store import FileTokenStore
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods,protected-access
+
+HOSTNAME = "python.relaticsonline.com"
+
+
+class TestFileTokenStore(unittest.TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, "tokens")
+        self.store = FileTokenStore(self.location)
+
+    def test_save_load(self):
+        token = TokenData(token="secret", expires_on=datetime.now() + timedelta(hours=1))
+
+        self.store.save("client_id", HOSTNAME, token)
+
+        self.assertEqual(self.store.load("client_id", HOSTNAME), token)
+        self.assertIsNone(self.store.load("other_client_id", HOSTNAME))
+        self.assertIsNone(self.store.load("client_id", "other.relaticsonline.com"))
+
+    def test_load_expired(self):
+        self.store.save(
+            "client_id", HOSTNAME, TokenData(token="secret", expires_on=datetime.now() - timedelta(seconds=1))
+        )
+
+        self.assertIsNone(self.store.load("client_id", HOSTNAME))
+
+    def test_load_missing(self):
+        self.assertIsNone(self.store.load("client_id", HOSTNAME))
+
+    @parameterized.expand(
+        [
+            ("not json", "{"),
+            ("not a dict", "[]"),
+            ("missing token", '{"client_id": "client_id", "hostname": "%s", "expires_on": "2999-01-01T00:00:00"}'),
+            ("missing expiry", '{"client_id": "client_id", "hostname": "%s", "token": "secret"}'),
+            ("invalid expiry", '{"client_id": "client_id", "hostname": "%s", "token": "secret", "expires_on": 1}'),
+            ("invalid token", '{"client_id": "client_id", "hostname": "%s", "token": 1, "expires_on": "2999-01-01"}'),
+        ]
+    )
+    def test_load_corrupt(self, _, contents: str):
+        os.makedirs(self.location)
+        with open(self.store._path("client_id", HOSTNAME, "json"), "w", encoding="utf-8") as token_file:
+            token_file.write(contents.replace("%s", HOSTNAME))
+
+        with self.assertLogs("pyrelatics2.token_store", "WARNING"):
+            self.assertIsNone(self.store.load("client_id", HOSTNAME))
+
+    @unittest.skipIf(sys.platform == "win32", "File permissions are POSIX only")
+    def test_permissions(self):
+        self.store.save(
+            "client_id", HOSTNAME, TokenData(token="secret", expires_on=datetime.now() + timedelta(hours=1))
+        )
+        with self.store.lock("client_id", HOSTNAME):
+            pass
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.location).st_mode), 0o700)
+        for name in os.listdir(self.location):
+            self.assertEqual(stat.S_IMODE(os.stat(os.path.join(self.location, name)).st_mode), 0o600)
+            # The client_id and hostname aren't part of the filename
+            self.assertNotIn("client_id", name)
+            self.assertNotIn(HOSTNAME, name)
+
+
+class TestClientCredentialTokenStore(unittest.TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = FileTokenStore(directory.name)
+        self.fake = self.enterContext(FakeRelatics())
+
+    def _credential(self) -> ClientCredential:
+        return ClientCredential("client_id", "client_secret", connection_pool=self.fake.pool(), token_store=self.store)
+
+    def test_shared_token(self):
+        self.assertEqual(self._credential().get_token(HOSTNAME), "token-1")
+        self.assertEqual(self._credential().get_token(HOSTNAME), "token-1")
+
+        self.assertEqual(self.fake.token_count, 1)
+
+    def test_force_refresh_replaces_stored_token(self):
+        credential = self._credential()
+        credential.get_token(HOSTNAME)
+
+        self.assertEqual(credential.get_token(HOSTNAME, force_refresh=True), "token-2")
+        self.assertEqual(self._credential().get_token(HOSTNAME), "token-2")
+
+    def test_force_refresh_uses_token_renewed_elsewhere(self):
+        credential = self._credential()
+        credential.get_token(HOSTNAME)
+        self._credential().get_token(HOSTNAME, force_refresh=True)
+
+        # Another instance already replaced the stale token
+        self.assertEqual(credential.get_token(HOSTNAME, force_refresh=True), "token-2")
+        self.assertEqual(self.fake.token_count, 2)
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "Needs the fork start method")
+    def test_shared_between_processes(self):
+        context = multiprocessing.get_context("fork")
+        barrier = context.Barrier(4)
+
+        def get_token():
+            barrier.wait()
+            self._credential().get_token(HOSTNAME)
+
+        processes = [context.Process(target=get_token) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(10)
+
+        self.assertEqual([process.exitcode for process in processes], [0] * 4)
+        self.assertEqual(self.fake.token_count, 1)
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)
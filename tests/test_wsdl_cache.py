@@ -0,0 +1,101 @@
+"""
+Testing the "wsdl_cache.py" module
+"""
+
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from tempfile import TemporaryDirectory
+from time import monotonic
+from unittest import mock
+
+from suds.transport.https import HttpAuthenticated
+
+from pyrelatics2.wsdl_cache import WsdlCache
+from pyrelatics2.wsdl_cache import clone_client
+
+# pylint: disable=missing-class-docstring,missing-function-docstring,line-too-long,too-few-public-methods,protected-access
+
+WSDL_FILE_URL = "file://" + os.path.abspath(os.path.join(os.path.dirname(__file__), "data", "DataExchange.wsdl"))
+
+
+@mock.patch.object(WsdlCache, "wsdl_url", staticmethod(lambda hostname: WSDL_FILE_URL))
+class TestWsdlCache(unittest.TestCase):
+    def test_get_client_reuses_wsdl(self):
+        # Arrange
+        cache = WsdlCache()
+
+        # Act
+        client_1 = cache.get_client("python.relaticsonline.com")
+        client_2 = cache.get_client("python.relaticsonline.com")
+
+        # Assert
+        self.assertIsNot(client_1, client_2)
+        self.assertIs(client_1.wsdl, client_2.wsdl)
+
+    def test_get_client_per_hostname(self):
+        cache = WsdlCache()
+
+        client_1 = cache.get_client("python.relaticsonline.com")
+        client_2 = cache.get_client("other.relaticsonline.com")
+
+        self.assertIsNot(client_1.wsdl, client_2.wsdl)
+
+    def test_get_client_threaded_single_retrieval(self):
+        cache = WsdlCache()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(lambda _: cache.get_client("python.relaticsonline.com"), range(16)))
+
+        self.assertEqual(len({id(client.wsdl) for client in clients}), 1)
+
+    def test_get_client_transport_per_caller(self):
+        cache = WsdlCache()
+        transport_1 = HttpAuthenticated()
+        transport_2 = HttpAuthenticated()
+
+        client_1 = cache.get_client("python.relaticsonline.com", lambda: transport_1)
+        client_2 = cache.get_client("python.relaticsonline.com", lambda: transport_2)
+        client_3 = cache.get_client("python.relaticsonline.com")
+
+        self.assertIs(client_1.options.transport, transport_1)
+        self.assertIs(client_2.options.transport, transport_2)
+        self.assertNotIn(client_3.options.transport, (transport_1, transport_2))
+        self.assertIsInstance(client_3.options.transport, HttpAuthenticated)
+        self.assertIsNot(cache.cached("python.relaticsonline.com").options.transport, transport_1)
+
+    def test_cached_snapshot(self):
+        cache = WsdlCache(ttl=timedelta(seconds=60))
+        self.assertIsNone(cache.cached("python.relaticsonline.com"))
+
+        prototype = cache.get_prototype("python.relaticsonline.com")
+        self.assertIs(cache.cached("python.relaticsonline.com"), prototype)
+
+        # A stale WSDL isn't returned anymore, while a snapshot taken before stays usable
+        with mock.patch("pyrelatics2.wsdl_cache.monotonic", return_value=monotonic() + 61):
+            self.assertIsNone(cache.cached("python.relaticsonline.com"))
+        self.assertIs(clone_client(prototype).wsdl, prototype.wsdl)
+
+    def test_invalidate(self):
+        cache = WsdlCache()
+        client_1 = cache.get_client("python.relaticsonline.com")
+
+        cache.invalidate("python.relaticsonline.com")
+        client_2 = cache.get_client("python.relaticsonline.com")
+
+        self.assertIsNot(client_1.wsdl, client_2.wsdl)
+
+    def test_disk_store(self):
+        with TemporaryDirectory() as location:
+            cache = WsdlCache(location=location)
+            cache.get_client("python.relaticsonline.com")
+            self.assertTrue(any(name.endswith(".px") for name in os.listdir(location)))
+
+            cache.invalidate("python.relaticsonline.com")
+            self.assertFalse(any(name.endswith(".px") for name in os.listdir(location)))
+
+
+if __name__ == "__main__":
+    # unittest.main()
+    unittest.main(argv=["first-arg-is-ignored"], exit=False)